@@ -0,0 +1,97 @@
+# app/config/http_client.py
+
+import logging
+import threading
+import httpx
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# One pooled client for every outbound call to Supabase Auth. It is opened and
+# closed by the FastAPI lifespan handler in app.main, so TCP/TLS connections
+# are kept alive and reused across requests instead of rebuilt per call.
+_client = None
+_http2_enabled = False
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "connections_opened": 0}
+
+
+async def _trace(event_name: str, info: dict):
+    # httpcore emits this once per freshly dialled connection; requests that
+    # ride on a pooled keep-alive connection never see it.
+    if event_name == "connection.connect_tcp.complete":
+        with _stats_lock:
+            _stats["connections_opened"] += 1
+
+
+async def _on_request(request: httpx.Request):
+    request.extensions["trace"] = _trace
+    with _stats_lock:
+        _stats["requests"] += 1
+
+
+def _build_client(transport: httpx.AsyncBaseTransport = None) -> httpx.AsyncClient:
+    global _http2_enabled
+    _http2_enabled = False
+    kwargs = dict(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        event_hooks={"request": [_on_request]},
+        transport=transport,
+    )
+
+    if settings.HTTP2:
+        try:
+            client = httpx.AsyncClient(http2=True, **kwargs)
+            _http2_enabled = True
+            return client
+        except ImportError:
+            logger.warning("HTTP2 requested but the 'h2' package is not installed; using HTTP/1.1")
+
+    return httpx.AsyncClient(**kwargs)
+
+
+async def startup_http_client(transport: httpx.AsyncBaseTransport = None):
+    """Creates the shared client. Called from the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client(transport)
+    return _client
+
+
+async def shutdown_http_client():
+    """Closes the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client. Falls back to creating it lazily so code paths
+    that run outside the lifespan (scripts, benchmarks) still work.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def http_client_stats() -> dict:
+    """Request and connection counters for the shared client."""
+    with _stats_lock:
+        requests = _stats["requests"]
+        opened = _stats["connections_opened"]
+
+    return {
+        "requests": requests,
+        "connections_opened": opened,
+        "connections_reused": max(requests - opened, 0),
+        "reuse_ratio": round((requests - opened) / requests, 4) if requests else 0.0,
+        "http2": _http2_enabled,
+    }
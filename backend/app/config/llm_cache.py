@@ -0,0 +1,235 @@
+# app/config/llm_cache.py
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.utils.metrics import counter, gauge
+
+logger = logging.getLogger(__name__)
+
+lookups = counter("llm_cache_total", "LLM response cache lookups, by result (hit, miss) and tier (memory, disk).")
+saved_seconds = counter("llm_cache_saved_seconds_total", "OpenAI latency avoided by cache hits, in seconds.")
+hit_ratio = gauge("llm_cache_hit_ratio", "Share of LLM cache lookups answered from the cache since start.")
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of LLM completions.
+
+    Tier 1 is an in-process LRU bounded by entry count and total characters.
+    Tier 2 is an optional SQLite file (WAL mode, safe to share between
+    uvicorn workers) with a TTL and a row cap, so cached answers survive
+    restarts. Disk hits are promoted back into memory.
+
+    Every entry remembers how long the original call took, so a hit can be
+    credited with the latency it saved.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_chars: int = 16_000_000,
+        ttl: float = 7 * 24 * 3600,
+        sqlite_path: str = None,
+        sqlite_max_entries: int = 10_000,
+    ):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.ttl = ttl
+        self.sqlite_path = sqlite_path or None
+        self.sqlite_max_entries = sqlite_max_entries
+
+        self._memory = OrderedDict()  # key -> (response, latency, expires_at)
+        self._memory_chars = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+        if self.sqlite_path:
+            self._open_db()
+
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(model: str, messages: list, temperature: float, response_format: dict = None) -> str:
+        """Stable digest of everything that determines the completion."""
+        parts = [model, messages, temperature]
+        if response_format is not None:
+            parts.append(response_format)
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def disk_enabled(self) -> bool:
+        return self._db is not None
+
+    def get(self, key: str) -> Optional[str]:
+        """Looks the key up in memory, then on disk. Returns None on a miss."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, latency, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    self.saved_seconds += latency
+                    self._record("memory", latency)
+                    return response
+                self._evict_memory_key(key)
+
+        if self._db is not None:
+            row = self._disk_get(key, now)
+            if row is not None:
+                response, latency, expires_at = row
+                with self._lock:
+                    self.disk_hits += 1
+                    self.saved_seconds += latency
+                    self._record("disk", latency)
+                    self._memory_put(key, response, latency, expires_at)
+                return response
+
+        with self._lock:
+            self.misses += 1
+            self._record(None, 0.0)
+        return None
+
+    def put(self, key: str, response: str, latency: float = 0.0):
+        """Stores a completion in both tiers."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._memory_put(key, response, latency, expires_at)
+        if self._db is not None:
+            self._disk_put(key, response, latency, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_chars = 0
+            self.memory_hits = self.disk_hits = self.misses = 0
+            self.saved_seconds = 0.0
+            hit_ratio.set(0.0)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_chars": self._memory_chars,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "disk_enabled": self.disk_enabled,
+            }
+
+    def _record(self, tier: Optional[str], latency: float):
+        """Mirrors one lookup into the /metrics registry (caller holds self._lock)."""
+        if tier is None:
+            lookups.inc(result="miss", tier="none")
+        else:
+            lookups.inc(result="hit", tier=tier)
+            saved_seconds.inc(latency)
+        hits = self.memory_hits + self.disk_hits
+        hit_ratio.set(hits / (hits + self.misses))
+
+    # ----------------------------------------------------------------------
+    # Memory tier (callers hold self._lock)
+
+    def _memory_put(self, key, response, latency, expires_at):
+        if self.max_entries <= 0 or len(response) > self.max_chars:
+            return
+        if key in self._memory:
+            self._evict_memory_key(key)
+        self._memory[key] = (response, latency, expires_at)
+        self._memory_chars += len(response)
+        while self._memory and (
+            len(self._memory) > self.max_entries or self._memory_chars > self.max_chars
+        ):
+            old_key = next(iter(self._memory))
+            self._evict_memory_key(old_key)
+
+    def _evict_memory_key(self, key):
+        response, _, _ = self._memory.pop(key)
+        self._memory_chars -= len(response)
+
+    # ----------------------------------------------------------------------
+    # Disk tier
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.sqlite_path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM disk cache disabled, could not open %s: %s", self.sqlite_path, e)
+            self._db = None
+
+    def _disk_get(self, key, now):
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT response, latency, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[2] <= now:
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    return None
+                self._db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                return row
+        except sqlite3.Error as e:
+            logger.warning("LLM disk cache read failed: %s", e)
+            return None
+
+    def _disk_put(self, key, response, latency, expires_at):
+        now = time.time()
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, latency, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, response, latency, expires_at, now),
+                )
+                self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                self._db.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "  SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?"
+                    ")",
+                    (self.sqlite_max_entries,),
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning("LLM disk cache write failed: %s", e)
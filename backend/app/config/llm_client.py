@@ -1,14 +1,143 @@
 # app/config/llm_client.py
 
-from openai import OpenAI
+import asyncio
+import time
+import httpx
+from typing import AsyncIterator
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
 from app.config.settings import settings
+from app.config.llm_cache import LLMResponseCache
+from app.config.llm_hedging import Hedger, HedgePolicy, HedgeBudget
+from app.config.llm_limiter import LLMRateLimiter, make_state_backend
+from app.utils.concurrency import SingleFlight
+from app.utils.metrics import counter, track
 
 
+SYSTEM_PROMPT = "You are a helpful and precise assistant."
+TEMPERATURE = 0.2
+
 # Load OpenAI with the key from .env
 client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
+# Async client used by the awaitable service variants. It is created lazily
+# and closed by the app lifespan; one pool is shared by every request, so
+# concurrent generations are bounded by connections instead of threads.
+_async_client = None
+
+# Completions keyed by (model, messages, temperature). None when disabled.
+llm_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    max_chars=settings.LLM_CACHE_MAX_CHARS,
+    ttl=settings.LLM_CACHE_TTL,
+    sqlite_path=settings.LLM_CACHE_SQLITE_PATH,
+    sqlite_max_entries=settings.LLM_CACHE_SQLITE_MAX_ENTRIES,
+) if settings.LLM_CACHE_ENABLED else None
+
+llm_tokens = counter("llm_tokens_total", "OpenAI tokens used, by model and kind (prompt/completion).")
+
+# Admission control for every async OpenAI request (including hedges).
+llm_limiter = LLMRateLimiter(
+    backend=make_state_backend(settings.LLM_LIMITER_STATE_PATH),
+    rpm=settings.LLM_RPM,
+    tpm=settings.LLM_TPM,
+    initial_limit=settings.LLM_CONCURRENCY_INITIAL,
+    min_limit=settings.LLM_CONCURRENCY_MIN,
+    max_limit=settings.LLM_CONCURRENCY_MAX,
+    enabled=settings.LLM_LIMITER_ENABLED,
+)
+
+# Identical async requests already in flight share one OpenAI call.
+llm_single_flight = SingleFlight()
+
+
+def _hedge_policy(percentile: float) -> HedgePolicy:
+    return HedgePolicy(percentile, settings.LLM_HEDGE_MIN_SAMPLES, settings.LLM_HEDGE_WINDOW)
+
+
+# Hedging profiles passed as `hedge=` by the services: cheap outline calls
+# hedge early, big generations (by default) never do.
+llm_hedger = Hedger(
+    policies={
+        "outline": _hedge_policy(settings.LLM_HEDGE_OUTLINE_PERCENTILE),
+        "refine": _hedge_policy(settings.LLM_HEDGE_REFINE_PERCENTILE),
+        "generate": _hedge_policy(settings.LLM_HEDGE_GENERATE_PERCENTILE),
+    },
+    budget=HedgeBudget(settings.LLM_HEDGE_BUDGET_PER_MINUTE),
+    enabled=settings.LLM_HEDGE_ENABLED,
+)
+
+
+def _build_messages(prompt: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _request_key(model_name: str, messages: list, response_format: dict = None) -> str:
+    return LLMResponseCache.make_key(model_name, messages, TEMPERATURE, response_format)
+
+
+def _format_kwargs(response_format: dict) -> dict:
+    return {"response_format": response_format} if response_format else {}
+
 
-def generate_text(prompt: str, model: str = None) -> str:
+def _estimate_tokens(messages: list) -> int:
+    # ~4 characters per token for the prompt, plus the expected answer size.
+    prompt_chars = sum(len(m["content"]) for m in messages)
+    return prompt_chars // 4 + settings.LLM_EXPECTED_COMPLETION_TOKENS
+
+
+def _record_usage(model_name: str, usage):
+    if usage is None:
+        return
+    llm_tokens.inc(usage.prompt_tokens or 0, model=model_name, kind="prompt")
+    llm_tokens.inc(usage.completion_tokens or 0, model=model_name, kind="completion")
+
+
+async def _acache_get(key: str):
+    # The SQLite tier does blocking I/O, so keep it off the event loop.
+    if llm_cache.disk_enabled:
+        return await asyncio.to_thread(llm_cache.get, key)
+    return llm_cache.get(key)
+
+
+async def _acache_put(key: str, text: str, latency: float):
+    if llm_cache.disk_enabled:
+        await asyncio.to_thread(llm_cache.put, key, text, latency)
+    else:
+        llm_cache.put(key, text, latency)
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Returns the shared AsyncOpenAI client, creating it on first use."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed():
+        _async_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=settings.LLM_MAX_RETRIES,
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            ),
+        )
+    return _async_client
+
+
+async def close_async_client():
+    """Closes the shared AsyncOpenAI client. Called from the app lifespan."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+def generate_text(
+    prompt: str, model: str = None, use_cache: bool = True, response_format: dict = None
+) -> str:
     """
     Wrapper for OpenAI text generation.
 
@@ -18,6 +147,12 @@ def generate_text(prompt: str, model: str = None) -> str:
         Prompt to send to the LLM.
     model : str, optional
         Allows overriding the model per-call.
+    use_cache : bool, optional
+        When False, skips the response cache lookup and always calls the
+        model (the fresh answer still replaces the cached one).
+    response_format : dict, optional
+        OpenAI `response_format` (JSON mode / structured outputs), usually
+        from `app.config.llm_schemas.response_format`.
 
     Returns
     -------
@@ -25,18 +160,165 @@ def generate_text(prompt: str, model: str = None) -> str:
         Cleaned LLM output text.
     """
     model_name = model or settings.MODEL_NAME
+    messages = _build_messages(prompt)
+
+    key = _request_key(model_name, messages, response_format)
+    if llm_cache is not None and use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
 
     try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "You are a helpful and precise assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-        )
+        start = time.perf_counter()
+        with track("llm", model=model_name, mode="sync"):
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                temperature=TEMPERATURE,
+                **_format_kwargs(response_format),
+            )
+        _record_usage(model_name, response.usage)
+
+        text = response.choices[0].message.content.strip()
+
+    except Exception as e:
+        raise RuntimeError(f"LLM request failed: {e}")
+
+    if llm_cache is not None and text:
+        llm_cache.put(key, text, time.perf_counter() - start)
+    return text
+
+
+async def agenerate_text(
+    prompt: str,
+    model: str = None,
+    use_cache: bool = True,
+    hedge: str = None,
+    response_format: dict = None,
+) -> str:
+    """
+    Awaitable counterpart of `generate_text`.
+
+    Runs on the event loop through the shared AsyncOpenAI client, so a slow
+    completion holds a pooled connection rather than a threadpool worker.
+    Concurrent calls with the same model and prompt are coalesced into a
+    single request whose result (or error) every caller receives.
+
+    `hedge` names a hedging profile ("outline", "refine", "generate"); when
+    hedging is enabled, a call slower than that profile's latency percentile
+    is raced against a duplicate request.
+    """
+    model_name = model or settings.MODEL_NAME
+    messages = _build_messages(prompt)
+
+    key = _request_key(model_name, messages, response_format)
+    if llm_cache is not None and use_cache:
+        cached = await _acache_get(key)
+        if cached is not None:
+            return cached
+
+    return await llm_single_flight.do(
+        key, lambda: _acomplete(model_name, messages, key, hedge, response_format)
+    )
+
+
+async def _acomplete(
+    model_name: str, messages: list, key: str, hedge: str = None, response_format: dict = None
+) -> str:
+    """Performs one (possibly hedged) completion and caches the result."""
+    start = time.perf_counter()
+    text = await llm_hedger.run(hedge, lambda: _arequest(model_name, messages, response_format, hedge))
+
+    if llm_cache is not None and text:
+        await _acache_put(key, text, time.perf_counter() - start)
+    return text
+
+
+async def _arequest(model_name: str, messages: list, response_format: dict = None, profile: str = None) -> str:
+    """A single chat completion request, admitted by `llm_limiter`."""
+    try:
+        async with llm_limiter.slot(_estimate_tokens(messages), profile) as slot:
+            try:
+                with track("llm", model=model_name, mode="async"):
+                    response = await get_async_client().chat.completions.create(
+                        model=model_name,
+                        messages=messages,
+                        temperature=TEMPERATURE,
+                        **_format_kwargs(response_format),
+                    )
+            except RateLimitError:
+                slot.mark_rate_limited()
+                raise
+            _record_usage(model_name, response.usage)
+            if response.usage is not None:
+                slot.tokens = response.usage.total_tokens
+                slot.completion_tokens = response.usage.completion_tokens
 
         return response.choices[0].message.content.strip()
 
     except Exception as e:
         raise RuntimeError(f"LLM request failed: {e}")
+
+
+async def astream_text(
+    prompt: str, model: str = None, use_cache: bool = True, response_format: dict = None
+) -> AsyncIterator[str]:
+    """
+    Streams the completion for `prompt` as text deltas.
+
+    A cached completion is replayed as a single chunk. The underlying HTTP
+    stream is closed as soon as the consumer stops iterating (e.g. the client
+    disconnected), so no tokens are paid for after that point, and only
+    streams that ran to the end are cached.
+    """
+    model_name = model or settings.MODEL_NAME
+    messages = _build_messages(prompt)
+
+    key = _request_key(model_name, messages, response_format)
+    if llm_cache is not None and use_cache:
+        cached = await _acache_get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    chunks = []
+    start = time.perf_counter()
+    async with llm_limiter.slot(_estimate_tokens(messages), "stream") as slot:
+        with track("llm", model=model_name, mode="stream"):
+            try:
+                stream = await get_async_client().chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **_format_kwargs(response_format),
+                )
+            except RateLimitError as e:
+                slot.mark_rate_limited()
+                raise RuntimeError(f"LLM request failed: {e}")
+            except Exception as e:
+                raise RuntimeError(f"LLM request failed: {e}")
+
+            try:
+                async for chunk in stream:
+                    # With include_usage the final chunk has no choices, only usage.
+                    usage = getattr(chunk, "usage", None)
+                    _record_usage(model_name, usage)
+                    if usage is not None:
+                        slot.tokens = usage.total_tokens
+                        slot.completion_tokens = usage.completion_tokens
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+            except Exception as e:
+                raise RuntimeError(f"LLM stream failed: {e}")
+            finally:
+                await stream.close()
+
+    text = "".join(chunks).strip()
+    if llm_cache is not None and text:
+        await _acache_put(key, text, time.perf_counter() - start)
@@ -0,0 +1,159 @@
+# app/config/llm_hedging.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    """Rolling window of the most recent call latencies (seconds)."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Returns the q-quantile (0..1), or None until enough samples exist."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class HedgeBudget:
+    """Caps how many hedge requests may be fired in any 60-second window."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._fired = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._fired and now - self._fired[0] > 60:
+                self._fired.popleft()
+            if len(self._fired) >= self.per_minute:
+                return False
+            self._fired.append(now)
+            return True
+
+
+class HedgePolicy:
+    """
+    Per-endpoint hedging settings.
+
+    A call that hasn't answered after the `percentile` latency of recent calls
+    for the same profile gets a second identical request; whichever finishes
+    first wins. `percentile <= 0` disables hedging for the profile while still
+    recording its latencies.
+    """
+
+    def __init__(self, percentile: float, min_samples: int = 20, window: int = 200):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.latencies = LatencyWindow(window)
+
+    @property
+    def enabled(self) -> bool:
+        return self.percentile > 0
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.enabled:
+            return None
+        return self.latencies.percentile(self.percentile, self.min_samples)
+
+
+class Hedger:
+    """Runs calls under their profile's HedgePolicy and a shared budget."""
+
+    def __init__(self, policies: Dict[str, HedgePolicy], budget: HedgeBudget, enabled: bool = True):
+        self.policies = policies
+        self.budget = budget
+        self.enabled = enabled
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.budget_exhausted = 0
+
+    async def run(self, profile: Optional[str], fn: Callable[[], Awaitable[T]]) -> T:
+        policy = self.policies.get(profile) if profile else None
+        if policy is None:
+            return await fn()
+
+        delay = policy.hedge_delay() if self.enabled else None
+        primary = asyncio.ensure_future(self._timed(policy, fn))
+        tasks = [primary]
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if primary in done:
+                return primary.result()
+
+            if not self.budget.try_acquire():
+                self.budget_exhausted += 1
+                return await primary
+
+            self.hedges_fired += 1
+            tasks.append(asyncio.ensure_future(self._timed(policy, fn)))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    async def _timed(policy: HedgePolicy, fn):
+        start = time.perf_counter()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Lost to a hedge (or the caller went away). The call would have
+            # taken at least this long; leaving it out would skew the window
+            # towards fast calls and make hedges fire ever earlier.
+            policy.latencies.record(time.perf_counter() - start)
+            raise
+        policy.latencies.record(time.perf_counter() - start)
+        return result
+
+    def stats(self) -> dict:
+        profiles = {}
+        for name, policy in self.policies.items():
+            profiles[name] = {
+                "percentile": policy.percentile,
+                "samples": len(policy.latencies),
+                "hedge_after_seconds": policy.hedge_delay() if self.enabled else None,
+            }
+        return {
+            "enabled": self.enabled,
+            "budget_per_minute": self.budget.per_minute,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "budget_exhausted": self.budget_exhausted,
+            "profiles": profiles,
+        }
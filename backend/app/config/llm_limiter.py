@@ -0,0 +1,321 @@
+# app/config/llm_limiter.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Workers that haven't touched the shared state for this long are considered
+# gone and no longer get a share of the concurrency limit.
+WORKER_STALE_AFTER = 30.0
+# A burst of failures from requests that were all in flight together should
+# only cut the limit once.
+DECREASE_COOLDOWN = 2.0
+
+
+class MemoryStateBackend:
+    """Limiter state held in this process only."""
+
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def update(self, fn: Callable[[dict], object]):
+        """Runs `fn(state)` atomically and returns its result."""
+        with self._lock:
+            return fn(self._state)
+
+    async def aupdate(self, fn: Callable[[dict], object]):
+        # Never blocks for long; fine to run on the event loop.
+        return self.update(fn)
+
+
+class FileStateBackend:
+    """
+    Limiter state shared by every uvicorn worker on the host through a small
+    JSON file guarded by flock. Point it at tmpfs (e.g. /dev/shm/...) to keep
+    it in shared memory rather than on disk.
+    """
+
+    def __init__(self, path: str):
+        import fcntl  # POSIX only; callers fall back to memory elsewhere
+
+        self._fcntl = fcntl
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def update(self, fn: Callable[[dict], object]):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                self._fcntl.flock(fd, self._fcntl.LOCK_EX)
+                raw = b""
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    raw += chunk
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    state = {}
+                result = fn(state)
+                data = json.dumps(state).encode("utf-8")
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+                return result
+            finally:
+                self._fcntl.flock(fd, self._fcntl.LOCK_UN)
+                os.close(fd)
+
+    async def aupdate(self, fn: Callable[[dict], object]):
+        # flock can wait on another worker and the file I/O may hit disk, so
+        # keep both off the event loop.
+        return await run_in_threadpool(self.update, fn)
+
+
+def make_state_backend(path: str = None):
+    if path:
+        try:
+            return FileStateBackend(path)
+        except (ImportError, OSError) as e:
+            logger.warning("LLM limiter state file unavailable (%s); using per-process state", e)
+    return MemoryStateBackend()
+
+
+class LLMRateLimiter:
+    """
+    Adaptive concurrency limit (AIMD) plus request/token buckets for OpenAI.
+
+    * The concurrency limit grows by ~1 per `limit` successful calls and is
+      multiplied by `backoff` on a 429, or by `latency_backoff` when the
+      short-term average of seconds per completion token climbs well above
+      the long-term one. The averages are kept per profile (outline,
+      generate, ...), so a burst of long generations isn't read as the API
+      slowing down compared to short outline calls.
+    * Two token buckets refill continuously at `rpm` requests/min and `tpm`
+      tokens/min. Token cost is estimated up front and corrected with the
+      real usage when the call finishes.
+
+    The limit and buckets live in a state backend; with the file backend all
+    workers on the host share them and each worker gets an equal share of
+    the concurrency limit.
+    """
+
+    def __init__(
+        self,
+        backend,
+        rpm: float,
+        tpm: float,
+        initial_limit: float = 8,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        backoff: float = 0.5,
+        latency_backoff: float = 0.9,
+        latency_tolerance: float = 1.5,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.backend = backend
+        self.rpm = rpm
+        self.tpm = tpm
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+
+        self.pid = str(os.getpid())
+        self._inflight = 0
+        self._cond = None
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+
+    # ----------------------------------------------------------------------
+
+    def slot(self, estimated_tokens: int, profile: str = None):
+        """Async context manager wrapping one OpenAI request."""
+        return _Slot(self, estimated_tokens, profile or "default")
+
+    async def _acquire(self, estimated_tokens: int):
+        if not self.enabled:
+            return
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+
+        async with self._cond:
+            while self._inflight >= await self._worker_limit():
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass  # re-read the shared limit; another worker may have raised it
+            self._inflight += 1
+
+        try:
+            while True:
+                wait = await self.backend.aupdate(lambda s: self._take_tokens(s, estimated_tokens))
+                if wait <= 0:
+                    return
+                self.throttled_seconds += wait
+                await asyncio.sleep(wait)
+        except BaseException:
+            await self._release_slot()
+            raise
+
+    async def _release(self, slot: "_Slot", latency: float):
+        if not self.enabled:
+            return
+        try:
+            await self.backend.aupdate(lambda s: self._settle(s, slot, latency))
+        finally:
+            await self._release_slot()
+
+    async def _release_slot(self):
+        async with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    # ----------------------------------------------------------------------
+    # State transitions (run atomically inside the backend)
+
+    def _init(self, state: dict, now: float):
+        if "limit" not in state:
+            state.update({
+                "limit": float(self.initial_limit),
+                "requests": float(self.rpm),
+                "tokens": float(self.tpm),
+                "refilled_at": now,
+                "decreased_at": 0.0,
+                "workers": {},
+            })
+        state.setdefault("latency", {})
+        state["workers"][self.pid] = now
+
+    def _refill(self, state: dict, now: float):
+        elapsed = max(0.0, now - state["refilled_at"])
+        state["requests"] = min(float(self.rpm), state["requests"] + elapsed * self.rpm / 60.0)
+        state["tokens"] = min(float(self.tpm), state["tokens"] + elapsed * self.tpm / 60.0)
+        state["refilled_at"] = now
+
+    def _take_tokens(self, state: dict, estimated_tokens: int) -> float:
+        """Debits one request and its estimated tokens, or returns seconds to wait."""
+        now = time.time()
+        self._init(state, now)
+        self._refill(state, now)
+
+        cost = min(float(estimated_tokens), float(self.tpm))
+        if state["requests"] >= 1 and state["tokens"] >= cost:
+            state["requests"] -= 1
+            state["tokens"] -= cost
+            return 0.0
+
+        wait_requests = max(0.0, 1 - state["requests"]) * 60.0 / self.rpm
+        wait_tokens = max(0.0, cost - state["tokens"]) * 60.0 / self.tpm
+        return max(wait_requests, wait_tokens, 0.01)
+
+    def _settle(self, state: dict, slot: "_Slot", latency):
+        now = time.time()
+        self._init(state, now)
+        self._refill(state, now)
+
+        if slot.tokens is not None:
+            # Correct the up-front estimate with what the call really used.
+            state["tokens"] = min(float(self.tpm), state["tokens"] + slot.estimated_tokens - slot.tokens)
+
+        limit = state["limit"]
+        can_decrease = now - state["decreased_at"] > DECREASE_COOLDOWN
+        if slot.rate_limited:
+            if can_decrease:
+                limit *= self.backoff
+                state["decreased_at"] = now
+        elif latency is not None and slot.completion_tokens:
+            sample = latency / slot.completion_tokens
+            averages = state["latency"].setdefault(slot.profile, {"short": sample, "long": sample})
+            averages["short"] = 0.5 * averages["short"] + 0.5 * sample
+            averages["long"] = 0.95 * averages["long"] + 0.05 * sample
+            if averages["short"] > self.latency_tolerance * averages["long"]:
+                if can_decrease:
+                    limit *= self.latency_backoff
+                    state["decreased_at"] = now
+            else:
+                limit += 1.0 / max(limit, 1.0)
+        state["limit"] = max(float(self.min_limit), min(float(self.max_limit), limit))
+
+    async def _worker_limit(self) -> int:
+        def read(state):
+            now = time.time()
+            self._init(state, now)
+            workers = state["workers"]
+            for pid, seen in list(workers.items()):
+                if now - seen > WORKER_STALE_AFTER:
+                    del workers[pid]
+            return state["limit"] / max(1, len(workers))
+
+        return max(1, int(await self.backend.aupdate(read)))
+
+    # ----------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False, "rate_limited": self.rate_limited}
+
+        def read(state):
+            self._init(state, time.time())
+            return {
+                "limit": round(state["limit"], 2),
+                "workers": len(state["workers"]),
+                "requests_available": round(state["requests"], 2),
+                "tokens_available": round(state["tokens"], 2),
+            }
+
+        shared = self.backend.update(read)
+        shared.update({
+            "enabled": True,
+            "inflight": self._inflight,
+            "rate_limited": self.rate_limited,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "backend": type(self.backend).__name__,
+        })
+        return shared
+
+
+class _Slot:
+    """
+    One admitted request. Set `tokens` (total) and `completion_tokens` from
+    the usage and call `mark_rate_limited()` as needed.
+    """
+
+    def __init__(self, limiter: LLMRateLimiter, estimated_tokens: int, profile: str):
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self.profile = profile
+        self.tokens = None
+        self.completion_tokens = None
+        self.rate_limited = False
+        self._start = None
+
+    def mark_rate_limited(self):
+        self.rate_limited = True
+        self.limiter.rate_limited += 1
+
+    async def __aenter__(self):
+        await self.limiter._acquire(self.estimated_tokens)
+        self._start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Only successful calls with a known completion size feed the latency signal.
+        latency = time.perf_counter() - self._start if exc_type is None else None
+        await self.limiter._release(self, latency)
+        return False
@@ -0,0 +1,71 @@
+# app/config/llm_schemas.py
+
+from typing import Any, Dict, Optional
+from app.config.settings import settings
+
+# JSON Schemas for the structures the prompts document. Structured outputs
+# (strict mode) require every property to be listed as required and no extra
+# properties, so optional fields are expressed as nullable instead; the
+# document model (app/models/document.py) drops those nulls again.
+
+BLOCK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {"type": "string", "enum": ["heading", "paragraph"]},
+        "level": {"type": ["integer", "null"]},
+        "text": {"type": "string"},
+    },
+    "required": ["type", "level", "text"],
+    "additionalProperties": False,
+}
+
+SLIDE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "bullets": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["title", "bullets"],
+    "additionalProperties": False,
+}
+
+
+def _object(**properties) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+SCHEMAS = {
+    "document": _object(title={"type": "string"}, blocks={"type": "array", "items": BLOCK_SCHEMA}),
+    "section": _object(blocks={"type": "array", "items": BLOCK_SCHEMA}),
+    "presentation": _object(topic={"type": "string"}, slides={"type": "array", "items": SLIDE_SCHEMA}),
+    "slide": SLIDE_SCHEMA,
+    "word_outline": _object(sections=_STRING_LIST),
+    "ppt_outline": _object(slides=_STRING_LIST),
+}
+
+
+def response_format(name: str) -> Optional[Dict[str, Any]]:
+    """
+    The `response_format` to send for the schema `name`, according to
+    LLM_RESPONSE_FORMAT, or None to rely on the prompt alone.
+
+    Both JSON modes make the model answer with an object, so parsers must
+    also accept e.g. ``{"blocks": [...]}`` where the prompt asks for an array.
+    """
+    mode = settings.LLM_RESPONSE_FORMAT
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": name, "schema": SCHEMAS[name], "strict": True},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
@@ -9,6 +9,115 @@ class Settings:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4.1")
 
+    # How JSON answers are requested: "text" (prompt only), "json_object"
+    # (JSON mode) or "json_schema" (structured outputs against the block and
+    # slide schemas in app/config/llm_schemas.py).
+    LLM_RESPONSE_FORMAT = os.getenv("LLM_RESPONSE_FORMAT", "json_schema").lower()
+
+    # Async OpenAI client (connection pool shared by all LLM calls)
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "180"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    # Concurrent per-section calls in parallel (fan-out) generation
+    LLM_FANOUT_CONCURRENCY = int(os.getenv("LLM_FANOUT_CONCURRENCY", "8"))
+
+    # Adaptive OpenAI limiter: AIMD concurrency + requests/tokens per minute.
+    # Point LLM_LIMITER_STATE_PATH at a file (ideally on /dev/shm) to share
+    # the limits between uvicorn workers.
+    LLM_LIMITER_ENABLED = os.getenv("LLM_LIMITER_ENABLED", "true").lower() in ("1", "true", "yes")
+    LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+    LLM_TPM = float(os.getenv("LLM_TPM", "200000"))
+    LLM_CONCURRENCY_INITIAL = float(os.getenv("LLM_CONCURRENCY_INITIAL", "8"))
+    LLM_CONCURRENCY_MIN = float(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+    LLM_CONCURRENCY_MAX = float(os.getenv("LLM_CONCURRENCY_MAX", "64"))
+    LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "1500"))
+    LLM_LIMITER_STATE_PATH = os.getenv("LLM_LIMITER_STATE_PATH", "")
+
+    # Hedged LLM requests (opt-in). Per-profile percentile of recent latency
+    # after which a duplicate request is fired; 0 disables that profile.
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+    LLM_HEDGE_BUDGET_PER_MINUTE = int(os.getenv("LLM_HEDGE_BUDGET_PER_MINUTE", "20"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+    LLM_HEDGE_OUTLINE_PERCENTILE = float(os.getenv("LLM_HEDGE_OUTLINE_PERCENTILE", "0.75"))
+    LLM_HEDGE_REFINE_PERCENTILE = float(os.getenv("LLM_HEDGE_REFINE_PERCENTILE", "0.95"))
+    LLM_HEDGE_GENERATE_PERCENTILE = float(os.getenv("LLM_HEDGE_GENERATE_PERCENTILE", "0"))
+
+    # LLM response cache (memory LRU + optional SQLite file)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+    LLM_CACHE_MAX_CHARS = int(os.getenv("LLM_CACHE_MAX_CHARS", "16000000"))
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+    LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "")
+    LLM_CACHE_SQLITE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_SQLITE_MAX_ENTRIES", "10000"))
+
+    # Background jobs ("background": true on generate/refine requests). Jobs
+    # are held in the memory of the worker process that accepted them, so
+    # polling only works when the API runs as a single uvicorn worker.
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "100"))
+    JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+    # Version storage: "full" stores every version's config as is, "delta"
+    # stores refinements as a delta against their parent with a full
+    # snapshot every VERSION_SNAPSHOT_INTERVAL versions of a chain.
+    VERSION_STORAGE = os.getenv("VERSION_STORAGE", "full").lower()
+    VERSION_SNAPSHOT_INTERVAL = int(os.getenv("VERSION_SNAPSHOT_INTERVAL", "10"))
+    VERSION_CACHE_MAX_ENTRIES = int(os.getenv("VERSION_CACHE_MAX_ENTRIES", "128"))
+
+    # Disk cache of rendered downloads (.docx/.pptx); 0 bytes disables it.
+    # Defaults to a directory under the system temp dir.
+    RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "")
+    RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # .docx engine: "template" fills a prebuilt base document with generated
+    # XML; "python-docx" builds every document through python-docx objects.
+    # Both produce the same file.
+    DOCX_EXPORT_ENGINE = os.getenv("DOCX_EXPORT_ENGINE", "template").lower()
+    # .pptx engine: "template" writes slide XML into a prepared base deck;
+    # "python-pptx" builds every deck through python-pptx objects. Same file.
+    PPTX_EXPORT_ENGINE = os.getenv("PPTX_EXPORT_ENGINE", "template").lower()
+    # Write exports as a stream of zip chunks instead of building the whole
+    # file in memory first (.docx always via the template engine).
+    EXPORT_STREAMING = os.getenv("EXPORT_STREAMING", "false").lower() in ("1", "true", "yes")
+
+    # Export worker processes (0 = render in the thread pool instead), how
+    # many exports may be queued or running before new ones get 503, and
+    # seconds an export may take from submission. Each worker is a full
+    # interpreter with python-docx/python-pptx loaded: use 0 on small
+    # instances (512 MB).
+    EXPORT_POOL_WORKERS = int(os.getenv("EXPORT_POOL_WORKERS", "1"))
+    EXPORT_POOL_MAX_PENDING = int(os.getenv("EXPORT_POOL_MAX_PENDING", "16"))
+    EXPORT_TIMEOUT = float(os.getenv("EXPORT_TIMEOUT", "60"))
+
+    # Bulk ZIP export: renders in flight per archive, versions read per page
+    BULK_EXPORT_CONCURRENCY = int(os.getenv("BULK_EXPORT_CONCURRENCY", "2"))
+    BULK_EXPORT_PAGE_SIZE = int(os.getenv("BULK_EXPORT_PAGE_SIZE", "20"))
+
+    # Shared outbound HTTP client (Supabase Auth, JWKS)
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+    HTTP2 = os.getenv("HTTP2", "false").lower() in ("1", "true", "yes")
+
+    # Bearer-token verification.
+    # "local"  → verify signature/aud/exp against the cached JWKS, falling back to
+    #            the Supabase Auth API only when no usable key is available
+    # "remote" → always ask /auth/v1/user (one extra round trip per request)
+    AUTH_VERIFY_MODE = os.getenv("AUTH_VERIFY_MODE", "local").lower()
+    JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", "600"))
+    # Minimum gap between forced refetches triggered by an unknown `kid`, so
+    # tokens with garbage headers can't make us hammer the JWKS endpoint.
+    JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+    # Already-validated tokens are remembered until their `exp`, but never longer
+    # than TOKEN_CACHE_TTL seconds so a revoked session stops working quickly.
+    TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "1024"))
+    TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+
 settings = Settings()
 
 # Debug
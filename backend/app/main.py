@@ -1,14 +1,46 @@
 # app/main.py
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.routes.routes import router as api_router
+from app.config.http_client import startup_http_client, shutdown_http_client, http_client_stats
+from app.config.llm_client import (
+    get_async_client, close_async_client, llm_cache, llm_single_flight, llm_hedger, llm_limiter
+)
+from app.services.job_service import job_queue
+from app.services.version_store import version_store
+from app.services.render_cache import render_cache
+from app.services.export_pool import export_pool
+from app.utils.auth import token_cache
+from app.utils.metrics import render_prometheus
+from app.utils.json_codec import FastJSONResponse
+
+
+# ---------------------------------------------------------
+# Lifespan — shared clients are created once per worker
+# ---------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_http_client()
+    get_async_client()
+    await job_queue.start()
+    await export_pool.start()
+    yield
+    await export_pool.stop()
+    await job_queue.stop()
+    await close_async_client()
+    await shutdown_http_client()
 
 
 app = FastAPI(
     title="Document Refinement Backend",
     version="1.0.0",
-    description="Backend API for generating and refining document content using LLMs."
+    description="Backend API for generating and refining document content using LLMs.",
+    lifespan=lifespan,
+    # Large document configs serialize several times faster with orjson
+    default_response_class=FastJSONResponse,
 )
 
 # ---------------------------------------------------------
@@ -34,3 +66,28 @@ app.include_router(api_router, prefix="/api")
 @app.get("/")
 def root():
     return {"message": "Backend is running!"}
+
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "http_client": http_client_stats(),
+        "token_cache": token_cache.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "llm_single_flight": llm_single_flight.stats(),
+        "llm_hedging": llm_hedger.stats(),
+        "llm_limiter": llm_limiter.stats(),
+        "jobs": job_queue.stats(),
+        "version_store": version_store.stats(),
+        "render_cache": render_cache.stats(),
+        "export_pool": export_pool.stats(),
+    }
+
+
+# ---------------------------------------------------------
+# Metrics (Prometheus text format, per worker process)
+# ---------------------------------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,369 @@
+# app/models/document.py
+
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+# Typed, normalized form of a version `config`.
+#
+# LLM output and old rows use several spellings for the same thing (root key
+# "blocks"/"sections"/"content", block types "ul"/"bulletlist", list items as
+# strings or {"text": ...}). `from_dict` resolves all of that once, at the
+# boundary; everything downstream reads plain attributes. `to_dict` writes
+# the canonical shape back, keeping any fields the model doesn't know about.
+#
+# Sections (a heading and the blocks up to the next heading) and slides carry
+# a stable "id" assigned at generation time and kept across refinements.
+# `to_dict` also writes a "section_index" (id -> title and position) next to
+# the content so a section can be found without scanning the blocks.
+
+_BLOCK_TYPES = {
+    "heading": "heading",
+    "paragraph": "paragraph",
+    "text": "paragraph",
+    "": "paragraph",
+    "bullet_list": "bullet_list",
+    "ul": "bullet_list",
+    "bulletlist": "bullet_list",
+    "numbered_list": "numbered_list",
+    "ol": "numbered_list",
+    "numberedlist": "numbered_list",
+    "table": "table",
+    "code": "code",
+}
+
+_BLOCK_FIELDS = frozenset(("id", "type", "text", "content", "level", "items", "rows"))
+_SLIDE_FIELDS = frozenset(("id", "title", "bullets"))
+
+
+def new_section_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _item_text(item) -> str:
+    if isinstance(item, dict):
+        return str(item.get("text") or "")
+    return "" if item is None else str(item)
+
+
+def _extra(data: dict, known: frozenset) -> Optional[Dict[str, Any]]:
+    extra = {k: v for k, v in data.items() if k not in known}
+    return extra or None
+
+
+class Block:
+    """One block of a Word document (heading, paragraph, list, table or code)."""
+
+    __slots__ = ("type", "text", "level", "items", "rows", "id", "extra")
+
+    def __init__(
+        self,
+        type: str,
+        text: str = "",
+        level: Optional[int] = None,
+        items: Optional[List[str]] = None,
+        rows: Optional[List[List[str]]] = None,
+        id: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.id = id
+        self.type = type
+        self.text = text
+        self.level = level
+        self.items = items
+        self.rows = rows
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "Block":
+        if not isinstance(data, dict):
+            return cls("paragraph", _item_text(data))
+
+        raw_type = str(data.get("type", "")).lower()
+        btype = _BLOCK_TYPES.get(raw_type, raw_type)
+        text = data.get("text") or data.get("content") or ""
+        block = cls(
+            btype,
+            text if isinstance(text, str) else str(text),
+            id=data.get("id") or None,
+            extra=_extra(data, _BLOCK_FIELDS),
+        )
+
+        if btype == "heading":
+            level = data.get("level")
+            try:
+                level = 2 if level is None else int(level)
+            except (TypeError, ValueError):
+                level = 2
+            block.level = max(1, min(level, 9))
+        elif btype in ("bullet_list", "numbered_list"):
+            block.items = [_item_text(item) for item in data.get("items") or []]
+        elif btype == "table":
+            rows = []
+            for row in data.get("rows") or []:
+                cells = row.get("cells", []) if isinstance(row, dict) else row
+                rows.append([_item_text(cell) for cell in cells or []])
+            block.rows = rows
+        return block
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"id": self.id, "type": self.type} if self.id else {"type": self.type}
+        if self.type == "heading":
+            data["level"] = self.level
+            data["text"] = self.text
+        elif self.items is not None:
+            data["items"] = self.items
+        elif self.rows is not None:
+            data["rows"] = [{"cells": row} for row in self.rows]
+        else:
+            data["text"] = self.text
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"Block({self.type!r}, {self.text[:30]!r})"
+
+
+class WordDocument:
+    """A Word document: a title and an ordered list of blocks."""
+
+    __slots__ = ("title", "blocks", "index", "extra")
+
+    def __init__(
+        self,
+        title: str,
+        blocks: List[Block],
+        extra: Optional[Dict[str, Any]] = None,
+        index: Optional[Dict[str, Any]] = None,
+    ):
+        self.title = title
+        self.blocks = blocks
+        self.extra = extra
+        self.index = index or {}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WordDocument":
+        # Support multiple root keys that LLMs use
+        raw_blocks = data.get("blocks") or data.get("sections") or data.get("content") or []
+        if not isinstance(raw_blocks, list):
+            raw_blocks = []
+        index = data.get("section_index")
+        extra = _extra(data, frozenset(("title", "blocks", "sections", "content", "section_index")))
+        return cls(
+            str(data.get("title") or "Untitled"),
+            [Block.from_dict(block) for block in raw_blocks],
+            extra,
+            index if isinstance(index, dict) else None,
+        )
+
+    @classmethod
+    def coerce(cls, value) -> "WordDocument":
+        """Accepts a WordDocument or its dict form."""
+        return value if isinstance(value, cls) else cls.from_dict(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"title": self.title, "blocks": [block.to_dict() for block in self.blocks]}
+        self.index = self.build_index()
+        if self.index:
+            data["section_index"] = self.index
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    # ----------------------------------------------------------------------
+    # Sections
+
+    def assign_section_ids(self):
+        """Gives every heading without one a new stable id."""
+        seen = set()
+        for block in self.blocks:
+            if block.type != "heading":
+                continue
+            if not block.id or block.id in seen:
+                block.id = new_section_id()
+            seen.add(block.id)
+
+    def build_index(self) -> Dict[str, Dict[str, Any]]:
+        """Section id -> {"title", "start", "end"} ([start, end) block range)."""
+        index = {}
+        current = None
+        for position, block in enumerate(self.blocks):
+            if block.type == "heading":
+                if current is not None:
+                    current["end"] = position
+                current = None
+                if block.id:
+                    current = index[block.id] = {"title": block.text, "start": position, "end": len(self.blocks)}
+        return index
+
+    def find_section(self, section_id: str) -> Optional[Tuple[int, int]]:
+        """Block range of a section by id, using the stored index when it is current."""
+        entry = self.index.get(section_id)
+        if not self._index_entry_valid(section_id, entry):
+            self.index = self.build_index()
+            entry = self.index.get(section_id)
+        if entry is None:
+            return None
+        return entry["start"], entry["end"]
+
+    def _index_entry_valid(self, section_id: str, entry) -> bool:
+        if not isinstance(entry, dict):
+            return False
+        start, end = entry.get("start"), entry.get("end")
+        blocks = self.blocks
+        return (
+            isinstance(start, int) and isinstance(end, int)
+            and 0 <= start < end <= len(blocks)
+            and blocks[start].id == section_id
+            and (end == len(blocks) or blocks[end].type == "heading")
+        )
+
+    def section_span(self, heading_text: str) -> Optional[Tuple[int, int]]:
+        """
+        Index range [start, end) of the section whose heading text matches:
+        the heading plus every block up to the next heading.
+        """
+        blocks = self.blocks
+        for start, block in enumerate(blocks):
+            if block.type == "heading" and block.text == heading_text:
+                end = start + 1
+                while end < len(blocks) and blocks[end].type != "heading":
+                    end += 1
+                return start, end
+        return None
+
+    def replace_section(self, start: int, end: int, blocks: List[Block]):
+        """
+        Swaps blocks[start:end] for `blocks`, keeping the section's id on the
+        new heading so it stays addressable across refinements.
+        """
+        old_id = self.blocks[start].id if start < len(self.blocks) else None
+        if old_id and blocks and blocks[0].type == "heading":
+            blocks[0].id = old_id
+        self.blocks[start:end] = blocks
+        self.assign_section_ids()
+
+
+class Slide:
+    """One content slide: a title and its bullet points."""
+
+    __slots__ = ("title", "bullets", "id", "extra")
+
+    def __init__(
+        self, title: str, bullets: List[str], id: Optional[str] = None, extra: Optional[Dict[str, Any]] = None
+    ):
+        self.id = id
+        self.title = title
+        self.bullets = bullets
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "Slide":
+        if not isinstance(data, dict):
+            return cls(_item_text(data), [])
+        bullets = data.get("bullets") or []
+        if not isinstance(bullets, list):
+            bullets = [bullets]
+        return cls(
+            str(data.get("title") or ""),
+            [_item_text(bullet) for bullet in bullets],
+            data.get("id") or None,
+            _extra(data, _SLIDE_FIELDS),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"id": self.id} if self.id else {}
+        data["title"] = self.title
+        data["bullets"] = self.bullets
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"Slide({self.title!r}, {len(self.bullets)} bullets)"
+
+
+class Presentation:
+    """A presentation: a topic (title slide) and its content slides."""
+
+    __slots__ = ("topic", "slides", "index", "extra")
+
+    def __init__(
+        self,
+        topic: str,
+        slides: List[Slide],
+        extra: Optional[Dict[str, Any]] = None,
+        index: Optional[Dict[str, Any]] = None,
+    ):
+        self.topic = topic
+        self.slides = slides
+        self.extra = extra
+        self.index = index or {}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Presentation":
+        raw_slides = data.get("slides") or []
+        if not isinstance(raw_slides, list):
+            raw_slides = []
+        index = data.get("section_index")
+        return cls(
+            str(data.get("topic") or "Untitled Presentation"),
+            [Slide.from_dict(slide) for slide in raw_slides],
+            _extra(data, frozenset(("topic", "slides", "section_index"))),
+            index if isinstance(index, dict) else None,
+        )
+
+    @classmethod
+    def coerce(cls, value) -> "Presentation":
+        """Accepts a Presentation or its dict form."""
+        return value if isinstance(value, cls) else cls.from_dict(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"topic": self.topic, "slides": [slide.to_dict() for slide in self.slides]}
+        self.index = self.build_index()
+        if self.index:
+            data["section_index"] = self.index
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    # ----------------------------------------------------------------------
+    # Slides
+
+    def assign_section_ids(self):
+        """Gives every slide without one a new stable id."""
+        seen = set()
+        for slide in self.slides:
+            if not slide.id or slide.id in seen:
+                slide.id = new_section_id()
+            seen.add(slide.id)
+
+    def build_index(self) -> Dict[str, Dict[str, Any]]:
+        """Slide id -> {"title", "index"}."""
+        return {
+            slide.id: {"title": slide.title, "index": position}
+            for position, slide in enumerate(self.slides) if slide.id
+        }
+
+    def find_slide(self, slide_id: str) -> Optional[int]:
+        """Position of a slide by id, using the stored index when it is current."""
+        entry = self.index.get(slide_id)
+        position = entry.get("index") if isinstance(entry, dict) else None
+        if not (isinstance(position, int) and 0 <= position < len(self.slides)
+                and self.slides[position].id == slide_id):
+            self.index = self.build_index()
+            entry = self.index.get(slide_id)
+            position = entry["index"] if entry else None
+        return position
+
+    def slide_index(self, title: str) -> Optional[int]:
+        for index, slide in enumerate(self.slides):
+            if slide.title == title:
+                return index
+        return None
+
+    def replace_slide(self, position: int, slide: Slide):
+        """Swaps one slide, keeping its id."""
+        slide.id = self.slides[position].id or slide.id
+        self.slides[position] = slide
+        self.assign_section_ids()
@@ -1,20 +1,34 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
 from app.utils.auth import get_current_user
+from app.config.http_client import get_http_client
 from pydantic import BaseModel
-from typing import List, Dict
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Optional, Tuple
 from app.services.docx_service import DocxService
 from app.services.ppt_service import PptService
 from app.services.outline_service import OutlineService
 from app.services.refinement_service import RefinementService
-from fastapi.responses import StreamingResponse
-from app.services.document_export import export_to_word
-from app.services.ppt_export_service import export_to_ppt
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures.process import BrokenProcessPool
+from app.services.document_export import stream_word, EXPORTER_VERSION as WORD_EXPORTER_VERSION
+from app.services.ppt_export_service import stream_ppt, EXPORTER_VERSION as PPT_EXPORTER_VERSION
+from app.services.export_pool import export_pool, ExportPoolFull, ExportTimeout
+from app.services.bulk_export import BulkExportService
 from app.services.project_service import ProjectService
-import httpx
+from app.services.job_service import job_queue, JobQueueFull
+import anyio
 import os
-import json
+from urllib.parse import quote
 from dotenv import load_dotenv
 from app.config.supabase_client import supabase
+from app.config.settings import settings
+from app.utils.concurrency import gather_bounded
+from app.utils.metrics import counter, track
+from app.utils.json_codec import dumps
+from app.models.document import Block, Presentation, Slide, WordDocument
+from app.services.version_store import version_store
+from app.services.render_cache import RenderCache, render_cache
 
 router = APIRouter()
 
@@ -34,26 +48,47 @@ class SignupRequest(BaseModel):
 class DocumentRequest(BaseModel):
     main_topic: str
     sections: List[str]
+    parallel: bool = False  # generate each section with its own LLM call
+    background: bool = False  # return 202 + job id instead of waiting
 
 class PptRequest(BaseModel):
     topic: str
     slides: List[str]
+    parallel: bool = False  # generate each slide with its own LLM call
+    background: bool = False  # return 202 + job id instead of waiting
 
 class SuggestOutlineRequest(BaseModel):
     topic: str
     doc_type: str  # 'word' or 'ppt'
+    use_cache: bool = True  # false → always ask the LLM for a fresh outline
 
+# Sections/slides are addressed by their stable `section_id` (see the
+# version's config["section_index"]) or, for older clients, by title.
 class FeedbackRequest(BaseModel):
-    section_title: str
+    section_title: Optional[str] = None
+    section_id: Optional[str] = None
     liked: bool  # true for like, false for dislike
 
 class CommentRequest(BaseModel):
-    section_title: str
+    section_title: Optional[str] = None
+    section_id: Optional[str] = None
     comment: str
 
 class RefinementRequest(BaseModel):
-    section_title: str
+    section_title: Optional[str] = None
+    section_id: Optional[str] = None
     refinement_prompt: str
+    background: bool = False  # return 202 + job id instead of waiting
+
+class BatchRefinementItem(BaseModel):
+    section_title: Optional[str] = None
+    section_id: Optional[str] = None
+    refinement_prompt: str
+
+class BatchRefinementRequest(BaseModel):
+    items: List[BatchRefinementItem] = []
+    refinement_prompt: Optional[str] = None  # applied to every section/slide when items is empty
+    background: bool = False  # return 202 + job id instead of waiting
 
 
 # === Login API ===
@@ -62,11 +97,10 @@ async def login_user(payload: LoginRequest):
     url = f"{SUPABASE_URL}/auth/v1/token?grant_type=password"
     headers = {"apikey": SUPABASE_ANON_KEY, "Content-Type": "application/json"}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json={
-            "email": payload.email,
-            "password": payload.password
-        }, headers=headers)
+    resp = await get_http_client().post(url, json={
+        "email": payload.email,
+        "password": payload.password
+    }, headers=headers)
 
     if resp.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -84,11 +118,10 @@ async def signup_user(payload: SignupRequest):
     url = f"{SUPABASE_URL}/auth/v1/signup"
     headers = {"apikey": SUPABASE_ANON_KEY, "Content-Type": "application/json"}
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, json={
-            "email": payload.email,
-            "password": payload.password
-        }, headers=headers)
+    resp = await get_http_client().post(url, json={
+        "email": payload.email,
+        "password": payload.password
+    }, headers=headers)
 
     if resp.status_code != 200:
         error_data = resp.json() if resp.content else {}
@@ -112,21 +145,55 @@ async def signup_user(payload: SignupRequest):
     return response_data
 
 
+# === Background jobs ===
+def _enqueue(kind: str, user_id: str, fn):
+    """Queues `fn` on the job queue and answers 202 with the job's status URL."""
+    try:
+        job = job_queue.submit(kind, user_id, fn)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    status_url = f"/api/jobs/{job.id}"
+    return JSONResponse(
+        status_code=202,
+        content={"message": "Job accepted", "job_id": job.id, "status": job.status, "status_url": status_url},
+        headers={"Location": status_url}
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, user=Depends(get_current_user)):
+    """
+    Status of a background job: queued, running, succeeded or failed. On
+    success `result` holds the same body the synchronous endpoint returns,
+    including the saved version.
+    """
+    job = job_queue.get(job_id)
+    if job is None or job.user_id != user["user_id"]:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
 # === Generate Word JSON + Save to DB ===
-@router.post("/generate-word-json")
-def generate_word_json(payload: DocumentRequest, user=Depends(get_current_user)):
-    doc_json = DocxService.create_word_content(
+async def _generate_word_project(payload: DocumentRequest, user_id: str) -> dict:
+    create_content = (
+        DocxService.acreate_word_content_parallel if payload.parallel
+        else DocxService.acreate_word_content
+    )
+    doc_json = await create_content(
         main_topic=payload.main_topic,
         sections=payload.sections
     )
 
-    project = ProjectService.create_project(
-        user_id=user["user_id"],
+    project = await run_in_threadpool(
+        ProjectService.create_project,
+        user_id=user_id,
         title=doc_json["title"],
         doctype=1  # Word
     )
 
-    version = ProjectService.create_version(
+    version = await run_in_threadpool(
+        ProjectService.create_version,
         project_id=project["id"],
         config=doc_json
     )
@@ -139,21 +206,33 @@ def generate_word_json(payload: DocumentRequest, user=Depends(get_current_user))
     }
 
 
+@router.post("/generate-word-json")
+async def generate_word_json(payload: DocumentRequest, user=Depends(get_current_user)):
+    if payload.background:
+        return _enqueue("generate_word", user["user_id"], lambda: _generate_word_project(payload, user["user_id"]))
+    return await _generate_word_project(payload, user["user_id"])
+
+
 # === Generate PPT JSON + Save to DB ===
-@router.post("/generate-ppt-json")
-def generate_ppt_json(payload: PptRequest, user=Depends(get_current_user)):
-    ppt_json = PptService.create_ppt_content(
+async def _generate_ppt_project(payload: PptRequest, user_id: str) -> dict:
+    create_content = (
+        PptService.acreate_ppt_content_parallel if payload.parallel
+        else PptService.acreate_ppt_content
+    )
+    ppt_json = await create_content(
         topic=payload.topic,
         slides=payload.slides
     )
 
-    project = ProjectService.create_project(
-        user_id=user["user_id"],
+    project = await run_in_threadpool(
+        ProjectService.create_project,
+        user_id=user_id,
         title=ppt_json["topic"],
         doctype=0  # PPT
     )
 
-    version = ProjectService.create_version(
+    version = await run_in_threadpool(
+        ProjectService.create_version,
         project_id=project["id"],
         config=ppt_json
     )
@@ -166,21 +245,121 @@ def generate_ppt_json(payload: PptRequest, user=Depends(get_current_user)):
     }
 
 
+@router.post("/generate-ppt-json")
+async def generate_ppt_json(payload: PptRequest, user=Depends(get_current_user)):
+    if payload.background:
+        return _enqueue("generate_ppt", user["user_id"], lambda: _generate_ppt_project(payload, user["user_id"]))
+    return await _generate_ppt_project(payload, user["user_id"])
+
+
+# === Streaming generation (Server-Sent Events) ===
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(event: str, data) -> str:
+    """Formats one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+generate_streams = counter(
+    "generate_streams_total", "Streaming generations by outcome (completed, failed, cancelled)."
+)
+
+
+async def _stream_generation(events, user_id: str, title_key: str, doctype: int, message: str):
+    """
+    Relays section/slide events from a service stream as SSE frames, then
+    persists the validated result and emits a final `done` event.
+
+    A client disconnect cancels this generator (StreamingResponse does),
+    which closes the LLM stream; nothing is saved.
+    """
+    outcome = "cancelled"
+    try:
+        async for item in events:
+            if item["event"] != "content":
+                yield _sse(item["event"], item["data"])
+                continue
+
+            content = item["data"]
+            project = await run_in_threadpool(
+                ProjectService.create_project,
+                user_id=user_id,
+                title=content[title_key],
+                doctype=doctype
+            )
+            version = await run_in_threadpool(
+                ProjectService.create_version,
+                project_id=project["id"],
+                config=content
+            )
+            outcome = "completed"
+            yield _sse("done", {
+                "message": message,
+                "project": project,
+                "version": version,
+                "content": content
+            })
+    except Exception as e:
+        outcome = "failed"
+        yield _sse("error", {"detail": str(e)})
+    finally:
+        generate_streams.inc(outcome=outcome)
+        # Closes the upstream LLM stream when the client went away mid-way.
+        # Shielded: the cancellation that ended the loop would abort it too.
+        with anyio.CancelScope(shield=True):
+            await events.aclose()
+
+
+@router.post("/generate-word-json/stream")
+async def generate_word_json_stream(payload: DocumentRequest, user=Depends(get_current_user)):
+    """
+    Streaming variant of /generate-word-json. Emits one `block` event per
+    generated block, then `done` with the saved project and version.
+    """
+    events = DocxService.astream_word_content(
+        main_topic=payload.main_topic,
+        sections=payload.sections
+    )
+    return StreamingResponse(
+        _stream_generation(events, user["user_id"], "title", 1, "Word project successfully created"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.post("/generate-ppt-json/stream")
+async def generate_ppt_json_stream(payload: PptRequest, user=Depends(get_current_user)):
+    """
+    Streaming variant of /generate-ppt-json. Emits one `slide` event per
+    generated slide, then `done` with the saved project and version.
+    """
+    events = PptService.astream_ppt_content(
+        topic=payload.topic,
+        slides=payload.slides
+    )
+    return StreamingResponse(
+        _stream_generation(events, user["user_id"], "topic", 0, "PPT project successfully created"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 # === Suggest Outline ===
 @router.post("/suggest-outline")
-def suggest_outline(payload: SuggestOutlineRequest, user=Depends(get_current_user)):
+async def suggest_outline(payload: SuggestOutlineRequest, user=Depends(get_current_user)):
     """
     Suggests document outline (sections for Word, slides for PPT) based on topic.
     """
     try:
         if payload.doc_type == 'word':
-            sections = OutlineService.suggest_word_sections(payload.topic)
+            sections = await OutlineService.asuggest_word_sections(payload.topic, use_cache=payload.use_cache)
             return {
                 "message": "Outline suggested successfully",
                 "sections": sections
             }
         elif payload.doc_type == 'ppt':
-            slides = OutlineService.suggest_ppt_slides(payload.topic)
+            slides = await OutlineService.asuggest_ppt_slides(payload.topic, use_cache=payload.use_cache)
             return {
                 "message": "Outline suggested successfully",
                 "slides": slides
@@ -191,19 +370,27 @@ def suggest_outline(payload: SuggestOutlineRequest, user=Depends(get_current_use
         raise HTTPException(status_code=500, detail=f"Failed to generate outline: {str(e)}")
 
 
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
 # === Export Word ===
 @router.post("/word")
 async def export_word(request: Request, user=Depends(get_current_user)):
     payload: Dict = await request.json()
     document = payload.get("document") or payload
-    buffer = export_to_word(document)
 
     filename = f"{document.get('title', 'Document')}.docx"
-    return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if render_cache.enabled:
+        key = RenderCache.make_key("docx", WORD_EXPORTER_VERSION, document)
+        path, stat_result = await _cached_file("docx", document, key)
+        return FileResponse(path, media_type=DOCX_MEDIA_TYPE, headers=headers, stat_result=stat_result)
+    if settings.EXPORT_STREAMING and not export_pool.enabled:
+        chunks = await run_in_threadpool(stream_word, document)
+        return StreamingResponse(chunks, media_type=DOCX_MEDIA_TYPE, headers=headers)
+    data = await _export("docx", document)
+    return Response(data, media_type=DOCX_MEDIA_TYPE, headers=headers)
 
 
 # === Export PPT ===
@@ -211,82 +398,165 @@ async def export_word(request: Request, user=Depends(get_current_user)):
 async def export_ppt(request: Request, user=Depends(get_current_user)):
     payload: Dict = await request.json()
     presentation = payload.get("presentation") or payload
-    buffer = export_to_ppt(presentation)
 
     filename = f"{presentation.get('topic', 'Presentation')}.pptx"
-    return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if render_cache.enabled:
+        key = RenderCache.make_key("pptx", PPT_EXPORTER_VERSION, presentation)
+        path, stat_result = await _cached_file("pptx", presentation, key)
+        return FileResponse(path, media_type=PPTX_MEDIA_TYPE, headers=headers, stat_result=stat_result)
+    if settings.EXPORT_STREAMING and not export_pool.enabled:
+        chunks = await run_in_threadpool(stream_ppt, presentation)
+        return StreamingResponse(chunks, media_type=PPTX_MEDIA_TYPE, headers=headers)
+    data = await _export("pptx", presentation)
+    return Response(data, media_type=PPTX_MEDIA_TYPE, headers=headers)
 @router.get("/projects/my")
 async def get_my_projects(user=Depends(get_current_user)):
-    response = supabase.table("projects") \
-        .select("*") \
-        .eq("user_id", user["user_id"]) \
-        .order("created_at", desc=True) \
-        .execute()
+    with track("supabase", table="projects", operation="select"):
+        response = supabase.table("projects") \
+            .select("*") \
+            .eq("user_id", user["user_id"]) \
+            .order("created_at", desc=True) \
+            .execute()
 
     return {
         "message": "Projects fetched successfully",
         "projects": response.data
     }
 @router.get("/projects/{project_id}/versions")
-async def get_project_versions(project_id: str, user=Depends(get_current_user)):
+async def get_project_versions(project_id: str, include_config: bool = True, user=Depends(get_current_user)):
+    """
+    Lists a project's versions, newest first. Pass include_config=false to
+    get only the version metadata without each version's content.
+    """
     # Validate that user owns this project
-    project_check = supabase.table("projects") \
-        .select("user_id") \
-        .eq("id", project_id) \
-        .single() \
-        .execute()
+    with track("supabase", table="projects", operation="select"):
+        project_check = supabase.table("projects") \
+            .select("user_id") \
+            .eq("id", project_id) \
+            .single() \
+            .execute()
 
     if not project_check.data or project_check.data["user_id"] != user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized to access this project")
 
-    response = supabase.table("project_versions") \
-        .select("*") \
-        .eq("project_id", project_id) \
-        .order("version_number", desc=True) \
-        .execute()
+    columns = "*" if include_config else "id, project_id, version_number, is_current, created_at"
+    with track("supabase", table="project_versions", operation="select"):
+        response = supabase.table("project_versions") \
+            .select(columns) \
+            .eq("project_id", project_id) \
+            .order("version_number", desc=True) \
+            .execute()
 
+    versions = version_store.expand_rows(response.data) if include_config else response.data
     return {
         "message": "Versions fetched successfully",
         "project_id": project_id,
-        "versions": response.data
+        "versions": versions
     }
 @router.get("/projects/{project_id}/versions/{version_id}")
 async def get_single_version(project_id: str, version_id: str, user=Depends(get_current_user)):
     # Check if user owns the project
-    project_check = supabase.table("projects") \
-        .select("user_id") \
-        .eq("id", project_id) \
-        .single() \
-        .execute()
+    with track("supabase", table="projects", operation="select"):
+        project_check = supabase.table("projects") \
+            .select("user_id") \
+            .eq("id", project_id) \
+            .single() \
+            .execute()
 
     if not project_check.data or project_check.data["user_id"] != user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized for this project")
 
     # Fetch that specific version
-    response = supabase.table("project_versions") \
-        .select("*") \
-        .eq("id", version_id) \
-        .eq("project_id", project_id) \
-        .single() \
-        .execute()
+    with track("supabase", table="project_versions", operation="select"):
+        response = supabase.table("project_versions") \
+            .select("*") \
+            .eq("id", version_id) \
+            .eq("project_id", project_id) \
+            .single() \
+            .execute()
 
     if not response.data:
         raise HTTPException(status_code=404, detail="Version not found")
 
     return {
         "message": "Version fetched successfully",
-        "version": response.data
+        "version": version_store.expand(response.data)
     }
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _content_disposition(filename: str) -> str:
+    """Attachment header that also survives non-ASCII titles (RFC 6266)."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+@contextmanager
+def _export_errors():
+    """Export pool failures as HTTP errors."""
+    try:
+        yield
+    except ExportPoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ExportTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except BrokenProcessPool:
+        # The pool restarts itself; the retry lands on a fresh worker
+        raise HTTPException(status_code=503, detail="Export worker stopped unexpectedly", headers={"Retry-After": "5"})
+
+
+async def _export(fmt: str, content) -> bytes:
+    """Renders in the export process pool (or the thread pool when it is off)."""
+    with _export_errors():
+        return await export_pool.run(fmt, content)
+
+
+async def _cached_file(fmt: str, content, key: str) -> Tuple[str, os.stat_result]:
+    """(path, stat) of the rendered file in the render cache, rendering it there on a miss."""
+    cached = await run_in_threadpool(render_cache.get, key, fmt)
+    if cached is not None:
+        return cached
+    with _export_errors():
+        return await export_pool.render_to_cache(fmt, content, key)
+
+
+def _render_stream(doctype: int, content) -> Iterator[bytes]:
+    if doctype == 1:
+        return stream_word(content)
+    return stream_ppt(content)
+
+
 @router.get("/projects/{project_id}/versions/{version_id}/download")
-async def download_version(project_id: str, version_id: str, user=Depends(get_current_user)):
+async def download_version(project_id: str, version_id: str, request: Request, user=Depends(get_current_user)):
+    """
+    Downloads a version as .docx/.pptx.
+
+    Rendered files are cached on disk by a hash of (format, exporter version,
+    config), which is also the strong ETag: a matching If-None-Match gets
+    304 without rendering anything. Responses carry Content-Length and
+    support Range requests.
+
+    On a miss the file is written into the cache as it is generated, by an
+    export worker process (or the thread pool when the pool is off). With
+    the cache off it is rendered whole, or with EXPORT_STREAMING and no pool
+    streamed to the client as it is generated.
+    """
 
     # Validate user owns the project
-    project_check = supabase.table("projects").select("doctype", "user_id", "title")\
-        .eq("id", project_id).single().execute()
+    with track("supabase", table="projects", operation="select"):
+        project_check = supabase.table("projects").select("doctype", "user_id", "title")\
+            .eq("id", project_id).single().execute()
 
     if not project_check.data or project_check.data["user_id"] != user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized for this project")
@@ -294,35 +564,116 @@ async def download_version(project_id: str, version_id: str, user=Depends(get_cu
     doctype = project_check.data["doctype"]  # 1 = Word, 0 = PPT
 
     # Fetch version config
-    version_data = supabase.table("project_versions")\
-        .select("config")\
-        .eq("id", version_id)\
-        .eq("project_id", project_id)\
-        .single().execute()
+    with track("supabase", table="project_versions", operation="select"):
+        version_data = supabase.table("project_versions")\
+            .select("config")\
+            .eq("id", version_id)\
+            .eq("project_id", project_id)\
+            .single().execute()
 
     if not version_data.data:
         raise HTTPException(status_code=404, detail="Version not found")
 
-    content = version_data.data["config"]
+    content = version_store.materialize(version_id, version_data.data["config"])
 
-    # Generate document
     if doctype == 1:   # Word
-        buffer = export_to_word(content)
-        filename = f"{project_check.data['title']}.docx"
-        media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        fmt, media_type, exporter_version = "docx", DOCX_MEDIA_TYPE, WORD_EXPORTER_VERSION
     else:              # PPT
-        buffer = export_to_ppt(content)
-        filename = f"{project_check.data['title']}.pptx"
-        media_type = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+        fmt, media_type, exporter_version = "pptx", PPTX_MEDIA_TYPE, PPT_EXPORTER_VERSION
+    filename = f"{project_check.data['title']}.{fmt}"
+
+    key = RenderCache.make_key(fmt, exporter_version, content)
+    etag = f'"{key}"'
+    # The user's own content: browsers may keep it but must revalidate
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if not render_cache.enabled:
+        headers["Content-Disposition"] = _content_disposition(filename)
+        if settings.EXPORT_STREAMING and not export_pool.enabled:
+            # No Content-Length or Range support without a file to serve from
+            chunks = await run_in_threadpool(_render_stream, doctype, content)
+            return StreamingResponse(chunks, media_type=media_type, headers=headers)
+        data = await _export(fmt, content)
+        return Response(data, media_type=media_type, headers=headers)
+
+    path, stat_result = await _cached_file(fmt, content, key)
+
+    # FileResponse sets Content-Length, answers Range/If-Range and streams
+    # the file in fixed-size chunks.
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        headers=headers,
+        stat_result=stat_result
+    )
 
+
+# === Bulk Export ===
+def _archive_response(projects: List[dict], include_json: bool, filename: str) -> StreamingResponse:
     return StreamingResponse(
-        buffer,
-        media_type=media_type,
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        BulkExportService.stream_archive(projects, include_json),
+        media_type="application/zip",
+        headers={"Content-Disposition": _content_disposition(filename), "Cache-Control": "no-store"}
     )
 
 
+@router.get("/projects/export")
+async def export_all_projects(include_json: bool = True, user=Depends(get_current_user)):
+    """
+    Every version of every project of the user as one ZIP, one folder per
+    project, streamed while it is built (see BulkExportService).
+    """
+    with track("supabase", table="projects", operation="select"):
+        response = supabase.table("projects") \
+            .select("id, title, doctype") \
+            .eq("user_id", user["user_id"]) \
+            .order("created_at", desc=True) \
+            .execute()
+
+    return _archive_response(response.data or [], include_json, "projects.zip")
+
+
+@router.get("/projects/{project_id}/export")
+async def export_project(project_id: str, include_json: bool = True, user=Depends(get_current_user)):
+    """Every version of a project as one streamed ZIP."""
+    with track("supabase", table="projects", operation="select"):
+        project_check = supabase.table("projects") \
+            .select("id, title, doctype, user_id") \
+            .eq("id", project_id) \
+            .single() \
+            .execute()
+
+    if not project_check.data or project_check.data["user_id"] != user["user_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized for this project")
+
+    project = project_check.data
+    return _archive_response([project], include_json, f"{project['title']}.zip")
+
+
 # === Section Feedback ===
+def _resolve_section_title(version_row: dict, section_id: Optional[str], section_title: Optional[str]) -> str:
+    """
+    Feedback rows are keyed by section title; a section id is translated
+    through the version's stored section index.
+    """
+    if section_id:
+        section_index = version_row.get("section_index")
+        if section_index is None:
+            # Delta-encoded versions only carry their index once materialized
+            section_index = (version_store.load(version_row["id"]) or {}).get("section_index")
+        entry = (section_index or {}).get(section_id)
+        if not entry:
+            raise HTTPException(status_code=404, detail=f"Section id '{section_id}' not found")
+        return entry["title"]
+    if not section_title:
+        raise HTTPException(status_code=400, detail="Provide 'section_id' or 'section_title'")
+    return section_title
+
+
 @router.post("/projects/{project_id}/versions/{version_id}/feedback")
 async def submit_feedback(
     project_id: str, 
@@ -335,58 +686,65 @@ async def submit_feedback(
     Uses upsert to handle the unique constraint (update if exists, insert if not).
     """
     # Validate user owns the project
-    project_check = supabase.table("projects") \
-        .select("user_id") \
-        .eq("id", project_id) \
-        .single() \
-        .execute()
+    with track("supabase", table="projects", operation="select"):
+        project_check = supabase.table("projects") \
+            .select("user_id") \
+            .eq("id", project_id) \
+            .single() \
+            .execute()
 
     if not project_check.data or project_check.data["user_id"] != user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized for this project")
 
-    # Verify version belongs to project
-    version_check = supabase.table("project_versions") \
-        .select("id") \
-        .eq("id", version_id) \
-        .eq("project_id", project_id) \
-        .single() \
-        .execute()
+    # Verify version belongs to project (and fetch its section index)
+    with track("supabase", table="project_versions", operation="select"):
+        version_check = supabase.table("project_versions") \
+            .select("id", "section_index:config->section_index") \
+            .eq("id", version_id) \
+            .eq("project_id", project_id) \
+            .single() \
+            .execute()
 
     if not version_check.data:
         raise HTTPException(status_code=404, detail="Version not found")
 
+    section_title = _resolve_section_title(version_check.data, payload.section_id, payload.section_title)
+
     # Check if feedback already exists
-    existing = supabase.table("section_feedback") \
-        .select("*") \
-        .eq("version_id", version_id) \
-        .eq("user_id", user["user_id"]) \
-        .eq("section_title", payload.section_title) \
-        .execute()
+    with track("supabase", table="section_feedback", operation="select"):
+        existing = supabase.table("section_feedback") \
+            .select("*") \
+            .eq("version_id", version_id) \
+            .eq("user_id", user["user_id"]) \
+            .eq("section_title", section_title) \
+            .execute()
 
     # Update if exists, insert if not
     if existing.data and len(existing.data) > 0:
         # Preserve existing comment
         current_comment = existing.data[0].get("comment")
-        response = supabase.table("section_feedback") \
-            .update({
-                "liked": payload.liked,
-                "comment": current_comment  # Preserve existing comment
-            }) \
-            .eq("version_id", version_id) \
-            .eq("user_id", user["user_id"]) \
-            .eq("section_title", payload.section_title) \
-            .execute()
+        with track("supabase", table="section_feedback", operation="update"):
+            response = supabase.table("section_feedback") \
+                .update({
+                    "liked": payload.liked,
+                    "comment": current_comment  # Preserve existing comment
+                }) \
+                .eq("version_id", version_id) \
+                .eq("user_id", user["user_id"]) \
+                .eq("section_title", section_title) \
+                .execute()
     else:
         feedback_data = {
             "version_id": version_id,
             "user_id": user["user_id"],
-            "section_title": payload.section_title,
+            "section_title": section_title,
             "liked": payload.liked,
             "comment": None
         }
-        response = supabase.table("section_feedback") \
-            .insert(feedback_data) \
-            .execute()
+        with track("supabase", table="section_feedback", operation="insert"):
+            response = supabase.table("section_feedback") \
+                .insert(feedback_data) \
+                .execute()
 
     return {
         "message": "Feedback submitted successfully",
@@ -406,38 +764,43 @@ async def add_comment(
     Uses upsert to handle the unique constraint.
     """
     # Validate user owns the project
-    project_check = supabase.table("projects") \
-        .select("user_id") \
-        .eq("id", project_id) \
-        .single() \
-        .execute()
+    with track("supabase", table="projects", operation="select"):
+        project_check = supabase.table("projects") \
+            .select("user_id") \
+            .eq("id", project_id) \
+            .single() \
+            .execute()
 
     if not project_check.data or project_check.data["user_id"] != user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized for this project")
 
-    # Verify version belongs to project
-    version_check = supabase.table("project_versions") \
-        .select("id") \
-        .eq("id", version_id) \
-        .eq("project_id", project_id) \
-        .single() \
-        .execute()
+    # Verify version belongs to project (and fetch its section index)
+    with track("supabase", table="project_versions", operation="select"):
+        version_check = supabase.table("project_versions") \
+            .select("id", "section_index:config->section_index") \
+            .eq("id", version_id) \
+            .eq("project_id", project_id) \
+            .single() \
+            .execute()
 
     if not version_check.data:
         raise HTTPException(status_code=404, detail="Version not found")
 
+    section_title = _resolve_section_title(version_check.data, payload.section_id, payload.section_title)
+
     # Check if feedback already exists
-    existing = supabase.table("section_feedback") \
-        .select("*") \
-        .eq("version_id", version_id) \
-        .eq("user_id", user["user_id"]) \
-        .eq("section_title", payload.section_title) \
-        .execute()
+    with track("supabase", table="section_feedback", operation="select"):
+        existing = supabase.table("section_feedback") \
+            .select("*") \
+            .eq("version_id", version_id) \
+            .eq("user_id", user["user_id"]) \
+            .eq("section_title", section_title) \
+            .execute()
 
     comment_data = {
         "version_id": version_id,
         "user_id": user["user_id"],
-        "section_title": payload.section_title,
+        "section_title": section_title,
         "comment": payload.comment,
         "liked": None  # Don't change like/dislike status when adding comment
     }
@@ -446,19 +809,21 @@ async def add_comment(
     if existing.data and len(existing.data) > 0:
         # Preserve existing liked status
         current_liked = existing.data[0].get("liked")
-        response = supabase.table("section_feedback") \
-            .update({
-                "comment": payload.comment,
-                "liked": current_liked  # Preserve existing like/dislike
-            }) \
-            .eq("version_id", version_id) \
-            .eq("user_id", user["user_id"]) \
-            .eq("section_title", payload.section_title) \
-            .execute()
+        with track("supabase", table="section_feedback", operation="update"):
+            response = supabase.table("section_feedback") \
+                .update({
+                    "comment": payload.comment,
+                    "liked": current_liked  # Preserve existing like/dislike
+                }) \
+                .eq("version_id", version_id) \
+                .eq("user_id", user["user_id"]) \
+                .eq("section_title", section_title) \
+                .execute()
     else:
-        response = supabase.table("section_feedback") \
-            .insert(comment_data) \
-            .execute()
+        with track("supabase", table="section_feedback", operation="insert"):
+            response = supabase.table("section_feedback") \
+                .insert(comment_data) \
+                .execute()
 
     return {
         "message": "Comment added successfully",
@@ -476,21 +841,23 @@ async def get_feedback(
     Get all feedback for a version (for the current user).
     """
     # Validate user owns the project
-    project_check = supabase.table("projects") \
-        .select("user_id") \
-        .eq("id", project_id) \
-        .single() \
-        .execute()
+    with track("supabase", table="projects", operation="select"):
+        project_check = supabase.table("projects") \
+            .select("user_id") \
+            .eq("id", project_id) \
+            .single() \
+            .execute()
 
     if not project_check.data or project_check.data["user_id"] != user["user_id"]:
         raise HTTPException(status_code=403, detail="Not authorized for this project")
 
     # Get all feedback for this version and user
-    response = supabase.table("section_feedback") \
-        .select("*") \
-        .eq("version_id", version_id) \
-        .eq("user_id", user["user_id"]) \
-        .execute()
+    with track("supabase", table="section_feedback", operation="select"):
+        response = supabase.table("section_feedback") \
+            .select("*") \
+            .eq("version_id", version_id) \
+            .eq("user_id", user["user_id"]) \
+            .execute()
 
     return {
         "message": "Feedback retrieved successfully",
@@ -509,102 +876,312 @@ async def refine_section(
     """
     Refines a specific section/slide using AI and creates a new version.
     """
+    if not payload.section_id and not payload.section_title:
+        raise HTTPException(status_code=400, detail="Provide 'section_id' or 'section_title'")
+
+    if payload.background:
+        return _enqueue(
+            "refine", user["user_id"],
+            lambda: _refine_version(project_id, version_id, payload, user["user_id"])
+        )
+    return await _refine_version(project_id, version_id, payload, user["user_id"])
+
+
+async def _load_for_refinement(project_id: str, version_id: str, user_id: str):
+    """Checks ownership and returns (doctype, parsed config) of a version."""
     # Validate user owns the project
-    project_check = supabase.table("projects") \
-        .select("user_id", "doctype") \
-        .eq("id", project_id) \
-        .single() \
-        .execute()
+    with track("supabase", table="projects", operation="select"):
+        project_check = supabase.table("projects") \
+            .select("user_id", "doctype") \
+            .eq("id", project_id) \
+            .single() \
+            .execute()
 
-    if not project_check.data or project_check.data["user_id"] != user["user_id"]:
+    if not project_check.data or project_check.data["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="Not authorized for this project")
 
     # Get current version content
-    version_data = supabase.table("project_versions") \
-        .select("config") \
-        .eq("id", version_id) \
-        .eq("project_id", project_id) \
-        .single() \
-        .execute()
+    with track("supabase", table="project_versions", operation="select"):
+        version_data = supabase.table("project_versions") \
+            .select("config") \
+            .eq("id", version_id) \
+            .eq("project_id", project_id) \
+            .single() \
+            .execute()
 
     if not version_data.data:
         raise HTTPException(status_code=404, detail="Version not found")
 
-    content = version_data.data["config"]
     doctype = project_check.data["doctype"]  # 1 = Word, 0 = PPT
+    return doctype, version_store.materialize(version_id, version_data.data["config"])
+
+
+def _locate_section(document: WordDocument, section_id: Optional[str], section_title: Optional[str]):
+    """Block range of a section, by id (O(1) via the index) or by heading text."""
+    if section_id:
+        span = document.find_section(section_id)
+    else:
+        span = document.section_span(section_title)
+    if span is None:
+        raise HTTPException(status_code=404, detail=f"Section '{section_id or section_title}' not found")
+    return span
+
+
+def _locate_slide(presentation: Presentation, section_id: Optional[str], section_title: Optional[str]) -> int:
+    """Position of a slide, by id (O(1) via the index) or by title."""
+    if section_id:
+        position = presentation.find_slide(section_id)
+    else:
+        position = presentation.slide_index(section_title)
+    if position is None:
+        raise HTTPException(status_code=404, detail=f"Slide '{section_id or section_title}' not found")
+    return position
+
 
-    # Parse content if it's a string
-    if isinstance(content, str):
-        try:
-            content = json.loads(content)
-        except:
-            pass
+async def _refine_version(project_id: str, version_id: str, payload: RefinementRequest, user_id: str) -> dict:
+    doctype, config = await _load_for_refinement(project_id, version_id, user_id)
 
     # Find and refine the section
     if doctype == 1:
-        # Word document - find section by heading text
-        blocks = content.get("blocks", [])
-        section_start_idx = None
-        section_end_idx = None
-        section_blocks = []
-        
-        # Find the section with matching heading
-        for i, block in enumerate(blocks):
-            if block.get("type") == "heading" and block.get("text") == payload.section_title:
-                section_start_idx = i
-                # Collect heading and all following paragraphs until next heading
-                section_blocks.append(block)
-                for j in range(i + 1, len(blocks)):
-                    if blocks[j].get("type") == "heading":
-                        section_end_idx = j
-                        break
-                    section_blocks.append(blocks[j])
-                else:
-                    section_end_idx = len(blocks)
-                break
-        
-        if section_start_idx is None:
-            raise HTTPException(status_code=404, detail=f"Section '{payload.section_title}' not found")
-        
+        # Word document - find section by id or heading text
+        document = WordDocument.from_dict(config)
+        start, end = _locate_section(document, payload.section_id, payload.section_title)
+
         # Refine the section
-        refined_blocks = RefinementService.refine_word_section(section_blocks, payload.refinement_prompt)
-        
-        # Replace the section in the content
-        new_blocks = (
-            blocks[:section_start_idx] + 
-            refined_blocks + 
-            blocks[section_end_idx:]
-        )
-        content["blocks"] = new_blocks
-        
+        section_blocks = [block.to_dict() for block in document.blocks[start:end]]
+        refined_blocks = await RefinementService.arefine_word_section(section_blocks, payload.refinement_prompt)
+
+        # Replace the section in the content (keeps its id)
+        document.replace_section(start, end, [Block.from_dict(block) for block in refined_blocks])
+        content = document.to_dict()
+
     else:
-        # PPT - find slide by title
-        slides = content.get("slides", [])
-        slide_index = None
-        
-        for i, slide in enumerate(slides):
-            if slide.get("title") == payload.section_title:
-                slide_index = i
-                break
-        
-        if slide_index is None:
-            raise HTTPException(status_code=404, detail=f"Slide '{payload.section_title}' not found")
-        
+        # PPT - find slide by id or title
+        presentation = Presentation.from_dict(config)
+        slide_index = _locate_slide(presentation, payload.section_id, payload.section_title)
+
         # Refine the slide
-        refined_slide = RefinementService.refine_ppt_slide(slides[slide_index], payload.refinement_prompt)
-        
-        # Replace the slide in the content
-        slides[slide_index] = refined_slide
-        content["slides"] = slides
+        refined_slide = await RefinementService.arefine_ppt_slide(
+            presentation.slides[slide_index].to_dict(), payload.refinement_prompt
+        )
+
+        # Replace the slide in the content (keeps its id)
+        presentation.replace_slide(slide_index, Slide.from_dict(refined_slide))
+        content = presentation.to_dict()
 
     # Create new version with refined content
-    new_version = ProjectService.create_version(
+    new_version = await run_in_threadpool(
+        ProjectService.create_version,
         project_id=project_id,
-        config=content
+        config=content,
+        parent_version_id=version_id
     )
 
     return {
         "message": "Section refined and new version created successfully",
         "version": new_version,
         "content": content
-    }
\ No newline at end of file
+    }
+
+
+# === Streaming refinement (Server-Sent Events) ===
+refine_streams = counter(
+    "refine_streams_total", "Streaming refinements by outcome (completed, failed, cancelled)."
+)
+
+
+@router.post("/projects/{project_id}/versions/{version_id}/refine/stream")
+async def refine_section_stream(
+    project_id: str,
+    version_id: str,
+    payload: RefinementRequest,
+    user=Depends(get_current_user)
+):
+    """
+    Streaming variant of /refine. Emits `token` events with the refined text
+    as it is written, a `block` (Word) or `bullet` (PPT) event per finished
+    item, then `done` with the new version.
+
+    The version is only created once the whole output has arrived and
+    validated. If the client disconnects first, the LLM stream is closed and
+    nothing is saved.
+    """
+    if not payload.section_id and not payload.section_title:
+        raise HTTPException(status_code=400, detail="Provide 'section_id' or 'section_title'")
+
+    doctype, config = await _load_for_refinement(project_id, version_id, user["user_id"])
+
+    if doctype == 1:
+        document = WordDocument.from_dict(config)
+        start, end = _locate_section(document, payload.section_id, payload.section_title)
+        events = RefinementService.astream_word_section(
+            [block.to_dict() for block in document.blocks[start:end]], payload.refinement_prompt
+        )
+
+        def apply(refined_blocks):
+            document.replace_section(start, end, [Block.from_dict(block) for block in refined_blocks])
+            return document.to_dict()
+    else:
+        presentation = Presentation.from_dict(config)
+        slide_index = _locate_slide(presentation, payload.section_id, payload.section_title)
+        events = RefinementService.astream_ppt_slide(
+            presentation.slides[slide_index].to_dict(), payload.refinement_prompt
+        )
+
+        def apply(refined_slide):
+            presentation.replace_slide(slide_index, Slide.from_dict(refined_slide))
+            return presentation.to_dict()
+
+    return StreamingResponse(
+        _stream_refinement(events, apply, project_id, version_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+async def _stream_refinement(events, apply, project_id: str, version_id: str):
+    """
+    Relays refinement events as SSE frames; on the validated `content` event
+    splices it into the document with `apply` and saves the new version.
+
+    A client disconnect cancels this generator (StreamingResponse does),
+    which ends it at whichever await it is in.
+    """
+    outcome = "cancelled"
+    try:
+        async for item in events:
+            if item["event"] != "content":
+                yield _sse(item["event"], item["data"])
+                continue
+
+            content = apply(item["data"])
+            new_version = await run_in_threadpool(
+                ProjectService.create_version,
+                project_id=project_id,
+                config=content,
+                parent_version_id=version_id
+            )
+            outcome = "completed"
+            yield _sse("done", {
+                "message": "Section refined and new version created successfully",
+                "version": new_version,
+                "content": content
+            })
+    except Exception as e:
+        outcome = "failed"
+        yield _sse("error", {"detail": str(e)})
+    finally:
+        refine_streams.inc(outcome=outcome)
+        # Closes the upstream LLM stream when the client went away mid-way.
+        # Shielded: the cancellation that ended the loop would abort it too.
+        with anyio.CancelScope(shield=True):
+            await events.aclose()
+
+
+@router.post("/projects/{project_id}/versions/{version_id}/refine-batch")
+async def refine_sections_batch(
+    project_id: str,
+    version_id: str,
+    payload: BatchRefinementRequest,
+    user=Depends(get_current_user)
+):
+    """
+    Refines several sections/slides concurrently and saves them as ONE new
+    version. Send `items` (title + instruction pairs), or only
+    `refinement_prompt` to apply one instruction to every section/slide.
+    """
+    if not payload.items and not payload.refinement_prompt:
+        raise HTTPException(status_code=400, detail="Provide 'items' or a 'refinement_prompt' for every section")
+
+    keys = [item.section_id or item.section_title for item in payload.items]
+    if not all(keys):
+        raise HTTPException(status_code=400, detail="Every item needs a 'section_id' or 'section_title'")
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail="Each section may only appear once per batch")
+
+    if payload.background:
+        return _enqueue(
+            "refine_batch", user["user_id"],
+            lambda: _refine_version_batch(project_id, version_id, payload, user["user_id"])
+        )
+    return await _refine_version_batch(project_id, version_id, payload, user["user_id"])
+
+
+async def _refine_version_batch(
+    project_id: str, version_id: str, payload: BatchRefinementRequest, user_id: str
+) -> dict:
+    doctype, config = await _load_for_refinement(project_id, version_id, user_id)
+    limit = settings.LLM_FANOUT_CONCURRENCY
+
+    if doctype == 1:
+        document = WordDocument.from_dict(config)
+        if payload.items:
+            spans = [_locate_section(document, item.section_id, item.section_title) for item in payload.items]
+            targets = [(document.blocks[start].text, item.refinement_prompt)
+                       for (start, _), item in zip(spans, payload.items)]
+            if len(set(spans)) != len(spans):
+                raise HTTPException(status_code=400, detail="Each section may only appear once per batch")
+        else:
+            # Every section below the document title, by position
+            targets, spans = [], []
+            for start, block in enumerate(document.blocks):
+                if block.type == "heading" and block.level != 1:
+                    end = start + 1
+                    while end < len(document.blocks) and document.blocks[end].type != "heading":
+                        end += 1
+                    targets.append((block.text, payload.refinement_prompt))
+                    spans.append((start, end))
+
+        refined = await gather_bounded(
+            (
+                RefinementService.arefine_word_section(
+                    [block.to_dict() for block in document.blocks[start:end]], prompt
+                )
+                for (start, end), (_, prompt) in zip(spans, targets)
+            ),
+            limit,
+        )
+
+        # Splice from the back so earlier spans keep their indices
+        for (start, end), blocks in sorted(zip(spans, refined), key=lambda pair: pair[0][0], reverse=True):
+            document.replace_section(start, end, [Block.from_dict(block) for block in blocks])
+        content = document.to_dict()
+
+    else:
+        presentation = Presentation.from_dict(config)
+        if payload.items:
+            indexes = [_locate_slide(presentation, item.section_id, item.section_title) for item in payload.items]
+            targets = [(presentation.slides[index].title, item.refinement_prompt)
+                       for index, item in zip(indexes, payload.items)]
+            if len(set(indexes)) != len(indexes):
+                raise HTTPException(status_code=400, detail="Each section may only appear once per batch")
+        else:
+            targets = [(slide.title, payload.refinement_prompt) for slide in presentation.slides]
+            indexes = list(range(len(presentation.slides)))
+
+        refined = await gather_bounded(
+            (
+                RefinementService.arefine_ppt_slide(presentation.slides[index].to_dict(), prompt)
+                for index, (_, prompt) in zip(indexes, targets)
+            ),
+            limit,
+        )
+
+        for index, slide in zip(indexes, refined):
+            presentation.replace_slide(index, Slide.from_dict(slide))
+        content = presentation.to_dict()
+
+    # One version for the whole batch
+    new_version = await run_in_threadpool(
+        ProjectService.create_version,
+        project_id=project_id,
+        config=content,
+        parent_version_id=version_id
+    )
+
+    return {
+        "message": f"{len(targets)} sections refined and new version created successfully",
+        "refined": [title for title, _ in targets],
+        "version": new_version,
+        "content": content
+    }
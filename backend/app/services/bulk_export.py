@@ -0,0 +1,176 @@
+# app/services/bulk_export.py
+
+import asyncio
+import logging
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config.settings import settings
+from app.config.supabase_client import supabase
+from app.services.document_export import EXPORTER_VERSION as WORD_EXPORTER_VERSION
+from app.services.export_pool import ExportPoolFull, export_pool
+from app.services.ppt_export_service import EXPORTER_VERSION as PPT_EXPORTER_VERSION
+from app.services.render_cache import RenderCache, render_cache
+from app.services.version_store import version_store
+from app.utils.json_codec import dumps
+from app.utils.metrics import counter, track
+from app.utils.zip_stream import ZipMember, ZipStream, compress, store
+
+logger = logging.getLogger(__name__)
+
+entries_written = counter("bulk_export_entries_total", "Entries written to bulk export archives, by kind (file, json, error).")
+
+# Characters that are unsafe in file names on at least one common OS
+_UNSAFE_NAME = re.compile(r'[\x00-\x1f<>:"/\\|?*]+')
+
+# How long to wait before resubmitting when the export pool is full
+_POOL_FULL_BACKOFF = 0.5
+
+
+def _safe_name(name: Any, fallback: str) -> str:
+    name = _UNSAFE_NAME.sub("_", str(name or "")).strip(" .")
+    return name[:80] or fallback
+
+
+def _folder_name(project: Dict[str, Any]) -> str:
+    # The id suffix keeps projects with the same title apart
+    return f"{_safe_name(project.get('title'), 'Untitled')} ({str(project['id'])[:8]})"
+
+
+class BulkExportService:
+    """
+    Builds one ZIP of many projects' versions and streams it while it is
+    being built.
+
+    Versions are read a page at a time (oldest first, so delta bases are
+    materialized before the versions built on them). Each gets a
+    `v<n>.json` entry with its content right away and a `v<n>.docx` /
+    `v<n>.pptx` entry once rendered. Up to `BULK_EXPORT_CONCURRENCY` renders
+    run at once in the export pool, and files enter the archive in the order
+    they finish. Renders reuse and fill the download render cache. A version
+    that fails to render gets a `v<n>.error.txt` entry instead of aborting
+    the whole archive.
+
+    Nothing is read or rendered ahead of the client: the next page is only
+    fetched, and the next render only started, when the archive has room.
+    """
+
+    @staticmethod
+    async def stream_archive(projects: List[Dict[str, Any]], include_json: bool = True) -> AsyncIterator[bytes]:
+        """
+        Zip chunks for `projects` (rows with id, title and doctype, ownership
+        already checked). Meant to be the body of a StreamingResponse.
+        """
+        archive = ZipStream()
+        async for member in BulkExportService._members(projects, include_json):
+            yield archive.add(member)
+        yield archive.close()
+
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    async def _members(projects: List[Dict[str, Any]], include_json: bool) -> AsyncIterator[ZipMember]:
+        concurrency = max(1, settings.BULK_EXPORT_CONCURRENCY)
+        pending = set()
+        try:
+            for project in projects:
+                folder = _folder_name(project)
+                fmt = "docx" if project.get("doctype") == 1 else "pptx"
+                async for row in BulkExportService._version_rows(project["id"]):
+                    stem = f"{folder}/v{row.get('version_number') or row['id']}"
+                    if include_json:
+                        entries_written.inc(kind="json")
+                        yield compress(f"{stem}.json", dumps(row["config"]))
+
+                    pending.add(asyncio.create_task(BulkExportService._render_member(stem, fmt, row)))
+                    if len(pending) >= concurrency:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            yield task.result()
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # Client went away (or something failed): stop the renders still queued
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def _version_rows(project_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """A project's versions, oldest first, with full configs, fetched in pages."""
+        page_size = max(1, settings.BULK_EXPORT_PAGE_SIZE)
+        start = 0
+        while True:
+            rows = await run_in_threadpool(BulkExportService._fetch_page, project_id, start, page_size)
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            start += page_size
+
+    @staticmethod
+    def _fetch_page(project_id: str, start: int, page_size: int) -> List[Dict[str, Any]]:
+        # Expanding may fetch delta bases outside the page, hence off the event loop too
+        with track("supabase", table="project_versions", operation="select"):
+            response = supabase.table("project_versions") \
+                .select("id, version_number, created_at, config") \
+                .eq("project_id", project_id) \
+                .order("version_number") \
+                .range(start, start + page_size - 1) \
+                .execute()
+        return version_store.expand_rows(response.data or [])
+
+    @staticmethod
+    async def _render_member(stem: str, fmt: str, row: Dict[str, Any]) -> ZipMember:
+        try:
+            data = await BulkExportService._render(fmt, row["config"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Bulk export: rendering version %s failed", row["id"])
+            entries_written.inc(kind="error")
+            return compress(f"{stem}.error.txt", f"Rendering this version failed: {e}\n".encode("utf-8"))
+        entries_written.inc(kind="file")
+        # .docx/.pptx are zips already; deflating them again gains nothing
+        return store(f"{stem}.{fmt}", data)
+
+    @staticmethod
+    async def _render(fmt: str, content: Any) -> bytes:
+        """File bytes from the render cache, or rendered into it in the export pool."""
+        key: Optional[str] = None
+        if render_cache.enabled:
+            exporter_version = WORD_EXPORTER_VERSION if fmt == "docx" else PPT_EXPORTER_VERSION
+            key = RenderCache.make_key(fmt, exporter_version, content)
+            cached = await run_in_threadpool(BulkExportService._read_cached, key, fmt)
+            if cached is not None:
+                return cached
+
+        while True:
+            try:
+                if key is None:
+                    return await export_pool.run(fmt, content)
+                # The worker writes the file; only its path comes back
+                path, _ = await export_pool.render_to_cache(fmt, content, key)
+                return await run_in_threadpool(BulkExportService._read_file, path)
+            except ExportPoolFull:
+                # Shared with interactive downloads: wait for room instead of failing
+                await asyncio.sleep(_POOL_FULL_BACKOFF)
+
+    @staticmethod
+    def _read_cached(key: str, fmt: str) -> Optional[bytes]:
+        cached = render_cache.get(key, fmt)
+        if cached is None:
+            return None
+        try:
+            return BulkExportService._read_file(cached[0])
+        except FileNotFoundError:  # evicted in between
+            return None
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
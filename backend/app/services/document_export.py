@@ -1,68 +1,43 @@
 # app/services/document_export.py
+import re
+import threading
+import zipfile
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 from io import BytesIO
-from typing import Any, Dict
-import re
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple, Union
+from app.config.settings import settings
+from app.models.document import Block, WordDocument
+from app.utils.inline_markdown import tokenize
+from app.utils.metrics import track
+from app.utils.zip_stream import ZipMember, ZipStream, compress
+
+# Bump whenever the generated .docx changes for the same input; it is part
+# of the render cache key (app/services/render_cache.py).
+EXPORTER_VERSION = 4
 
 
 def _add_rich_text(paragraph, text: str):
     """Handles **bold**, *italic*, `code` inside text"""
-    if not text:
-        return
-
-    # Split by markdown patterns (order matters!)
-    patterns = [
-        (r"`(.*?)`", "code"),
-        (r"\*\*(.*?)\*\*", "bold"),
-        (r"__(.*?)__", "bold"),
-        (r"\*(.*?)\*", "italic"),
-        (r"_([^_]+)_", "italic"),
-    ]
-
-    parts = [text]
-    for pattern, style in patterns:
-        new_parts = []
-        for part in parts:
-            if isinstance(part, str):
-                matches = list(re.finditer(pattern, part))
-                if not matches:
-                    new_parts.append(part)
-                    continue
-                pos = 0
-                for m in matches:
-                    if m.start() > pos:
-                        new_parts.append(part[pos:m.start()])
-                    new_parts.append((m.group(1), style))
-                    pos = m.end()
-                if pos < len(part):
-                    new_parts.append(part[pos:])
-            else:
-                new_parts.append(part)
-        parts = new_parts
-
-    for part in parts:
-        if isinstance(part, tuple):
-            content, style = part
-            run = paragraph.add_run(content)
-            if style == "bold":
-                run.bold = True
-            elif style == "italic":
-                run.italic = True
-            elif style == "code":
-                run.font.name = "Consolas"
-                run.font.size = Pt(10)
-                shading_elt = OxmlElement('w:shd')
-                shading_elt.set(qn('w:fill'), 'f0f0f0')
-                run._r.get_or_add_rPr().append(shading_elt)
-        else:
-            paragraph.add_run(part)
+    for run in tokenize(text):
+        r = paragraph.add_run(run.text)
+        if run.bold:
+            r.bold = True
+        if run.italic:
+            r.italic = True
+        if run.code:
+            r.font.name = "Consolas"
+            r.font.size = Pt(10)
+            shading_elt = OxmlElement('w:shd')
+            shading_elt.set(qn('w:fill'), 'f0f0f0')
+            r._r.get_or_add_rPr().append(shading_elt)
 
 
-def export_to_word(document_data: Dict[str, Any]) -> BytesIO:
+def _new_document():
+    """An empty document with the exporter's default font and margins."""
     doc = Document()
 
     # Default styling
@@ -74,64 +49,73 @@ def export_to_word(document_data: Dict[str, Any]) -> BytesIO:
     # Margins
     for section in doc.sections:
         section.top_margin = section.bottom_margin = section.left_margin = section.right_margin = Inches(1)
+    return doc
 
-    doc.core_properties.title = document_data.get("title", "Untitled")
 
-    # Support multiple root keys that LLMs use
-    blocks = (
-        document_data.get("blocks") or
-        document_data.get("sections") or
-        document_data.get("content", []) or
-        []
-    )
+@track("export", format="docx")
+def export_to_word(document_data: Union[Dict[str, Any], WordDocument]) -> BytesIO:
+    document = WordDocument.coerce(document_data)
+    if settings.DOCX_EXPORT_ENGINE == "python-docx":
+        return _export_with_python_docx(document)
+    return docx_template.render(document)
 
-    for block in blocks:
-        btype = str(block.get("type", "")).lower()
+
+def stream_word(document_data: Union[Dict[str, Any], WordDocument], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    The .docx of `export_to_word` as zip chunks, for a StreamingResponse.
+    Nothing but the current chunk is held in memory, however large the
+    document. Always uses the template engine.
+    """
+    return docx_template.stream(WordDocument.coerce(document_data), chunk_size)
+
+
+def _export_with_python_docx(document: WordDocument) -> BytesIO:
+    doc = _new_document()
+    doc.core_properties.title = document.title
+
+    for block in document.blocks:
+        btype = block.type
 
         # Headings
         if btype == "heading":
-            level = max(1, min(block.get("level", 2), 9))
-            heading_level = 0 if level == 1 else level
-            p = doc.add_heading(block.get("text", ""), level=heading_level)
-            if level == 1:
+            heading_level = 0 if block.level == 1 else block.level
+            p = doc.add_heading(block.text, level=heading_level)
+            if block.level == 1:
                 p.alignment = WD_ALIGN_PARAGRAPH.CENTER
             continue
 
         # Paragraph (with markdown support)
-        if btype in ("paragraph", "text", ""):
-            text = block.get("text") or block.get("content", "")
-            if text:
+        if btype == "paragraph":
+            if block.text:
                 p = doc.add_paragraph()
-                _add_rich_text(p, str(text))
+                _add_rich_text(p, block.text)
             continue
 
         # Bullet lists
-        if btype in ("bullet_list", "ul", "bulletlist"):
-            for item in block.get("items", []):
-                text = item.get("text") if isinstance(item, dict) else str(item)
+        if btype == "bullet_list":
+            for text in block.items:
                 p = doc.add_paragraph(style="List Bullet")
                 _add_rich_text(p, text)
             continue
 
         # Numbered lists
-        if btype in ("numbered_list", "ol", "numberedlist"):
-            for item in block.get("items", []):
-                text = item.get("text") if isinstance(item, dict) else str(item)
+        if btype == "numbered_list":
+            for text in block.items:
                 p = doc.add_paragraph(style="List Number")
                 _add_rich_text(p, text)
             continue
 
         # Tables
         if btype == "table":
-            rows = block.get("rows", [])
-            if not rows:
+            rows = block.rows
+            if not rows or not rows[0]:
                 continue
-            cols = len(rows[0].get("cells", [])) if rows else 0
+            cols = len(rows[0])
             table = doc.add_table(rows=len(rows), cols=cols, style="Table Grid")
-            for r_idx, row in enumerate(rows):
-                cells = row.get("cells", [])
-                for c_idx, cell in enumerate(cells):
-                    cell_text = cell.get("text") if isinstance(cell, dict) else str(cell)
+            for r_idx, cells in enumerate(rows):
+                # Cells past the first row's width have no column; table.cell()
+                # would put them into the next row (or fail on the last one).
+                for c_idx, cell_text in enumerate(cells[:cols]):
                     cell_obj = table.cell(r_idx, c_idx)
                     cell_obj.text = ""
                     _add_rich_text(cell_obj.paragraphs[0], cell_text)
@@ -139,17 +123,18 @@ def export_to_word(document_data: Dict[str, Any]) -> BytesIO:
 
         # Code blocks
         if btype == "code":
-            p = doc.add_paragraph(block.get("text", ""), style="No Spacing")
-            run = p.runs[0]
-            run.font.name = "Consolas"
-            run.font.size = Pt(10)
-            shading = OxmlElement('w:shd')
-            shading.set(qn('w:fill'), 'f0f0f0')
-            run._r.get_or_add_rPr().append(shading)
+            p = doc.add_paragraph(block.text, style="No Spacing")
+            if p.runs:  # an empty code block is just the styled paragraph
+                run = p.runs[0]
+                run.font.name = "Consolas"
+                run.font.size = Pt(10)
+                shading = OxmlElement('w:shd')
+                shading.set(qn('w:fill'), 'f0f0f0')
+                run._r.get_or_add_rPr().append(shading)
             continue
 
         # Fallback → plain paragraph
-        fallback_text = block.get("text") or block.get("content") or str(block)
+        fallback_text = block.text or str(block.to_dict())
         if fallback_text.strip():
             p = doc.add_paragraph()
             _add_rich_text(p, fallback_text)
@@ -157,4 +142,281 @@ def export_to_word(document_data: Dict[str, Any]) -> BytesIO:
     buffer = BytesIO()
     doc.save(buffer)
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+# ----------------------------------------------------------------------
+# Template engine
+#
+# Produces the same package as _export_with_python_docx without going
+# through python-docx per block: the styled empty document is built and
+# saved once, and each export copies it and fills in the body XML as text.
+# The markup below is exactly what python-docx serializes for the calls
+# made above (element order, xml:space, <w:tab/>/<w:br/> for tabs and
+# newlines), so keep both in step when the output changes.
+
+# Paragraph and table style names, resolved to style ids from the template
+_STYLE_NAMES = ("Title",) + tuple(f"Heading {n}" for n in range(1, 10)) + (
+    "List Bullet", "List Number", "No Spacing", "Table Grid",
+)
+
+# Parts generated per export; every other part comes from the template as is
+_DOCUMENT_PART = "word/document.xml"
+_CORE_PART = "docProps/core.xml"
+
+# Stand-in title used to split core.xml around the real one
+_TITLE_MARKER = "@@TITLE@@"
+
+# Characters lxml refuses in XML text (python-docx raises on them too)
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+_BREAKS = re.compile(r"([\t\r\n])")
+
+_CODE_FONT = '<w:rFonts w:ascii="Consolas" w:hAnsi="Consolas"/>'
+_CODE_SIZE = '<w:sz w:val="20"/><w:shd w:fill="f0f0f0"/>'
+
+# rPr for each (bold, italic, code) combination
+_RUN_PROPERTIES = {}
+for _bold in (False, True):
+    for _italic in (False, True):
+        for _code in (False, True):
+            _inner = (
+                (_CODE_FONT if _code else "")
+                + ("<w:b/>" if _bold else "")
+                + ("<w:i/>" if _italic else "")
+                + (_CODE_SIZE if _code else "")
+            )
+            _RUN_PROPERTIES[_bold, _italic, _code] = f"<w:rPr>{_inner}</w:rPr>" if _inner else ""
+
+_EMUS_PER_TWIP = 635
+
+
+class _TemplateParts(NamedTuple):
+    archive: bytes          # zip with every part except the two generated ones
+    members: Tuple[ZipMember, ...]  # the same parts, compressed for ZipStream
+    document_head: str      # word/document.xml up to the body content
+    document_tail: str      # the final <w:sectPr> and closing tags
+    core_head: str          # docProps/core.xml up to the title text
+    core_tail: str
+    style_ids: Dict[str, str]
+    block_width: int        # EMU between the margins, split across table columns
+
+
+def _escape(text: str) -> str:
+    if _INVALID_XML.search(text):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    # A raw CR would be read back as LF; lxml writes it as a character reference
+    return text.replace("\r", "&#13;") if "\r" in text else text
+
+
+def _text_xml(text: str) -> str:
+    """Run content for `text`, as python-docx's Run.text setter writes it."""
+    if "\t" in text or "\n" in text or "\r" in text:
+        return "".join(
+            "<w:tab/>" if piece == "\t" else "<w:br/>" if piece in ("\r", "\n") else _text_xml(piece)
+            for piece in _BREAKS.split(text)
+            if piece
+        )
+    if len(text.strip()) < len(text):
+        return f'<w:t xml:space="preserve">{_escape(text)}</w:t>'
+    return f"<w:t>{_escape(text)}</w:t>"
+
+
+def _run_xml(text: str, properties: str = "") -> str:
+    return f"<w:r>{properties}{_text_xml(text)}</w:r>"
+
+
+def _rich_text_xml(text: str) -> str:
+    """Runs for **bold**, *italic*, `code` inside text (see _add_rich_text)."""
+    return "".join(
+        _run_xml(run.text, _RUN_PROPERTIES[run.bold, run.italic, run.code])
+        for run in tokenize(text)
+    )
+
+
+def _paragraph_xml(style_id: str = None, content: str = "", centered: bool = False) -> str:
+    if style_id is None:
+        return f"<w:p>{content}</w:p>" if content else "<w:p/>"
+    align = '<w:jc w:val="center"/>' if centered else ""
+    return f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/>{align}</w:pPr>{content}</w:p>'
+
+
+def _table_xml(rows: List[List[str]], style_id: str, block_width: int) -> str:
+    cols = len(rows[0])
+    width = int(round((block_width // cols) / _EMUS_PER_TWIP))
+    cell_properties = f'<w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>'
+
+    parts = [
+        f'<w:tbl><w:tblPr><w:tblStyle w:val="{style_id}"/><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+        'w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>',
+        "<w:tblGrid>" + f'<w:gridCol w:w="{width}"/>' * cols + "</w:tblGrid>",
+    ]
+    for cells in rows:
+        parts.append("<w:tr>")
+        # Cells past the first row's width have no column to go in; they are dropped.
+        for c_idx in range(cols):
+            if c_idx < len(cells):
+                # cell.text = "" leaves an empty run in front of the content
+                content = f"<w:p><w:r/>{_rich_text_xml(cells[c_idx])}</w:p>"
+            else:
+                content = "<w:p/>"
+            parts.append(f"<w:tc>{cell_properties}{content}</w:tc>")
+        parts.append("</w:tr>")
+    parts.append("</w:tbl>")
+    return "".join(parts)
+
+
+def _blocks_xml(blocks: List[Block], style_ids: Dict[str, str], block_width: int) -> Iterator[str]:
+    """Body XML for `blocks`, one string per paragraph or table."""
+    bullet_style, number_style = style_ids["List Bullet"], style_ids["List Number"]
+
+    for block in blocks:
+        btype = block.type
+
+        if btype == "heading":
+            style_id = style_ids["Title" if block.level == 1 else f"Heading {block.level}"]
+            content = _run_xml(block.text) if block.text else ""
+            yield _paragraph_xml(style_id, content, centered=block.level == 1)
+            continue
+
+        if btype == "paragraph":
+            if block.text:
+                yield _paragraph_xml(content=_rich_text_xml(block.text))
+            continue
+
+        if btype == "bullet_list" or btype == "numbered_list":
+            style_id = bullet_style if btype == "bullet_list" else number_style
+            for text in block.items:
+                yield _paragraph_xml(style_id, _rich_text_xml(text))
+            continue
+
+        if btype == "table":
+            if block.rows and block.rows[0]:
+                yield _table_xml(block.rows, style_ids["Table Grid"], block_width)
+            continue
+
+        if btype == "code":
+            content = _run_xml(block.text, _RUN_PROPERTIES[False, False, True]) if block.text else ""
+            yield _paragraph_xml(style_ids["No Spacing"], content)
+            continue
+
+        fallback_text = block.text or str(block.to_dict())
+        if fallback_text.strip():
+            yield _paragraph_xml(content=_rich_text_xml(fallback_text))
+
+
+class DocxTemplate:
+    """
+    The exporter's styled empty document, prepared once per process.
+
+    `_new_document()` is saved a single time and split into a zip of the
+    parts every export shares (styles, numbering, theme, ...) and the text
+    around the title in docProps/core.xml and around the body in
+    word/document.xml. `render` copies that zip and appends the two parts
+    with the document's title and blocks filled in; `stream` sends the same
+    parts through a ZipStream, generating the body as it goes.
+    """
+
+    def __init__(self):
+        self._parts = None
+        self._lock = threading.Lock()
+
+    def render(self, document: WordDocument) -> BytesIO:
+        parts = self.load()
+        core_xml = self._core_xml(parts, document.title)
+        body = _blocks_xml(document.blocks, parts.style_ids, parts.block_width)
+        document_xml = parts.document_head + "".join(body) + parts.document_tail
+
+        buffer = BytesIO(parts.archive)
+        with zipfile.ZipFile(buffer, "a", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(_CORE_PART, core_xml.encode("utf-8"))
+            archive.writestr(_DOCUMENT_PART, document_xml.encode("utf-8"))
+        buffer.seek(0)
+        return buffer
+
+    def stream(self, document: WordDocument, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Same package as `render`, as zip chunks. The title is checked up
+        front; invalid characters in the blocks can only surface while the
+        body is being sent.
+        """
+        parts = self.load()
+        core_xml = self._core_xml(parts, document.title)
+        return self._stream(parts, core_xml, document.blocks, chunk_size)
+
+    def load(self) -> _TemplateParts:
+        """Prepares the template on first use; call ahead of time to keep it off a request."""
+        if self._parts is not None:
+            return self._parts
+        with self._lock:
+            if self._parts is None:
+                self._parts = self._build()
+        return self._parts
+
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    def _core_xml(parts: _TemplateParts, title: str) -> str:
+        if len(title) > 255:
+            raise ValueError(f"exceeded 255 char limit for property, got:\n\n'{title}'")
+        return parts.core_head + _escape(title) + parts.core_tail
+
+    @staticmethod
+    def _stream(parts: _TemplateParts, core_xml: str, blocks: List[Block], chunk_size: int) -> Iterator[bytes]:
+        with track("export", format="docx", mode="stream"):
+            archive = ZipStream(chunk_size)
+            for member in parts.members:
+                yield archive.add(member)
+            yield archive.add(compress(_CORE_PART, core_xml.encode("utf-8")))
+
+            def document_xml():
+                yield parts.document_head
+                yield from _blocks_xml(blocks, parts.style_ids, parts.block_width)
+                yield parts.document_tail
+
+            yield from archive.add_chunks(_DOCUMENT_PART, document_xml())
+            yield archive.close()
+
+
+    @staticmethod
+    def _build() -> _TemplateParts:
+        doc = _new_document()
+        doc.core_properties.title = _TITLE_MARKER
+        section = doc.sections[-1]
+        block_width = section.page_width - section.left_margin - section.right_margin
+        style_ids = {name: doc.styles[name].style_id for name in _STYLE_NAMES}
+
+        saved = BytesIO()
+        doc.save(saved)
+        archive = BytesIO()
+        members = []
+        with zipfile.ZipFile(saved) as source, \
+                zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                if info.filename not in (_DOCUMENT_PART, _CORE_PART):
+                    data = source.read(info)
+                    target.writestr(info, data)
+                    members.append(compress(info.filename, data))
+            document_xml = source.read(_DOCUMENT_PART).decode("utf-8")
+            core_xml = source.read(_CORE_PART).decode("utf-8")
+
+        # The body of the empty document holds only its section properties.
+        body_start = document_xml.index("<w:body>") + len("<w:body>")
+        if not document_xml.startswith("<w:sectPr", body_start):
+            raise RuntimeError("Unexpected body in the base .docx template")
+        core_head, core_tail = core_xml.split(_TITLE_MARKER)
+
+        return _TemplateParts(
+            archive=archive.getvalue(),
+            members=tuple(members),
+            document_head=document_xml[:body_start],
+            document_tail=document_xml[body_start:],
+            core_head=core_head,
+            core_tail=core_tail,
+            style_ids=style_ids,
+            block_width=block_width,
+        )
+
+
+# Single shared instance
+docx_template = DocxTemplate()
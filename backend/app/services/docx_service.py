@@ -1,8 +1,13 @@
 # app/services/docx_service.py
 
 import json
-from typing import List, Dict, Any
-from app.config.llm_client import generate_text
+from typing import List, Dict, Any, AsyncIterator
+from app.config.llm_client import generate_text, agenerate_text, astream_text
+from app.config.llm_schemas import response_format
+from app.config.settings import settings
+from app.utils.concurrency import gather_bounded
+from app.models.document import Block, WordDocument
+from app.utils.json_stream import JsonArrayItemStream, extract_json
 
 
 class DocxService:
@@ -30,10 +35,88 @@ class DocxService:
         """
 
         prompt = DocxService._build_prompt(main_topic, sections)
-        llm_output = generate_text(prompt).strip()
+        llm_output = generate_text(prompt, response_format=response_format("document")).strip()
 
         return DocxService._parse_llm_json(llm_output, main_topic)
 
+    @staticmethod
+    async def acreate_word_content(main_topic: str, sections: List[str]) -> Dict[str, Any]:
+        """
+        Awaitable variant of `create_word_content` that uses the async LLM
+        client, so the caller doesn't tie up a threadpool worker.
+        """
+
+        prompt = DocxService._build_prompt(main_topic, sections)
+        llm_output = (
+            await agenerate_text(prompt, hedge="generate", response_format=response_format("document"))
+        ).strip()
+
+        return DocxService._parse_llm_json(llm_output, main_topic)
+
+    @staticmethod
+    async def acreate_word_content_parallel(
+        main_topic: str, sections: List[str], max_concurrency: int = None
+    ) -> Dict[str, Any]:
+        """
+        Fan-out variant of `acreate_word_content`.
+
+        Each section is generated by its own LLM call (at most
+        `max_concurrency` in flight, default LLM_FANOUT_CONCURRENCY), with the
+        full outline passed along as shared context. Results are assembled in
+        outline order into the usual ``{"title", "blocks"}`` structure, so
+        wall-clock time tracks the slowest section instead of the sum.
+        """
+
+        limit = max_concurrency or settings.LLM_FANOUT_CONCURRENCY
+        section_blocks = await gather_bounded(
+            (DocxService._agenerate_section(main_topic, sections, section) for section in sections),
+            limit,
+        )
+
+        blocks = [{"type": "heading", "level": 1, "text": main_topic}]
+        for section in section_blocks:
+            blocks.extend(section)
+
+        return DocxService._finalize({"title": main_topic, "blocks": blocks})
+
+    @staticmethod
+    async def _agenerate_section(main_topic: str, sections: List[str], section: str) -> List[Dict[str, Any]]:
+        """Internal: generates the blocks for a single section."""
+
+        prompt = DocxService._build_section_prompt(main_topic, sections, section)
+        llm_output = (
+            await agenerate_text(prompt, hedge="generate", response_format=response_format("section"))
+        ).strip()
+
+        return DocxService._parse_section_json(llm_output, section)
+
+    @staticmethod
+    async def astream_word_content(main_topic: str, sections: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams the document as it is generated.
+
+        Yields ``{"event": "block", "data": block}`` for every block as soon
+        as the model has finished writing it, then a single
+        ``{"event": "content", "data": document}`` with the validated result.
+        """
+
+        prompt = DocxService._build_prompt(main_topic, sections)
+        scanner = JsonArrayItemStream("blocks")
+        chunks = []
+
+        stream = astream_text(prompt, response_format=response_format("document"))
+        try:
+            async for delta in stream:
+                chunks.append(delta)
+                for block in scanner.feed(delta):
+                    yield {"event": "block", "data": Block.from_dict(block).to_dict()}
+        finally:
+            # Stop the LLM request right away if our consumer went away.
+            await stream.aclose()
+
+        llm_output = "".join(chunks).strip()
+        yield {"event": "content", "data": DocxService._parse_llm_json(llm_output, main_topic)}
+
     # ----------------------------------------------------------------------
 
     @staticmethod
@@ -73,6 +156,44 @@ JSON FORMAT EXAMPLE:
     {{"type": "paragraph", "text": "Section content..."}}
   ]
 }}
+"""
+
+    @staticmethod
+    def _build_section_prompt(main_topic: str, sections: List[str], section: str) -> str:
+        """
+        Internal: builds the LLM prompt for one section of a fan-out generation.
+        """
+
+        return f"""
+You are a structured document generator AI.
+
+Generate ONLY valid JSON (no explanation, no markdown formatting).
+The JSON should represent ONE section of a Word document.
+
+MAIN TOPIC:
+{main_topic}
+
+FULL OUTLINE (context only — other sections are written separately):
+{json.dumps(sections, indent=2)}
+
+SECTION TO WRITE:
+{section}
+
+REQUIREMENTS:
+- Produce a "blocks" list (sequence matters)
+- First block MUST be a level-2 heading with exactly the section heading above
+- Follow it with a detailed paragraph (5–7 sentences)
+- Stay within this section; don't cover material that belongs to other sections
+- Content must be original and coherent
+- Return ONLY JSON. No extra text.
+
+JSON FORMAT EXAMPLE:
+{{
+  "blocks": [
+    {{"type": "heading", "level": 2, "text": "Section Heading"}},
+    {{"type": "paragraph", "text": "Section content..."}}
+  ]
+}}
 """
 
     # ----------------------------------------------------------------------
@@ -84,11 +205,10 @@ JSON FORMAT EXAMPLE:
         Ensures the result always follows the expected structure.
         """
 
-        # Fix: LLM may include extra text → isolate JSON
+        # LLM may include extra text → pick out the JSON object
         try:
-            cleaned = DocxService._extract_json(llm_output)
-            data = json.loads(cleaned)
-        except Exception:
+            data = extract_json(llm_output, dict)
+        except ValueError:
             raise ValueError("LLM returned invalid JSON:\n" + llm_output)
 
         # Basic validations
@@ -98,23 +218,41 @@ JSON FORMAT EXAMPLE:
         if "title" not in data:
             data["title"] = main_topic
 
-        return data
+        return DocxService._finalize(data)
 
-    # ----------------------------------------------------------------------
+    @staticmethod
+    def _finalize(data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        One normalization pass (canonical block types and fields from here on)
+        plus stable section ids and the section index stored with the config.
+        """
+
+        document = WordDocument.from_dict(data)
+        document.assign_section_ids()
+        return document.to_dict()
 
     @staticmethod
-    def _extract_json(text: str) -> str:
+    def _parse_section_json(llm_output: str, section: str) -> List[Dict[str, Any]]:
         """
-        Extract only the JSON part from LLM output.
-        Works even when LLM adds junk before/after.
+        Extracts the blocks of a single section and makes sure they start with
+        the section's level-2 heading.
         """
 
-        start = text.find("{")
-        end = text.rfind("}") + 1
-        if start == -1 or end == -1:
-            raise ValueError("No JSON object found in LLM output.")
+        try:
+            data = extract_json(llm_output, dict)
+        except ValueError:
+            raise ValueError("LLM returned invalid JSON:\n" + llm_output)
+
+        if "blocks" not in data or not isinstance(data["blocks"], list):
+            raise ValueError("JSON missing 'blocks' list.")
+
+        blocks = [Block.from_dict(block) for block in data["blocks"]]
+        if not blocks or blocks[0].type != "heading":
+            blocks.insert(0, Block("heading", section, level=2))
+        else:
+            blocks[0].level = 2
 
-        return text[start:end]
+        return [block.to_dict() for block in blocks]
 
 
 # Single shared instance (optional)
@@ -0,0 +1,282 @@
+# app/services/export_pool.py
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config.settings import settings
+from app.services.render_cache import render_cache
+from app.utils.metrics import counter, gauge, track
+
+logger = logging.getLogger(__name__)
+
+pending_jobs = gauge("export_pool_pending", "Exports submitted to the process pool and not finished yet.")
+rejected = counter("export_pool_rejected_total", "Exports refused, by reason (full, timeout, broken).")
+
+
+class ExportPoolFull(Exception):
+    """Raised by ExportPool.run when `max_pending` exports are already queued or running."""
+
+
+class ExportTimeout(Exception):
+    """Raised by ExportPool.run when an export misses its deadline."""
+
+
+# ----------------------------------------------------------------------
+# Worker side
+
+
+def render(fmt: str, content: Any) -> bytes:
+    """The .docx/.pptx bytes of a document config, rendered in this process."""
+    if fmt == "docx":
+        from app.services.document_export import export_to_word, stream_word
+        if settings.EXPORT_STREAMING:
+            return b"".join(stream_word(content))
+        return export_to_word(content).getvalue()
+
+    from app.services.ppt_export_service import export_to_ppt, stream_ppt
+    if settings.EXPORT_STREAMING:
+        return b"".join(stream_ppt(content))
+    return export_to_ppt(content).getvalue()
+
+
+def _chunks(fmt: str, content: Any) -> Iterator[bytes]:
+    """The .docx/.pptx of a document config as zip chunks (see stream_word / stream_ppt)."""
+    if fmt == "docx":
+        from app.services.document_export import stream_word
+        return stream_word(content)
+    from app.services.ppt_export_service import stream_ppt
+    return stream_ppt(content)
+
+
+def render_to_cache(fmt: str, content: Any, key: str) -> str:
+    """
+    Writes the file for a document config into the render cache as it is
+    generated, and returns its path. Memory stays flat however large the file.
+    """
+    return render_cache.put(key, fmt, _chunks(fmt, content))[0]
+
+
+def _warm_worker():
+    """Pool initializer: imports and the .docx/.pptx templates are ready before the first job."""
+    # Ctrl+C reaches the whole process group; shutdown is the parent's job.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from app.services.ppt_export_service import pptx_template
+    from app.services.document_export import docx_template
+    pptx_template.load()
+    docx_template.load()
+
+
+def _ping() -> bool:
+    return True
+
+
+def _on_deadline(signum, frame):
+    raise TimeoutError("Export exceeded its deadline")
+
+
+def _with_deadline(deadline: Optional[float], fn: Callable, *args) -> Any:
+    """Runs in a worker. A SIGALRM at `deadline` (wall clock) frees the worker from a runaway export."""
+    alarm = deadline is not None and hasattr(signal, "setitimer")
+    if alarm:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise TimeoutError("Export exceeded its deadline before it started")
+        signal.signal(signal.SIGALRM, _on_deadline)
+        signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        return fn(*args)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# ----------------------------------------------------------------------
+# Parent side
+
+
+class ExportPool:
+    """
+    Renders exports in worker processes so they don't hold the GIL, and with
+    it the event loop, while other requests wait.
+
+    Workers are spawned from the app lifespan and warmed up (python-docx,
+    python-pptx and the .docx/.pptx templates loaded) before traffic arrives. At
+    most `max_pending` exports are queued or running at once; more are
+    refused with ExportPoolFull so callers can answer 503 instead of piling
+    up work. Each export gets `timeout` seconds from submission: the caller
+    stops waiting at the deadline, a job still queued is cancelled, and a
+    running one is interrupted inside its worker (SIGALRM, on Unix).
+
+    Downloads go through `render_to_cache`: the worker writes the file into
+    the render cache as it is generated and only its path comes back, so
+    neither process holds the whole file and nothing large is pickled.
+
+    A worker that dies (e.g. killed for memory) breaks the executor; it is
+    replaced and the exports it held fail.
+
+    With `workers=0` the pool is off and exports run in the thread pool.
+    """
+
+    def __init__(self, workers: int = 1, max_pending: int = 16, timeout: float = 60):
+        self.workers = max(0, workers)
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()  # `_pending` also changes from executor threads
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.refused = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    async def start(self):
+        if not self.enabled or self._executor is not None:
+            return
+        self._executor = self._new_executor()
+        # Submitting one job per worker spawns them all now, so the first
+        # exports don't pay for interpreter start-up and imports.
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+        logger.info("Export pool: %d warm workers", self.workers)
+
+    async def stop(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await run_in_threadpool(executor.shutdown, True, cancel_futures=True)
+
+    async def run(self, fmt: str, content: Any) -> bytes:
+        """
+        The .docx/.pptx bytes for `content`, for responses that can't be
+        served from a file. Prefer `render_to_cache`: the bytes of a large
+        export are held by the worker and pickled back here.
+
+        Raises
+        ------
+        ExportPoolFull
+            If `max_pending` exports are already queued or running.
+        ExportTimeout
+            If the export did not finish within `timeout` seconds.
+        """
+        if not self.enabled:
+            return await run_in_threadpool(render, fmt, content)
+        return await self._submit(fmt, render, fmt, content)
+
+    async def render_to_cache(self, fmt: str, content: Any, key: str) -> Tuple[str, os.stat_result]:
+        """
+        Renders `content` into the render cache under `key` and returns
+        (path, stat) of the file. The worker streams the file to disk as it
+        is generated and hands back only the path. Raises like `run`.
+        """
+        if self.enabled:
+            await self._submit(fmt, render_to_cache, fmt, content, key)
+        else:
+            await run_in_threadpool(render_to_cache, fmt, content, key)
+
+        cached = await run_in_threadpool(render_cache.get, key, fmt)
+        if cached is None:
+            raise RuntimeError(f"Rendered {fmt} was evicted from the render cache before it was served")
+        return cached
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "running": self._executor is not None,
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "timeout": self.timeout,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "refused": self.refused,
+            }
+
+    # ----------------------------------------------------------------------
+
+    async def _submit(self, fmt: str, fn: Callable, *args) -> Any:
+        if self._executor is None:
+            raise RuntimeError("Export pool is not running")
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.refused += 1
+                rejected.inc(reason="full")
+                raise ExportPoolFull(f"Export pool is busy ({self.max_pending} exports pending)")
+            self._pending += 1
+            pending_jobs.set(self._pending)
+
+        deadline = time.time() + self.timeout if self.timeout else None
+        executor = self._executor
+        try:
+            future = executor.submit(_with_deadline, deadline, fn, *args)
+        except BrokenProcessPool:
+            self._job_done(None)
+            self._replace_executor(executor)
+            rejected.inc(reason="broken")
+            raise
+        future.add_done_callback(self._job_done)
+
+        try:
+            with track("export", format=fmt, mode="pool"):
+                return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout or None)
+        except (asyncio.TimeoutError, TimeoutError):
+            rejected.inc(reason="timeout")
+            with self._lock:
+                self.timed_out += 1
+            raise ExportTimeout(f"Export did not finish within {self.timeout:g}s")
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            rejected.inc(reason="broken")
+            raise
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # "spawn": forking a process that runs an event loop and threads is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+
+    def _job_done(self, future: Optional[Future]):
+        with self._lock:
+            self._pending -= 1
+            pending_jobs.set(self._pending)
+            if future is None or future.cancelled():
+                return
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def _replace_executor(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is not broken:
+                return  # already replaced by another caller
+            logger.error("Export pool broken (a worker died); starting a new one")
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+# Single shared instance
+export_pool = ExportPool(
+    workers=settings.EXPORT_POOL_WORKERS,
+    max_pending=settings.EXPORT_POOL_MAX_PENDING,
+    timeout=settings.EXPORT_TIMEOUT,
+)
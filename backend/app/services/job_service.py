@@ -0,0 +1,205 @@
+# app/services/job_service.py
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config.settings import settings
+from app.utils.metrics import counter, gauge, histogram, track
+
+logger = logging.getLogger(__name__)
+
+queue_depth = gauge("jobs_queue_depth", "Jobs waiting for a worker.")
+wait_seconds = histogram("jobs_wait_seconds", "Time jobs spent queued before a worker picked them up.")
+rejected = counter("jobs_rejected_total", "Jobs refused because the queue was full.")
+
+
+class JobQueueFull(Exception):
+    """Raised by JobQueue.submit when no more jobs can be queued."""
+
+
+class Job:
+    """One unit of background work and its outcome."""
+
+    __slots__ = (
+        "id", "kind", "user_id", "fn", "status", "result", "error", "status_code",
+        "created_at", "started_at", "finished_at",
+    )
+
+    def __init__(self, kind: str, user_id: str, fn: Callable[[], Awaitable[dict]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.user_id = user_id
+        self.fn = fn
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+        }
+
+
+class JobQueue:
+    """
+    Bounded in-process queue of generation/refinement jobs.
+
+    A fixed pool of asyncio workers (started from the app lifespan) drains the
+    queue, so long LLM calls run independently of the HTTP request that
+    submitted them. Finished jobs are kept for `result_ttl` seconds so
+    clients can poll for the outcome.
+
+    Jobs live in the memory of this worker process only: nothing is shared
+    between uvicorn workers and nothing survives a restart. With more than
+    one worker (`--workers N`, gunicorn) a poll can land on a process that
+    never saw the job and gets 404, so run the API as a single worker
+    process when background jobs are used, or pin clients to a worker with
+    sticky sessions.
+    """
+
+    def __init__(self, workers: int = 4, max_size: int = 100, result_ttl: float = 3600):
+        self.workers = max(1, workers)
+        self.max_size = max_size
+        self.result_ttl = result_ttl
+
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.completed = 0
+        self.failed = 0
+
+    # ----------------------------------------------------------------------
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Anything still queued will never run in this process.
+        for job in self._jobs.values():
+            if job.status == "queued":
+                self._finish(job, "failed", error="Server shut down before the job started", status_code=503)
+        queue_depth.set(0)
+
+    def submit(self, kind: str, user_id: str, fn: Callable[[], Awaitable[dict]]) -> Job:
+        """
+        Queues `fn` (a zero-argument coroutine factory) and returns the Job.
+
+        Raises
+        ------
+        JobQueueFull
+            If the queue already holds `max_size` jobs.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        self._prune()
+
+        job = Job(kind, user_id, fn)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            rejected.inc(kind=kind)
+            raise JobQueueFull(f"Job queue is full ({self.max_size} jobs waiting)")
+
+        self._jobs[job.id] = job
+        queue_depth.set(self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        statuses = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": len(self._tasks),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "jobs": statuses,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    # ----------------------------------------------------------------------
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            queue_depth.set(self._queue.qsize())
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = "running"
+        job.started_at = time.time()
+        wait_seconds.observe(job.started_at - job.created_at, kind=job.kind)
+
+        try:
+            with track("jobs", kind=job.kind):
+                result = await job.fn()
+        except asyncio.CancelledError:
+            self._finish(job, "failed", error="Job cancelled", status_code=503)
+            raise
+        except HTTPException as e:
+            self._finish(job, "failed", error=e.detail, status_code=e.status_code)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            self._finish(job, "failed", error=str(e), status_code=500)
+        else:
+            self._finish(job, "succeeded", result=result)
+
+    def _finish(self, job: Job, status: str, result=None, error=None, status_code=None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.status_code = status_code
+        job.finished_at = time.time()
+        job.fn = None  # drop the closure (request payloads) once it has run
+        if status == "succeeded":
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    max_size=settings.JOB_QUEUE_MAX_SIZE,
+    result_ttl=settings.JOB_RESULT_TTL,
+)
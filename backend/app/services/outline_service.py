@@ -2,7 +2,9 @@
 
 import json
 from typing import List, Dict, Any
-from app.config.llm_client import generate_text
+from app.config.llm_client import generate_text, agenerate_text
+from app.config.llm_schemas import response_format
+from app.utils.json_stream import extract_json
 
 
 class OutlineService:
@@ -12,7 +14,7 @@ class OutlineService:
     """
 
     @staticmethod
-    def suggest_word_sections(topic: str) -> List[str]:
+    def suggest_word_sections(topic: str, use_cache: bool = True) -> List[str]:
         """
         Suggests section headings for a Word document based on the topic.
 
@@ -20,6 +22,8 @@ class OutlineService:
         ----------
         topic : str
             The main topic of the document.
+        use_cache : bool, optional
+            Set to False to ask the LLM for a fresh suggestion.
 
         Returns
         -------
@@ -27,11 +31,13 @@ class OutlineService:
             A list of suggested section headings.
         """
         prompt = OutlineService._build_word_prompt(topic)
-        llm_output = generate_text(prompt).strip()
+        llm_output = generate_text(
+            prompt, use_cache=use_cache, response_format=response_format("word_outline")
+        ).strip()
         return OutlineService._parse_sections(llm_output)
 
     @staticmethod
-    def suggest_ppt_slides(topic: str) -> List[str]:
+    def suggest_ppt_slides(topic: str, use_cache: bool = True) -> List[str]:
         """
         Suggests slide titles for a PowerPoint presentation based on the topic.
 
@@ -39,6 +45,8 @@ class OutlineService:
         ----------
         topic : str
             The main topic of the presentation.
+        use_cache : bool, optional
+            Set to False to ask the LLM for a fresh suggestion.
 
         Returns
         -------
@@ -46,7 +54,27 @@ class OutlineService:
             A list of suggested slide titles.
         """
         prompt = OutlineService._build_ppt_prompt(topic)
-        llm_output = generate_text(prompt).strip()
+        llm_output = generate_text(
+            prompt, use_cache=use_cache, response_format=response_format("ppt_outline")
+        ).strip()
+        return OutlineService._parse_slides(llm_output)
+
+    @staticmethod
+    async def asuggest_word_sections(topic: str, use_cache: bool = True) -> List[str]:
+        """Awaitable variant of `suggest_word_sections`."""
+        prompt = OutlineService._build_word_prompt(topic)
+        llm_output = (await agenerate_text(
+            prompt, use_cache=use_cache, hedge="outline", response_format=response_format("word_outline")
+        )).strip()
+        return OutlineService._parse_sections(llm_output)
+
+    @staticmethod
+    async def asuggest_ppt_slides(topic: str, use_cache: bool = True) -> List[str]:
+        """Awaitable variant of `suggest_ppt_slides`."""
+        prompt = OutlineService._build_ppt_prompt(topic)
+        llm_output = (await agenerate_text(
+            prompt, use_cache=use_cache, hedge="outline", response_format=response_format("ppt_outline")
+        )).strip()
         return OutlineService._parse_slides(llm_output)
 
     # ----------------------------------------------------------------------
@@ -111,8 +139,7 @@ Return ONLY the JSON array:
         """
         try:
             # Try to extract JSON array
-            cleaned = OutlineService._extract_json_array(llm_output)
-            sections = json.loads(cleaned)
+            sections = OutlineService._unwrap_list(extract_json(llm_output))
             
             if isinstance(sections, list) and all(isinstance(s, str) for s in sections):
                 return [s.strip() for s in sections if s.strip()]
@@ -147,32 +174,20 @@ Return ONLY the JSON array:
         return OutlineService._parse_sections(llm_output)
 
     @staticmethod
-    def _extract_json_array(text: str) -> str:
+    def _unwrap_list(value: Any) -> Any:
         """
-        Extracts a JSON array from text, handling various formats.
+        Returns the outline list from a parsed JSON value: the array itself,
+        or the "sections"/"slides" list of an object (JSON modes always
+        answer with an object).
         """
-        # Try to find JSON array
-        start = text.find('[')
-        end = text.rfind(']') + 1
-        
-        if start != -1 and end > start:
-            return text[start:end]
-        
-        # If no array found, try to find JSON object with sections/slides key
-        start = text.find('{')
-        end = text.rfind('}') + 1
-        
-        if start != -1 and end > start:
-            try:
-                obj = json.loads(text[start:end])
-                if 'sections' in obj:
-                    return json.dumps(obj['sections'])
-                elif 'slides' in obj:
-                    return json.dumps(obj['slides'])
-            except:
-                pass
-        
-        raise ValueError("No JSON array found in output")
+        if isinstance(value, dict):
+            for key in ("sections", "slides"):
+                if key in value:
+                    return value[key]
+            lists = [v for v in value.values() if isinstance(v, list)]
+            if len(lists) == 1:
+                return lists[0]
+        return value
 
 
 # Single shared instance
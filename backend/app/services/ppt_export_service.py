@@ -1,77 +1,152 @@
 # app/services/ppt_export_service.py
 
+import re
+import threading
+import zipfile
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_PARAGRAPH_ALIGNMENT
 from pptx.dml.color import RGBColor
 from io import BytesIO
-import re
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, NamedTuple, Tuple, Union
+from app.config.settings import settings
+from app.models.document import Presentation as PresentationModel, Slide
+from app.utils.inline_markdown import tokenize
+from app.utils.metrics import track
+from app.utils.zip_stream import ZipMember, ZipStream, compress
 
+# Bump whenever the generated .pptx changes for the same input; it is part
+# of the render cache key (app/services/render_cache.py).
+EXPORTER_VERSION = 5
 
-def _apply_rich_text(run, text: str):
-    """Parse and apply simple markdown styles like bold, italic, underline."""
-    if not text:
-        return
+# Font sizes, set on every run: PowerPoint applies a paragraph's default run
+# properties (<a:defRPr>) only to text typed later, not to existing runs.
+_TITLE_SIZE = Pt(40)
+_SUBTITLE_SIZE = Pt(20)
+_BULLET_SIZE = Pt(20)
+_CODE_SIZE = Pt(14)
+_CODE_COLOR = RGBColor(80, 80, 80)
 
-    patterns = [
-        (r"\*\*(.*?)\*\*", "bold"),        # **bold**
-        (r"__(.*?)__", "bold"),            # __bold__
-        (r"\*(.*?)\*", "italic"),          # *italic*
-        (r"_(.*?)_", "italic"),            # _italic_
-        (r"`(.*?)`", "code")               # `code`
-    ]
-
-    # Split text into segments
-    parts = [text]
-    for pattern, style in patterns:
-        new_parts = []
-        for part in parts:
-            if isinstance(part, str):
-                matches = list(re.finditer(pattern, part))
-                if not matches:
-                    new_parts.append(part)
-                    continue
-                pos = 0
-                for m in matches:
-                    if m.start() > pos:
-                        new_parts.append(part[pos:m.start()])
-                    new_parts.append((m.group(1), style))
-                    pos = m.end()
-                if pos < len(part):
-                    new_parts.append(part[pos:])
-            else:
-                new_parts.append(part)
-        parts = new_parts
-
-    # Apply style to PPTX run objects
-    for part in parts:
-        if isinstance(part, tuple):
-            content, style = part
-            r = run.text_frame.add_paragraph().add_run()
-            r.text = content
-            if style == "bold":
-                r.font.bold = True
-            elif style == "italic":
-                r.font.italic = True
-            elif style == "code":
-                r.font.name = "Consolas"
-                r.font.size = Pt(14)
-                r.font.color.rgb = RGBColor(80, 80, 80)
-        else:
-            r = run.text_frame.add_paragraph().add_run()
-            r.text = part
-
-
-def export_to_ppt(presentation_data: Dict[str, Any]) -> BytesIO:
+# Like TextFrame.text / _Paragraph.text: "\n" and "\v" become line breaks
+_LINE_BREAKS = re.compile("\n|\v")
+
+
+def _add_text(paragraph, text: str, size, bold: bool = False, italic: bool = False, code: bool = False):
+    """
+    Runs for `text` with one set of font properties, line breaks as <a:br/>.
+    Set the paragraph's properties before: breaks are appended as they come.
+    """
+    for idx, piece in enumerate(_LINE_BREAKS.split(text)):
+        if idx > 0:
+            paragraph.add_line_break()
+        if not piece:
+            continue
+        r = paragraph.add_run()
+        r.text = piece
+        font = r.font
+        font.size = _CODE_SIZE if code else size
+        if bold:
+            font.bold = True
+        if italic:
+            font.italic = True
+        if code:
+            font.name = "Consolas"
+            font.color.rgb = _CODE_COLOR
+
+
+def _apply_rich_text(paragraph, text: str):
+    """Fills a bullet paragraph with runs for **bold**, *italic* and `code` markup."""
+    for run in tokenize(text):
+        _add_text(paragraph, run.text, _BULLET_SIZE, run.bold, run.italic, run.code)
+
+
+@track("export", format="pptx")
+def export_to_ppt(presentation_data: Union[Dict[str, Any], PresentationModel]) -> BytesIO:
     """
     Converts structured PPT JSON (from PptService) into an actual .pptx file.
     """
+    presentation = PresentationModel.coerce(presentation_data)
+    if settings.PPTX_EXPORT_ENGINE == "python-pptx":
+        return _export_with_python_pptx(presentation)
+    return pptx_template.render(presentation)
+
+
+def stream_ppt(presentation_data: Union[Dict[str, Any], PresentationModel], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    The .pptx of `export_to_ppt` as zip chunks, for a StreamingResponse.
+
+    With the template engine each slide is generated and compressed only
+    when its turn comes. With python-pptx the slides are still built as
+    objects, but the package is never saved as a whole: each part is
+    serialized and compressed in turn, so the zip and the serialized parts
+    are not held in memory next to the object tree.
+    """
+    presentation = PresentationModel.coerce(presentation_data)
+    if settings.PPTX_EXPORT_ENGINE == "python-pptx":
+        prs = _build_presentation(presentation)
+        return _stream_package(prs, chunk_size)
+    return pptx_template.stream(presentation, chunk_size)
+
+
+def _export_with_python_pptx(presentation: PresentationModel) -> BytesIO:
+    prs = _build_presentation(presentation)
+
+    # ---------------------------------------------------------
+    # OUTPUT BUFFER
+    # ---------------------------------------------------------
+    buffer = BytesIO()
+    prs.save(buffer)
+    buffer.seek(0)
+
+    return buffer
+
+
+def _stream_package(prs, chunk_size: int) -> Iterator[bytes]:
+    """
+    python-pptx's PackageWriter, one part at a time through a ZipStream.
+
+    This leans on python-pptx internals, imported here rather than at module
+    load so a release that moves them can't break importing the API; the
+    deck is then saved whole and sent in chunks instead.
+    """
+    try:
+        from pptx.opc.oxml import serialize_part_xml
+        from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+        from pptx.opc.serialized import _ContentTypesItem
+
+        package = prs.part.package
+        package_rels = package._rels
+    except (ImportError, AttributeError):
+        with track("export", format="pptx", mode="stream"):
+            yield from _stream_saved(prs, chunk_size)
+        return
+
+    with track("export", format="pptx", mode="stream"):
+        parts = tuple(package.iter_parts())
+        archive = ZipStream(chunk_size)
+        content_types = serialize_part_xml(_ContentTypesItem.xml_for(parts))
+        yield archive.add(compress(CONTENT_TYPES_URI.membername, content_types))
+        yield archive.add(compress(PACKAGE_URI.rels_uri.membername, package_rels.xml))
+        for part in parts:
+            yield archive.add(compress(part.partname.membername, part.blob))
+            if len(part.rels):
+                yield archive.add(compress(part.partname.rels_uri.membername, part.rels.xml))
+        yield archive.close()
+
+
+def _stream_saved(prs, chunk_size: int) -> Iterator[bytes]:
+    buffer = BytesIO()
+    prs.save(buffer)
+    data = buffer.getbuffer()
+    for start in range(0, len(data), chunk_size):
+        yield bytes(data[start:start + chunk_size])
+
 
+def _build_presentation(presentation: PresentationModel):
     prs = Presentation()
 
-    topic = presentation_data.get("topic", "Untitled Presentation")
-    slides_data = presentation_data.get("slides", [])
+    topic = presentation.topic
+    slides_data = presentation.slides
 
     # ---------------------------------------------------------
     # TITLE SLIDE
@@ -82,15 +157,18 @@ def export_to_ppt(presentation_data: Dict[str, Any]) -> BytesIO:
     title = slide.shapes.title
     subtitle = slide.placeholders[1] if len(slide.placeholders) > 1 else None
 
-    title.text = topic
-    title.text_frame.paragraphs[0].font.size = Pt(40)
-    title.text_frame.paragraphs[0].font.bold = True
-    title.text_frame.paragraphs[0].alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+    for idx, line in enumerate(topic.split("\n")):
+        p = title.text_frame.paragraphs[0] if idx == 0 else title.text_frame.add_paragraph()
+        p.font.size = _TITLE_SIZE
+        p.font.bold = True
+        p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+        _add_text(p, line, _TITLE_SIZE, bold=True)
 
     if subtitle:
-        subtitle.text = "Generated by AI"
-        subtitle.text_frame.paragraphs[0].font.size = Pt(20)
-        subtitle.text_frame.paragraphs[0].alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+        p = subtitle.text_frame.paragraphs[0]
+        p.font.size = _SUBTITLE_SIZE
+        p.alignment = PP_PARAGRAPH_ALIGNMENT.CENTER
+        _add_text(p, "Generated by AI", _SUBTITLE_SIZE)
 
     # ---------------------------------------------------------
     # CONTENT SLIDES
@@ -102,25 +180,274 @@ def export_to_ppt(presentation_data: Dict[str, Any]) -> BytesIO:
 
         # Slide Title
         shape = slide.shapes.title
-        shape.text = slide_data.get("title", "Untitled Slide")
+        shape.text = slide_data.title or "Untitled Slide"
 
-        # Bullets
+        # Bullets (the first one goes into the paragraph clear() leaves)
         body_shape = slide.shapes.placeholders[1]
         text_frame = body_shape.text_frame
         text_frame.clear()
 
-        bullets = slide_data.get("bullets", [])
-        for bullet in bullets:
-            p = text_frame.add_paragraph()
-            p.text = bullet
+        for idx, bullet in enumerate(slide_data.bullets):
+            p = text_frame.paragraphs[0] if idx == 0 else text_frame.add_paragraph()
+            # pPr first: add_line_break() appends, and <a:pPr> must lead the paragraph
             p.level = 0
-            p.font.size = Pt(20)
+            p.font.size = _BULLET_SIZE
+            _apply_rich_text(p, bullet)
 
-    # ---------------------------------------------------------
-    # OUTPUT BUFFER
-    # ---------------------------------------------------------
-    buffer = BytesIO()
-    prs.save(buffer)
-    buffer.seek(0)
+    return prs
 
-    return buffer
+
+# ----------------------------------------------------------------------
+# Template engine: slide XML written as text into a prepared package
+# ----------------------------------------------------------------------
+
+_CONTENT_TYPES_PART = "[Content_Types].xml"
+_PRESENTATION_PART = "ppt/presentation.xml"
+_PRESENTATION_RELS_PART = "ppt/_rels/presentation.xml.rels"
+_SLIDE_PART = "ppt/slides/slide{}.xml"
+_SLIDE_RELS_PART = "ppt/slides/_rels/slide{}.xml.rels"
+
+# Stand-ins for the generated text in the reference deck the template is cut from
+_TOPIC_MARKER = "@@TOPIC@@"
+_TITLE_MARKER = "@@TITLE@@"
+_BULLET_MARKER = "@@BULLET@@"
+
+# Control characters python-pptx writes as "_xHHHH_"; what lxml would still
+# refuse after that is an error, as with python-pptx.
+_CONTROL_CHARS = re.compile("[\x00-\x08\x0b-\x1f]")
+_INVALID_XML = re.compile("[\ud800-\udfff\ufffe\uffff]")
+
+_SLIDE_OVERRIDE = (
+    '<Override PartName="/ppt/slides/slide{}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.presentationml.slide+xml"/>'
+)
+_SLIDE_RELATIONSHIP = (
+    '<Relationship Id="rId{}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide" '
+    'Target="slides/slide{}.xml"/>'
+)
+_SLIDE_ID = '<p:sldId id="{}" r:id="rId{}"/>'
+_FIRST_SLIDE_ID = 256
+
+_CODE_PROPERTIES = (
+    '<a:solidFill><a:srgbClr val="{}"/></a:solidFill><a:latin typeface="Consolas"/>'.format(_CODE_COLOR)
+)
+
+_TITLE_RUN_PROPERTIES = f'<a:rPr sz="{_TITLE_SIZE.centipoints}" b="1"/>'
+_TITLE_PARAGRAPH_PROPERTIES = f'<a:pPr algn="ctr"><a:defRPr sz="{_TITLE_SIZE.centipoints}" b="1"/></a:pPr>'
+_BULLET_PARAGRAPH_PROPERTIES = f'<a:pPr><a:defRPr sz="{_BULLET_SIZE.centipoints}"/></a:pPr>'
+
+# rPr of a bullet run by (bold, italic, code), as _add_text sets it
+_RUN_PROPERTIES = {}
+for _bold in (False, True):
+    for _italic in (False, True):
+        for _code in (False, True):
+            _attributes = f' sz="{(_CODE_SIZE if _code else _BULLET_SIZE).centipoints}"'
+            _attributes += ' b="1"' if _bold else ""
+            _attributes += ' i="1"' if _italic else ""
+            _RUN_PROPERTIES[_bold, _italic, _code] = (
+                f"<a:rPr{_attributes}>{_CODE_PROPERTIES}</a:rPr>" if _code else f"<a:rPr{_attributes}/>"
+            )
+
+
+class _TemplateParts(NamedTuple):
+    archive: bytes          # zip with every part that is the same in each deck
+    members: Tuple[ZipMember, ...]  # the same parts, compressed for ZipStream
+    content_types: Tuple[str, str]  # [Content_Types].xml around the slide overrides
+    presentation: Tuple[str, str]   # ppt/presentation.xml around the slide id list
+    presentation_rels: Tuple[str, str]  # its rels around the slide relationships
+    first_slide_rid: int    # relationship ids of slides follow the template's own
+    title_slide: Tuple[str, str]    # slide XML around the topic paragraphs
+    title_slide_rels: bytes
+    bullet_slide: Tuple[str, str, str]  # slide XML around the title and the bullets
+    bullet_slide_rels: bytes
+
+
+def _escape(text: str) -> str:
+    if _INVALID_XML.search(text):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if _CONTROL_CHARS.search(text):
+        text = _CONTROL_CHARS.sub(lambda m: "_x%04X_" % ord(m.group()), text)
+    return text
+
+
+def _text_xml(text: str, properties: str = "") -> str:
+    """Runs and line breaks for `text`, as _add_text and _Paragraph.text write them."""
+    if "\n" in text or "\v" in text:
+        return "<a:br/>".join(_text_xml(piece, properties) for piece in _LINE_BREAKS.split(text))
+    return f"<a:r>{properties}<a:t>{_escape(text)}</a:t></a:r>" if text else ""
+
+
+def _bullet_xml(text: str) -> str:
+    runs = "".join(_text_xml(run.text, _RUN_PROPERTIES[run.bold, run.italic, run.code]) for run in tokenize(text))
+    return f"<a:p>{_BULLET_PARAGRAPH_PROPERTIES}{runs}</a:p>"
+
+
+def _slide_xml(parts: _TemplateParts, slide: Slide) -> str:
+    head, middle, tail = parts.bullet_slide
+    # shape.text: one paragraph per line
+    title = "".join(
+        f"<a:p>{_text_xml(line)}</a:p>" if line else "<a:p/>"
+        for line in (slide.title or "Untitled Slide").split("\n")
+    )
+    bullets = "".join(map(_bullet_xml, slide.bullets)) or "<a:p/>"
+    return f"{head}{title}{middle}{bullets}{tail}"
+
+
+def _cut(xml: str, *markers: str) -> Tuple[str, ...]:
+    """`xml` split around the paragraphs holding `markers`, in order."""
+    pieces = []
+    start = 0
+    for marker in markers:
+        at = xml.index(marker, start)
+        p_start = xml.rindex("<a:p>", start, at)
+        pieces.append(xml[start:p_start])
+        start = xml.index("</a:p>", at) + len("</a:p>")
+    pieces.append(xml[start:])
+    return tuple(pieces)
+
+
+def _around(xml: str, first: str, last: str) -> Tuple[str, str]:
+    """`xml` without everything from `first` through the end of `last`."""
+    return xml[:xml.index(first)], xml[xml.index(last) + len(last):]
+
+
+class PptxTemplate:
+    """
+    The exporter's base deck, prepared once per process.
+
+    A reference deck (a title slide and one bullet slide with marker text)
+    is built through `_build_presentation` a single time. Parts that are
+    the same in every deck (master, layouts, theme, ...) become a zip of
+    their own; the parts that depend on the slide count and the slide XML
+    are cut into the text around the slide entries and the generated
+    paragraphs. So the layouts and placeholders are resolved once, and a
+    render only writes paragraph XML: `render` copies the zip and appends
+    the rest, `stream` sends the same parts one slide at a time.
+    """
+
+    def __init__(self):
+        self._parts = None
+        self._lock = threading.Lock()
+
+    def render(self, presentation: PresentationModel) -> BytesIO:
+        parts = self.load()
+        buffer = BytesIO(parts.archive)
+        with zipfile.ZipFile(buffer, "a", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, data in self._generated_parts(parts, presentation):
+                archive.writestr(name, data)
+        buffer.seek(0)
+        return buffer
+
+    def stream(self, presentation: PresentationModel, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Same package as `render`, as zip chunks. Invalid characters in the
+        slides can only surface while they are being sent.
+        """
+        return self._stream(self.load(), presentation, chunk_size)
+
+    def load(self) -> _TemplateParts:
+        """Prepares the template on first use; call ahead of time to keep it off a request."""
+        if self._parts is not None:
+            return self._parts
+        with self._lock:
+            if self._parts is None:
+                self._parts = self._build()
+        return self._parts
+
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    def _generated_parts(parts: _TemplateParts, presentation: PresentationModel) -> Iterator[Tuple[str, bytes]]:
+        """(member name, data) of the parts that depend on the slides, slides last."""
+        count = len(presentation.slides) + 1
+        numbers = range(1, count + 1)
+        rids = range(parts.first_slide_rid, parts.first_slide_rid + count)
+
+        # python-pptx sorts overrides by part name, so slide10 comes before slide2
+        head, tail = parts.content_types
+        overrides = "".join(_SLIDE_OVERRIDE.format(n) for n in sorted(numbers, key=str))
+        yield _CONTENT_TYPES_PART, (head + overrides + tail).encode("utf-8")
+
+        head, tail = parts.presentation
+        ids = "".join(_SLIDE_ID.format(_FIRST_SLIDE_ID + i, rid) for i, rid in enumerate(rids))
+        yield _PRESENTATION_PART, (head + ids + tail).encode("utf-8")
+
+        head, tail = parts.presentation_rels
+        relationships = "".join(_SLIDE_RELATIONSHIP.format(rid, n) for rid, n in zip(rids, numbers))
+        yield _PRESENTATION_RELS_PART, (head + relationships + tail).encode("utf-8")
+
+        head, tail = parts.title_slide
+        topic = "".join(
+            f"<a:p>{_TITLE_PARAGRAPH_PROPERTIES}{_text_xml(line, _TITLE_RUN_PROPERTIES)}</a:p>"
+            for line in presentation.topic.split("\n")
+        )
+        yield _SLIDE_PART.format(1), (head + topic + tail).encode("utf-8")
+        yield _SLIDE_RELS_PART.format(1), parts.title_slide_rels
+
+        for n, slide in enumerate(presentation.slides, start=2):
+            yield _SLIDE_PART.format(n), _slide_xml(parts, slide).encode("utf-8")
+            yield _SLIDE_RELS_PART.format(n), parts.bullet_slide_rels
+
+    @staticmethod
+    def _stream(parts: _TemplateParts, presentation: PresentationModel, chunk_size: int) -> Iterator[bytes]:
+        with track("export", format="pptx", mode="stream"):
+            archive = ZipStream(chunk_size)
+            for member in parts.members:
+                yield archive.add(member)
+            for name, data in PptxTemplate._generated_parts(parts, presentation):
+                yield archive.add(compress(name, data))
+            yield archive.close()
+
+    @staticmethod
+    def _build() -> _TemplateParts:
+        reference = PresentationModel(_TOPIC_MARKER, [Slide(_TITLE_MARKER, [_BULLET_MARKER])])
+        saved = _export_with_python_pptx(reference)
+
+        generated = {_CONTENT_TYPES_PART, _PRESENTATION_PART, _PRESENTATION_RELS_PART}
+        generated.update(_SLIDE_PART.format(n) for n in (1, 2))
+        generated.update(_SLIDE_RELS_PART.format(n) for n in (1, 2))
+
+        archive = BytesIO()
+        members = []
+        with zipfile.ZipFile(saved) as source, \
+                zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                if info.filename not in generated:
+                    data = source.read(info)
+                    target.writestr(info, data)
+                    members.append(compress(info.filename, data))
+            xml = {name: source.read(name).decode("utf-8") for name in generated}
+
+        first_override = _SLIDE_OVERRIDE.format(1)
+        last_override = _SLIDE_OVERRIDE.format(2)
+        first_rid = int(re.search(r'<p:sldId id="256" r:id="rId(\d+)"/>', xml[_PRESENTATION_PART]).group(1))
+        if _SLIDE_ID.format(_FIRST_SLIDE_ID + 1, first_rid + 1) not in xml[_PRESENTATION_PART]:
+            raise RuntimeError("Unexpected slide ids in the base .pptx template")
+
+        presentation_rels = xml[_PRESENTATION_RELS_PART]
+        first_relationship = _SLIDE_RELATIONSHIP.format(first_rid, 1)
+        last_relationship = _SLIDE_RELATIONSHIP.format(first_rid + 1, 2)
+        if not presentation_rels.endswith(last_relationship + "</Relationships>"):
+            raise RuntimeError("Unexpected relationships in the base .pptx template")
+
+        return _TemplateParts(
+            archive=archive.getvalue(),
+            members=tuple(members),
+            content_types=_around(xml[_CONTENT_TYPES_PART], first_override, last_override),
+            presentation=_around(
+                xml[_PRESENTATION_PART], _SLIDE_ID.format(_FIRST_SLIDE_ID, first_rid),
+                _SLIDE_ID.format(_FIRST_SLIDE_ID + 1, first_rid + 1),
+            ),
+            presentation_rels=_around(presentation_rels, first_relationship, last_relationship),
+            first_slide_rid=first_rid,
+            title_slide=_cut(xml[_SLIDE_PART.format(1)], _TOPIC_MARKER),
+            title_slide_rels=xml[_SLIDE_RELS_PART.format(1)].encode("utf-8"),
+            bullet_slide=_cut(xml[_SLIDE_PART.format(2)], _TITLE_MARKER, _BULLET_MARKER),
+            bullet_slide_rels=xml[_SLIDE_RELS_PART.format(2)].encode("utf-8"),
+        )
+
+
+# Single shared instance
+pptx_template = PptxTemplate()
@@ -1,8 +1,13 @@
 # app/services/ppt_service.py
 
 import json
-from typing import List, Dict, Any
-from app.config.llm_client import generate_text
+from typing import List, Dict, Any, AsyncIterator
+from app.config.llm_client import generate_text, agenerate_text, astream_text
+from app.config.llm_schemas import response_format
+from app.config.settings import settings
+from app.utils.concurrency import gather_bounded
+from app.models.document import Presentation, Slide
+from app.utils.json_stream import JsonArrayItemStream, extract_json
 
 
 class PptService:
@@ -30,10 +35,83 @@ class PptService:
         """
 
         prompt = PptService._build_prompt(topic, slides)
-        llm_output = generate_text(prompt).strip()
+        llm_output = generate_text(prompt, response_format=response_format("presentation")).strip()
 
         return PptService._parse_llm_json(llm_output)
 
+    @staticmethod
+    async def acreate_ppt_content(topic: str, slides: List[str]) -> Dict[str, Any]:
+        """
+        Awaitable variant of `create_ppt_content` that uses the async LLM
+        client, so the caller doesn't tie up a threadpool worker.
+        """
+
+        prompt = PptService._build_prompt(topic, slides)
+        llm_output = (
+            await agenerate_text(prompt, hedge="generate", response_format=response_format("presentation"))
+        ).strip()
+
+        return PptService._parse_llm_json(llm_output)
+
+    @staticmethod
+    async def acreate_ppt_content_parallel(
+        topic: str, slides: List[str], max_concurrency: int = None
+    ) -> Dict[str, Any]:
+        """
+        Fan-out variant of `acreate_ppt_content`.
+
+        Each slide is generated by its own LLM call (at most `max_concurrency`
+        in flight, default LLM_FANOUT_CONCURRENCY), with the full slide list
+        passed along as shared context. Slides are assembled in outline order
+        into the usual ``{"topic", "slides"}`` structure.
+        """
+
+        limit = max_concurrency or settings.LLM_FANOUT_CONCURRENCY
+        generated = await gather_bounded(
+            (PptService._agenerate_slide(topic, slides, title) for title in slides),
+            limit,
+        )
+
+        return PptService._finalize({"topic": topic, "slides": generated})
+
+    @staticmethod
+    async def _agenerate_slide(topic: str, slides: List[str], title: str) -> Dict[str, Any]:
+        """Internal: generates a single slide."""
+
+        prompt = PptService._build_slide_prompt(topic, slides, title)
+        llm_output = (
+            await agenerate_text(prompt, hedge="generate", response_format=response_format("slide"))
+        ).strip()
+
+        return PptService._parse_slide_json(llm_output, title)
+
+    @staticmethod
+    async def astream_ppt_content(topic: str, slides: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams the presentation as it is generated.
+
+        Yields ``{"event": "slide", "data": slide}`` for every slide as soon
+        as the model has finished writing it, then a single
+        ``{"event": "content", "data": presentation}`` with the validated result.
+        """
+
+        prompt = PptService._build_prompt(topic, slides)
+        scanner = JsonArrayItemStream("slides")
+        chunks = []
+
+        stream = astream_text(prompt, response_format=response_format("presentation"))
+        try:
+            async for delta in stream:
+                chunks.append(delta)
+                for slide in scanner.feed(delta):
+                    yield {"event": "slide", "data": Slide.from_dict(slide).to_dict()}
+        finally:
+            # Stop the LLM request right away if our consumer went away.
+            await stream.aclose()
+
+        llm_output = "".join(chunks).strip()
+        yield {"event": "content", "data": PptService._parse_llm_json(llm_output)}
+
     # ----------------------------------------------------------------------
 
     @staticmethod
@@ -80,6 +158,48 @@ JSON FORMAT EXAMPLE:
     }}
   ]
 }}
+"""
+
+    @staticmethod
+    def _build_slide_prompt(topic: str, slides: List[str], title: str) -> str:
+        """
+        Internal: builds the LLM prompt for one slide of a fan-out generation.
+        """
+
+        return f"""
+You are an AI presentation generator.
+
+Generate ONLY valid JSON (no markdown, no explanation).
+The JSON should represent ONE slide of a PowerPoint presentation.
+
+PRESENTATION TOPIC:
+{topic}
+
+ALL SLIDE TITLES (context only — other slides are written separately):
+{json.dumps(slides, indent=2)}
+
+SLIDE TO WRITE:
+{title}
+
+REQUIREMENTS:
+- JSON must contain:
+    - "title": the slide title above, unchanged
+    - "bullets": list of 3–6 bullet points (short, crisp, clear)
+- Stay within this slide; don't repeat points that belong to other slides
+- Keep language simple and presentation-friendly.
+- NO extra text outside JSON.
+- NO markdown.
+
+JSON FORMAT EXAMPLE:
+
+{{
+  "title": "Introduction",
+  "bullets": [
+    "Point one",
+    "Point two",
+    "Point three"
+  ]
+}}
 """
 
     # ----------------------------------------------------------------------
@@ -91,9 +211,8 @@ JSON FORMAT EXAMPLE:
         """
 
         try:
-            cleaned_json = PptService._extract_json(llm_output)
-            data = json.loads(cleaned_json)
-        except Exception as e:
+            data = extract_json(llm_output, dict)
+        except ValueError as e:
             raise ValueError(f"LLM returned invalid JSON:\n{llm_output}") from e
 
         # Validations
@@ -106,23 +225,37 @@ JSON FORMAT EXAMPLE:
             if "bullets" not in slide or not isinstance(slide["bullets"], list):
                 raise ValueError("Each slide must contain 'bullets' list.")
 
-        return data
+        return PptService._finalize(data)
 
-    # ----------------------------------------------------------------------
+    @staticmethod
+    def _finalize(data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        One normalization pass plus stable slide ids and the section index
+        stored with the config.
+        """
+
+        presentation = Presentation.from_dict(data)
+        presentation.assign_section_ids()
+        return presentation.to_dict()
 
     @staticmethod
-    def _extract_json(text: str) -> str:
+    def _parse_slide_json(llm_output: str, title: str) -> Dict[str, Any]:
         """
-        Extract only the JSON object from the LLM output.
+        Extract and validate a single slide object.
         """
 
-        start = text.find("{")
-        end = text.rfind("}") + 1
+        try:
+            slide = extract_json(llm_output, dict)
+        except ValueError as e:
+            raise ValueError(f"LLM returned invalid JSON:\n{llm_output}") from e
 
-        if start == -1 or end == -1:
-            raise ValueError("No JSON found in LLM output.")
+        if not isinstance(slide, dict):
+            raise ValueError("Slide JSON must be an object.")
+        if "bullets" not in slide or not isinstance(slide["bullets"], list):
+            raise ValueError("Each slide must contain 'bullets' list.")
 
-        return text[start:end]
+        slide["title"] = slide.get("title") or title
+        return Slide.from_dict(slide).to_dict()
 
 
 # Optional instance
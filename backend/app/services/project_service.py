@@ -1,25 +1,39 @@
 from app.config.supabase_client import supabase
+from app.services.version_store import version_store
+from app.utils.metrics import track
 
 class ProjectService:
 
     @staticmethod
     def create_project(user_id: str, title: str, doctype: int):
         """Create a new project entry in Supabase."""
-        response = supabase.table("projects").insert({
-            "user_id": user_id,
-            "title": title,
-            "doctype": doctype
-        }).execute()
+        with track("supabase", table="projects", operation="insert"):
+            response = supabase.table("projects").insert({
+                "user_id": user_id,
+                "title": title,
+                "doctype": doctype
+            }).execute()
 
         return response.data[0]
 
     @staticmethod
-    def create_version(project_id: str, config: dict):
-        """Insert new version with JSON config. Version number is auto-handled by trigger."""
-        response = supabase.table("project_versions").insert({
-            "project_id": project_id,
-            "config": config,
-            "is_current": True
-        }).execute()
+    def create_version(project_id: str, config: dict, parent_version_id: str = None):
+        """
+        Insert new version with JSON config. Version number is auto-handled by trigger.
 
-        return response.data[0]
+        With VERSION_STORAGE=delta a version derived from `parent_version_id`
+        may be stored as a delta; the returned row always carries the full config.
+        """
+        stored, depth = version_store.encode(parent_version_id, config)
+        with track("supabase", table="project_versions", operation="insert"):
+            response = supabase.table("project_versions").insert({
+                "project_id": project_id,
+                "config": stored,
+                "is_current": True
+            }).execute()
+
+        version = response.data[0]
+        version_store.remember(version["id"], config, depth)
+        if stored is not config:
+            version = {**version, "config": config}
+        return version
@@ -1,8 +1,11 @@
 # app/services/refinement_service.py
 
 import json
-from typing import Dict, Any, List
-from app.config.llm_client import generate_text
+from typing import AsyncIterator, Dict, Any, List
+from app.config.llm_client import generate_text, agenerate_text, astream_text
+from app.config.llm_schemas import response_format
+from app.models.document import Block, Slide
+from app.utils.json_stream import JsonArrayItemStream, extract_json
 
 
 class RefinementService:
@@ -27,26 +30,23 @@ class RefinementService:
         List[Dict]
             Refined blocks for the section
         """
-        # Extract heading and paragraphs
-        heading = None
-        paragraphs = []
-        
-        for block in section_blocks:
-            if block.get("type") == "heading":
-                heading = block
-            elif block.get("type") == "paragraph":
-                paragraphs.append(block)
+        prompt, heading = RefinementService._prepare_word_refinement(section_blocks, refinement_prompt)
         
-        # Build prompt for refinement
-        prompt = RefinementService._build_word_refinement_prompt(
-            heading, paragraphs, refinement_prompt
-        )
-        
-        llm_output = generate_text(prompt).strip()
+        llm_output = generate_text(prompt, response_format=response_format("section")).strip()
         refined_blocks = RefinementService._parse_word_refinement(llm_output, heading)
         
         return refined_blocks
 
+    @staticmethod
+    async def arefine_word_section(section_blocks: List[Dict], refinement_prompt: str) -> List[Dict]:
+        """Awaitable variant of `refine_word_section`."""
+        prompt, heading = RefinementService._prepare_word_refinement(section_blocks, refinement_prompt)
+
+        llm_output = (
+            await agenerate_text(prompt, hedge="refine", response_format=response_format("section"))
+        ).strip()
+        return RefinementService._parse_word_refinement(llm_output, heading)
+
     @staticmethod
     def refine_ppt_slide(slide: Dict, refinement_prompt: str) -> Dict:
         """
@@ -65,13 +65,100 @@ class RefinementService:
             Refined slide object
         """
         prompt = RefinementService._build_ppt_refinement_prompt(slide, refinement_prompt)
-        llm_output = generate_text(prompt).strip()
+        llm_output = generate_text(prompt, response_format=response_format("slide")).strip()
         refined_slide = RefinementService._parse_ppt_refinement(llm_output, slide.get("title"))
         
         return refined_slide
 
+    @staticmethod
+    async def arefine_ppt_slide(slide: Dict, refinement_prompt: str) -> Dict:
+        """Awaitable variant of `refine_ppt_slide`."""
+        prompt = RefinementService._build_ppt_refinement_prompt(slide, refinement_prompt)
+        llm_output = (
+            await agenerate_text(prompt, hedge="refine", response_format=response_format("slide"))
+        ).strip()
+        return RefinementService._parse_ppt_refinement(llm_output, slide.get("title"))
+
+    @staticmethod
+    async def astream_word_section(section_blocks: List[Dict], refinement_prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams the refinement of a Word section as it is generated.
+
+        Yields ``{"event": "token", "data": {"index": i, "text": ...}}`` with
+        the text of block `i` as it is written, ``{"event": "block", ...}``
+        for every block once complete, then a single
+        ``{"event": "content", "data": blocks}`` with the validated section.
+        Raises ValueError if the finished output does not parse.
+        """
+        prompt, heading = RefinementService._prepare_word_refinement(section_blocks, refinement_prompt)
+        scanner = JsonArrayItemStream("blocks", root_array=True, text_keys=("text",))
+        chunks = []
+
+        stream = astream_text(prompt, response_format=response_format("section"))
+        try:
+            async for delta in stream:
+                chunks.append(delta)
+                blocks = scanner.feed(delta)
+                for index, text in scanner.take_text():
+                    yield {"event": "token", "data": {"index": index, "text": text}}
+                for block in blocks:
+                    yield {"event": "block", "data": Block.from_dict(block).to_dict()}
+        finally:
+            # Stop the LLM request right away if our consumer went away.
+            await stream.aclose()
+
+        llm_output = "".join(chunks).strip()
+        yield {"event": "content", "data": RefinementService._parse_word_refinement(llm_output, heading)}
+
+    @staticmethod
+    async def astream_ppt_slide(slide: Dict, refinement_prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams the refinement of a PPT slide as it is generated.
+
+        Yields ``token`` events with the text of bullet `index` as it is
+        written, a ``bullet`` event per finished bullet, then ``content``
+        with the validated slide. Raises ValueError if the output does not parse.
+        """
+        prompt = RefinementService._build_ppt_refinement_prompt(slide, refinement_prompt)
+        scanner = JsonArrayItemStream("bullets", text_keys=("bullets",))
+        chunks = []
+        index = 0
+
+        stream = astream_text(prompt, response_format=response_format("slide"))
+        try:
+            async for delta in stream:
+                chunks.append(delta)
+                bullets = scanner.feed(delta)
+                for position, text in scanner.take_text():
+                    yield {"event": "token", "data": {"index": position, "text": text}}
+                for bullet in bullets:
+                    yield {"event": "bullet", "data": {"index": index, "text": str(bullet)}}
+                    index += 1
+        finally:
+            await stream.aclose()
+
+        llm_output = "".join(chunks).strip()
+        yield {"event": "content", "data": RefinementService._parse_ppt_refinement(llm_output, slide.get("title"))}
+
     # ----------------------------------------------------------------------
 
+    @staticmethod
+    def _prepare_word_refinement(section_blocks: List[Dict], refinement_prompt: str):
+        """Splits a section into heading/paragraphs and builds the refinement prompt."""
+        heading = None
+        paragraphs = []
+
+        for block in section_blocks:
+            if block.get("type") == "heading":
+                heading = block
+            elif block.get("type") == "paragraph":
+                paragraphs.append(block)
+
+        prompt = RefinementService._build_word_refinement_prompt(
+            heading, paragraphs, refinement_prompt
+        )
+        return prompt, heading
+
     @staticmethod
     def _build_word_refinement_prompt(heading: Dict, paragraphs: List[Dict], prompt: str) -> str:
         """Builds the LLM prompt for refining a Word section."""
@@ -148,11 +235,14 @@ Return ONLY the JSON object:
     def _parse_word_refinement(llm_output: str, original_heading: Dict) -> List[Dict]:
         """Parses the LLM output for Word section refinement."""
         try:
-            cleaned = RefinementService._extract_json_array(llm_output)
-            blocks = json.loads(cleaned)
-            
+            blocks = extract_json(llm_output)
+            # JSON modes wrap the array as {"blocks": [...]}
+            if isinstance(blocks, dict):
+                blocks = blocks.get("blocks")
+
             if not isinstance(blocks, list):
                 raise ValueError("Expected JSON array")
+            blocks = [Block.from_dict(block).to_dict() for block in blocks]
             
             # Ensure heading is preserved
             if original_heading and blocks and blocks[0].get("type") != "heading":
@@ -169,9 +259,8 @@ Return ONLY the JSON object:
     def _parse_ppt_refinement(llm_output: str, original_title: str) -> Dict:
         """Parses the LLM output for PPT slide refinement."""
         try:
-            cleaned = RefinementService._extract_json_object(llm_output)
-            slide = json.loads(cleaned)
-            
+            slide = extract_json(llm_output, dict)
+
             if not isinstance(slide, dict):
                 raise ValueError("Expected JSON object")
             
@@ -183,32 +272,10 @@ Return ONLY the JSON object:
             if "bullets" not in slide or not isinstance(slide["bullets"], list):
                 raise ValueError("Missing or invalid bullets array")
             
-            return slide
+            return Slide.from_dict(slide).to_dict()
         except Exception as e:
             raise ValueError(f"Failed to parse refinement output: {str(e)}")
 
-    @staticmethod
-    def _extract_json_array(text: str) -> str:
-        """Extracts a JSON array from text."""
-        start = text.find('[')
-        end = text.rfind(']') + 1
-        
-        if start == -1 or end == 0:
-            raise ValueError("No JSON array found")
-        
-        return text[start:end]
-
-    @staticmethod
-    def _extract_json_object(text: str) -> str:
-        """Extracts a JSON object from text."""
-        start = text.find('{')
-        end = text.rfind('}') + 1
-        
-        if start == -1 or end == 0:
-            raise ValueError("No JSON object found")
-        
-        return text[start:end]
-
 
 # Single shared instance
 refinement_service = RefinementService()
\ No newline at end of file
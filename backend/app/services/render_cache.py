@@ -0,0 +1,170 @@
+# app/services/render_cache.py
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple, Union
+
+from app.config.settings import settings
+from app.utils.json_codec import dumps
+from app.utils.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+lookups = counter("render_cache_total", "Rendered-file cache lookups, by format and result (hit, miss).")
+
+
+class RenderCache:
+    """
+    Disk LRU of rendered .docx/.pptx files.
+
+    Files are named after a SHA-256 of (format, exporter version, config),
+    so a key is known before anything is rendered and doubles as a strong
+    ETag. Recency is kept in memory and mirrored to the file mtime; on
+    start the index is rebuilt from the directory, oldest first. Workers
+    sharing the directory see each other's files, but each enforces
+    `max_bytes` against its own view, so the total can briefly overshoot.
+
+    Writes go to a temporary file that is renamed into place, so a reader
+    never sees a partial file.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self._index = OrderedDict()  # file name -> size, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(fmt: str, exporter_version: Any, content: Any) -> str:
+        digest = hashlib.sha256(f"{fmt}:{exporter_version}:".encode("utf-8"))
+        digest.update(dumps(content))
+        return digest.hexdigest()
+
+    def get(self, key: str, fmt: str) -> Optional[Tuple[str, os.stat_result]]:
+        """(path, stat) of a cached file, or None on a miss."""
+        name = f"{key}.{fmt}"
+        path = os.path.join(self.directory, name)
+        self._ensure_loaded()
+        try:
+            os.utime(path)
+            stat_result = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(name)
+                self.misses += 1
+            lookups.inc(format=fmt, result="miss")
+            return None
+
+        with self._lock:
+            if name not in self._index:
+                # Written by another worker sharing the directory
+                self._bytes += stat_result.st_size
+            self._index[name] = stat_result.st_size
+            self._index.move_to_end(name)
+            self.hits += 1
+        lookups.inc(format=fmt, result="hit")
+        return path, stat_result
+
+    def put(self, key: str, fmt: str, data: Union[bytes, Iterable[bytes]]) -> Tuple[str, os.stat_result]:
+        """Stores rendered bytes, or chunks as they are produced, and returns (path, stat) of the file."""
+        name = f"{key}.{fmt}"
+        path = os.path.join(self.directory, name)
+        self._ensure_loaded()
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    for chunk in data:
+                        f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        stat_result = os.stat(path)
+
+        with self._lock:
+            self._forget(name)
+            self._index[name] = stat_result.st_size
+            self._bytes += stat_result.st_size
+            victims = self._evict(keep=name)
+        for victim in victims:
+            try:
+                os.remove(os.path.join(self.directory, victim))
+            except FileNotFoundError:
+                pass
+        return path, stat_result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "files": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    # ----------------------------------------------------------------------
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.startswith(".tmp-"):
+                    stat_result = entry.stat()
+                    files.append((stat_result.st_mtime, entry.name, stat_result.st_size))
+            for _, name, size in sorted(files):
+                self._index[name] = size
+                self._bytes += size
+            self._loaded = True
+            logger.info("Render cache: %d files, %d bytes in %s", len(self._index), self._bytes, self.directory)
+
+    def _forget(self, name: str):
+        size = self._index.pop(name, None)
+        if size is not None:
+            self._bytes -= size
+
+    def _evict(self, keep: str):
+        """Drops least recently used entries until under `max_bytes`; returns their names."""
+        victims = []
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            name = next(iter(self._index))
+            if name == keep:
+                self._index.move_to_end(name)
+                continue
+            self._forget(name)
+            victims.append(name)
+        return victims
+
+
+# Single shared instance
+render_cache = RenderCache(
+    directory=settings.RENDER_CACHE_DIR or os.path.join(tempfile.gettempdir(), "document_author_renders"),
+    max_bytes=settings.RENDER_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,213 @@
+# app/services/version_store.py
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.config.supabase_client import supabase
+from app.utils import json_delta
+from app.utils.json_codec import dumps, parse_config
+from app.utils.metrics import counter, track
+
+# Key that marks a stored config as a delta instead of the content itself.
+DELTA_KEY = "$delta"
+
+# A delta larger than this share of the full content is not worth a replay
+# on every read; such versions are written as snapshots instead.
+_MAX_DELTA_RATIO = 0.5
+
+stored_bytes = counter("version_store_bytes_total", "Bytes of version config written, by kind (snapshot, delta).")
+cache_lookups = counter("version_store_cache_total", "Materialized-version cache lookups, by result (hit, miss).")
+
+
+class VersionStore:
+    """
+    Reads and writes `project_versions.config`, optionally delta-encoded.
+
+    In "delta" mode a version derived from a parent (every refinement) is
+    stored as ``{"$delta": {"base": parent_id, "depth": n, "ops": [...]}}``
+    with the JSON-Patch style ops of app/utils/json_delta.py. Every
+    `snapshot_interval`-th version of a chain, and any version whose delta
+    would not be much smaller than the content, is stored in full. Rows
+    written in full, including all rows from before delta mode, are
+    snapshots, so both kinds can be read in either mode.
+
+    Reading a delta replays the chain from the nearest snapshot. The
+    results go into an in-process LRU of materialized versions, so the base
+    of a new refinement and recently read versions cost a dict lookup.
+    Cached content is shared between callers and must not be mutated.
+    """
+
+    def __init__(self, mode: str = "full", snapshot_interval: int = 10, max_entries: int = 128):
+        self.mode = mode
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.max_entries = max_entries
+
+        self._cache = OrderedDict()  # version id -> (content, depth)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ----------------------------------------------------------------------
+    # Writing
+
+    def encode(self, parent_id: Optional[str], content: Any) -> Tuple[Any, int]:
+        """
+        The config to store for `content` derived from version `parent_id`,
+        and its depth (number of deltas since the last snapshot).
+        """
+        stored, depth = content, 0
+        if self.mode == "delta" and parent_id:
+            parent = self._resolve(parent_id)
+            if parent is not None and parent[1] + 1 < self.snapshot_interval:
+                delta = {
+                    DELTA_KEY: {
+                        "base": parent_id,
+                        "depth": parent[1] + 1,
+                        "ops": json_delta.diff(parent[0], content),
+                    }
+                }
+                size = len(dumps(delta))
+                if size <= len(dumps(content)) * _MAX_DELTA_RATIO:
+                    stored_bytes.inc(size, kind="delta")
+                    return delta, parent[1] + 1
+
+        stored_bytes.inc(len(dumps(stored)), kind="snapshot")
+        return stored, depth
+
+    def remember(self, version_id: str, content: Any, depth: int = 0):
+        """Caches the content of a version that was just written."""
+        with self._lock:
+            self._put(version_id, (content, depth))
+
+    # ----------------------------------------------------------------------
+    # Reading
+
+    @staticmethod
+    def is_delta(config: Any) -> bool:
+        return isinstance(config, dict) and DELTA_KEY in config
+
+    def materialize(self, version_id: str, config: Any) -> Any:
+        """
+        Content of a version given its stored (possibly delta) config. Goes
+        into the cache either way, so a refinement of the version encodes
+        its delta without fetching the parent again.
+        """
+        config = parse_config(config)
+        if not self.is_delta(config):
+            self._store(version_id, (config, 0))
+            return config
+        return self._resolve(version_id, config)[0]
+
+    def load(self, version_id: str) -> Optional[Any]:
+        """Content of a version by id, or None if it doesn't exist."""
+        entry = self._resolve(version_id)
+        return entry[0] if entry is not None else None
+
+    def expand(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """A `project_versions` row with a delta config replaced by the content."""
+        if not self.is_delta(parse_config(row.get("config"))):
+            return row
+        return {**row, "config": self.materialize(row["id"], row["config"])}
+
+    def expand_rows(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Like `expand` for many rows, using the rows themselves as bases."""
+        rows = list(rows)
+        known = {row["id"]: parse_config(row.get("config")) for row in rows}
+        expanded = []
+        for row in rows:
+            config = known[row["id"]]
+            if self.is_delta(config):
+                row = {**row, "config": self._resolve(row["id"], config, known)[0]}
+            expanded.append(row)
+        return expanded
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "snapshot_interval": self.snapshot_interval,
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    # ----------------------------------------------------------------------
+
+    def _resolve(
+        self, version_id: str, config: Any = None, known: Optional[Dict[str, Any]] = None
+    ) -> Optional[Tuple[Any, int]]:
+        """(content, depth) of a version, replaying deltas from the nearest cached or full version."""
+        chain = []
+        current, entry = version_id, None
+        while True:
+            entry = self._get(current)
+            if entry is not None:
+                break
+            if config is None:
+                config = known.get(current) if known and current in known else self._fetch(current)
+                if config is None:
+                    if current == version_id:
+                        return None
+                    raise RuntimeError(f"Base version {current} of version {version_id} is missing")
+            if not self.is_delta(config):
+                entry = (config, 0)
+                self._store(current, entry)
+                break
+            meta = config[DELTA_KEY]
+            chain.append((current, meta))
+            current, config = meta["base"], None
+
+        for current, meta in reversed(chain):
+            entry = (json_delta.apply(entry[0], meta["ops"]), meta["depth"])
+            self._store(current, entry)
+        return entry
+
+    @staticmethod
+    def _fetch(version_id: str) -> Any:
+        with track("supabase", table="project_versions", operation="select"):
+            response = supabase.table("project_versions") \
+                .select("config") \
+                .eq("id", version_id) \
+                .limit(1) \
+                .execute()
+        if not response.data:
+            return None
+        return parse_config(response.data[0]["config"])
+
+    def _get(self, version_id: str) -> Optional[Tuple[Any, int]]:
+        with self._lock:
+            entry = self._cache.get(version_id)
+            if entry is None:
+                self.misses += 1
+                cache_lookups.inc(result="miss")
+                return None
+            self._cache.move_to_end(version_id)
+            self.hits += 1
+        cache_lookups.inc(result="hit")
+        return entry
+
+    def _store(self, version_id: str, entry: Tuple[Any, int]):
+        with self._lock:
+            self._put(version_id, entry)
+
+    def _put(self, version_id: str, entry: Tuple[Any, int]):
+        self._cache[version_id] = entry
+        self._cache.move_to_end(version_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+
+# Single shared instance
+version_store = VersionStore(
+    mode=settings.VERSION_STORAGE,
+    snapshot_interval=settings.VERSION_SNAPSHOT_INTERVAL,
+    max_entries=settings.VERSION_CACHE_MAX_ENTRIES,
+)
@@ -1,56 +1,244 @@
 # backend/utils/auth.py
 
 import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 import httpx
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt
+from jose import jwt, JWTError
 from dotenv import load_dotenv
+from app.config.http_client import get_http_client
+from app.config.settings import settings
+from app.utils.metrics import counter, track
 
 load_dotenv()
 
-AUTH_JWKS_URL = f"{os.getenv('SUPABASE_URL')}/.well-known/jwks.json"
+AUTH_JWKS_URL = f"{os.getenv('SUPABASE_URL')}/auth/v1/.well-known/jwks.json"
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 JWT_AUDIENCE = "authenticated"
 SUPABASE_URL = os.getenv("SUPABASE_URL")
+
 #security = HTTPBearer()
 _jwks_cache = None
+_jwks_fetched_at = 0.0
+_jwks_lock = asyncio.Lock()
 auth_scheme = HTTPBearer()
 
-async def get_jwks():
-    global _jwks_cache
-    if _jwks_cache is None:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
+
+class _LocalVerificationUnavailable(Exception):
+    """Raised when a token can't be checked locally and needs the remote path."""
+
+
+class TokenCache:
+    """
+    Bounded LRU of bearer tokens that already passed validation.
+
+    Keys are SHA-256 digests, so raw tokens never sit in memory longer than
+    the request that carried them.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # digest -> (expires_at, user)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(user)
+
+    def put(self, token: str, user: dict):
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        try:
+            exp = jwt.get_unverified_claims(token).get("exp")
+            if exp is not None:
+                expires_at = min(expires_at, float(exp))
+        except (JWTError, TypeError, ValueError):
+            pass
+        if expires_at <= time.time():
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_SIZE, settings.TOKEN_CACHE_TTL)
+auth_verifications = counter("auth_verifications_total", "Bearer tokens resolved, by method (cache/local/remote).")
+
+
+async def get_jwks(force_refresh: bool = False):
+    """
+    Returns the Supabase JWKS, cached for settings.JWKS_CACHE_TTL seconds.
+
+    `force_refresh` refetches immediately (used when a token carries a `kid`
+    we haven't seen, e.g. right after a key rotation), but never more often
+    than settings.JWKS_MIN_REFRESH_INTERVAL.
+    """
+    global _jwks_cache, _jwks_fetched_at
+
+    async with _jwks_lock:
+        age = time.monotonic() - _jwks_fetched_at
+        stale = _jwks_cache is None or age > settings.JWKS_CACHE_TTL
+        if force_refresh and age > settings.JWKS_MIN_REFRESH_INTERVAL:
+            stale = True
+
+        if stale:
+            resp = await get_http_client().get(
                 AUTH_JWKS_URL,
                 headers={"apikey": SUPABASE_ANON_KEY}  # 🔑 REQUIRED
             )
             resp.raise_for_status()
             _jwks_cache = resp.json()
+            _jwks_fetched_at = time.monotonic()
+
     return _jwks_cache
 
 
+def _find_jwk(jwks, kid):
+    for key in (jwks or {}).get("keys", []):
+        if key.get("kid") == kid:
+            return key
+    return None
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(auth_scheme)):
-    """Validate token using Supabase Auth API instead of JWKS."""
-    
-    token = credentials.credentials
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{SUPABASE_URL}/auth/v1/user",
-            headers={
-                "apikey": SUPABASE_ANON_KEY,
-                "Authorization": f"Bearer {token}"
-            }
+async def _verify_token_locally(token: str) -> dict:
+    """
+    Checks signature, audience and expiry of a Supabase access token against
+    the cached JWKS. Raises HTTPException(401) for tokens that are definitely
+    invalid, and _LocalVerificationUnavailable when we simply can't tell.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    kid = header.get("kid")
+    alg = header.get("alg")
+    # Legacy HS256 projects sign with a shared secret that isn't published in
+    # the JWKS, so those tokens can only be checked by Supabase itself.
+    if not kid or not alg or alg.startswith("HS"):
+        raise _LocalVerificationUnavailable()
+
+    try:
+        jwk = _find_jwk(await get_jwks(), kid)
+        if jwk is None:
+            jwk = _find_jwk(await get_jwks(force_refresh=True), kid)
+    except httpx.HTTPError:
+        raise _LocalVerificationUnavailable()
+
+    if jwk is None:
+        raise _LocalVerificationUnavailable()
+
+    try:
+        claims = jwt.decode(
+            token,
+            jwk,
+            algorithms=[jwk.get("alg", alg)],
+            audience=JWT_AUDIENCE,
         )
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    if not claims.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    return {
+        "user_id": claims["sub"],
+        "email": claims.get("email")
+    }
+
+
+async def _verify_token_remotely(token: str) -> dict:
+    """Validate token using the Supabase Auth API."""
+    resp = await get_http_client().get(
+        f"{SUPABASE_URL}/auth/v1/user",
+        headers={
+            "apikey": SUPABASE_ANON_KEY,
+            "Authorization": f"Bearer {token}"
+        }
+    )
 
     if resp.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
     user_data = resp.json()
-    
+
     return {
         "user_id": user_data["id"],
         "email": user_data.get("email")
     }
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(auth_scheme)):
+    """
+    Resolves the current user from the bearer token.
+
+    Tokens seen recently are answered from `token_cache`. Otherwise, in
+    "local" mode the JWT is verified in-process against the cached JWKS and
+    the Supabase Auth API is only consulted when no matching key exists.
+    """
+
+    token = credentials.credentials
+
+    with track("auth"):
+        cached = token_cache.get(token)
+        if cached is not None:
+            auth_verifications.inc(method="cache")
+            return cached
+
+        user = None
+        if settings.AUTH_VERIFY_MODE == "local":
+            try:
+                user = await _verify_token_locally(token)
+                auth_verifications.inc(method="local")
+            except _LocalVerificationUnavailable:
+                pass
+
+        if user is None:
+            user = await _verify_token_remotely(token)
+            auth_verifications.inc(method="remote")
+
+        token_cache.put(token, user)
+        return user
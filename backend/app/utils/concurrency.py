@@ -0,0 +1,97 @@
+# app/utils/concurrency.py
+
+import asyncio
+import inspect
+from typing import Awaitable, Callable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+
+async def gather_bounded(aws: Iterable[Awaitable[T]], limit: int) -> List[T]:
+    """
+    Runs the awaitables concurrently, at most `limit` at a time, and returns
+    their results in input order.
+
+    If any of them fails, the ones still pending are cancelled and the first
+    exception is re-raised unchanged, so callers see the same error types as
+    a sequential loop would produce.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(aw):
+        try:
+            async with semaphore:
+                return await aw
+        except asyncio.CancelledError:
+            # Cancelled while still queued: close the never-started coroutine
+            # so it doesn't warn about never being awaited.
+            if inspect.iscoroutine(aw):
+                aw.close()
+            raise
+
+    tasks = [asyncio.ensure_future(run(aw)) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same result (or exception). A waiter that is
+    cancelled only detaches itself; the shared call is cancelled once no
+    waiters are left.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> _Flight
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._inflight.get(key)
+        if flight is None or flight.task.done():
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key, flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        # Nobody may be left to observe a failure (all waiters cancelled).
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
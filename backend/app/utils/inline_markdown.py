@@ -0,0 +1,146 @@
+# app/utils/inline_markdown.py
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+# Inline markdown as the LLM writes it in paragraphs and bullets:
+# **bold** / __bold__, *italic* / _italic_, `code`.
+#
+# Rules (a small subset of CommonMark):
+# * a code span is literal, nothing inside it is formatted;
+# * bold and italic nest in either order, ***x*** is both;
+# * an opening marker must be followed, a closing one preceded, by
+#   non-whitespace, so "2 * 3 * 4" stays plain;
+# * "_" never opens or closes inside a word (snake_case_names);
+# * markers without a partner, and empty pairs such as "``" or "****", are
+#   kept as literal text.
+
+# Code spans, the common un-nested **bold** / *italic* spans matched whole,
+# and any other run of up to three "*" or "_" as a delimiter for the stack.
+# Every branch starts with a literal, which lets the regex engine skip
+# plain text with a fast character scan. The content of a whole span is
+# tokenized again for the code and "_" markup it may hold.
+_TOKEN = re.compile(
+    r"`([^`]*)`"
+    r"|\*\*([^\s*](?:[^*]*[^\s*])?)\*\*(?!\*)"
+    r"|\*([^\s*](?:[^*]*[^\s*])?)\*(?!\*)"
+    r"|\*\*?\*?|__?_?"
+)
+
+
+class Run(NamedTuple):
+    text: str
+    bold: bool = False
+    italic: bool = False
+    code: bool = False
+
+
+def tokenize(text: str) -> Tuple[Run, ...]:
+    """
+    Splits `text` into styled runs with a single scan. Results are memoized, so
+    repeated strings (headers, recurring bullets) are only parsed once.
+
+    Example
+    -------
+    >>> tokenize("a **b *c*** `d*`")
+    (Run(text='a ', bold=False, italic=False, code=False), Run(text='b ', bold=True, italic=False, code=False), Run(text='c', bold=True, italic=True, code=False), Run(text=' ', bold=False, italic=False, code=False), Run(text='d*', bold=False, italic=False, code=True))
+    """
+    if not text:
+        return ()
+    return _tokenize(text)
+
+
+@lru_cache(maxsize=8192)
+def _tokenize(text: str) -> Tuple[Run, ...]:
+    # Pass 1: text pieces, whole spans and delimiters, pairing delimiters on
+    # a stack as they are met. Items are [kind, value] with kind one of
+    # "text", "code", "bold", "italic", "open", "close"; unmatched "open"s
+    # become text.
+    items: List[list] = []
+    stack: List[int] = []   # indexes of open delimiters in `items`
+    n = len(text)
+    pos = 0
+
+    for m in _TOKEN.finditer(text):
+        start, end = m.span()
+        if start > pos:
+            items.append(["text", text[pos:start]])
+        pos = end
+
+        code, bold, italic = m.group(1, 2, 3)
+        if code is not None:
+            items.append(["code", code] if code else ["text", m.group()])
+            continue
+        if bold is not None:
+            items.append(["bold", bold])
+            continue
+        if italic is not None:
+            items.append(["italic", italic])
+            continue
+
+        run = m.group()
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < n else " "
+        can_open = not after.isspace()
+        can_close = not before.isspace()
+        if run[0] == "_":
+            can_open = can_open and not before.isalnum()
+            can_close = can_close and not after.isalnum()
+
+        if len(run) == 3:
+            # Close the inner marker first, open the outer one first.
+            markers = (run[0], run[:2]) if can_close else (run[:2], run[0])
+        else:
+            markers = (run,)
+
+        for marker in markers:
+            opener = None
+            if can_close:
+                for k in range(len(stack) - 1, -1, -1):
+                    if items[stack[k]][1] == marker:
+                        opener = k
+                        break
+            if opener is not None and stack[opener] == len(items) - 1:
+                opener = None  # nothing in between: "**" + "**" is not emphasis
+            if opener is not None:
+                # Openers crossed by this pair can no longer match.
+                for index in stack[opener + 1:]:
+                    items[index][0] = "text"
+                del stack[opener:]
+                items.append(["close", marker])
+            elif can_open:
+                stack.append(len(items))
+                items.append(["open", marker])
+            else:
+                items.append(["text", marker])
+
+    if pos < n:
+        items.append(["text", text[pos:]])
+    for index in stack:
+        items[index][0] = "text"
+
+    # Pass 2: walk the items with bold/italic depth counters, expanding whole
+    # spans into their own runs and merging neighbours that end up with the
+    # same style.
+    runs = []   # [text, bold, italic, code]
+    bold = italic = 0
+    for kind, value in items:
+        if kind == "open" or kind == "close":
+            step = 1 if kind == "open" else -1
+            if len(value) == 2:
+                bold += step
+            else:
+                italic += step
+            continue
+        if (kind == "bold" or kind == "italic") and ("`" in value or "_" in value):
+            pieces = _tokenize(value)
+        else:
+            pieces = ((value, False, False, kind == "code"),)
+        for piece, piece_bold, piece_italic, code in pieces:
+            style = [bold > 0 or kind == "bold" or piece_bold, italic > 0 or kind == "italic" or piece_italic, code]
+            if runs and runs[-1][1:] == style:
+                runs[-1][0] += piece
+            else:
+                runs.append([piece] + style)
+    return tuple(Run(*run) for run in runs)
@@ -0,0 +1,47 @@
+# app/utils/json_codec.py
+
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+# orjson is several times faster than the stdlib for the large `config`
+# documents; fall back to json when it isn't installed.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def loads(data) -> Any:
+    """Parses JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializes `obj` to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_config(config) -> Any:
+    """
+    Returns a version `config` as Python objects. Rows written by older
+    clients may hold the JSON as a string instead of a JSONB object.
+    """
+    if isinstance(config, (str, bytes, bytearray)):
+        try:
+            return loads(config)
+        except ValueError:
+            return config
+    return config
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps` (orjson when available)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
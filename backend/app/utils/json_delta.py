@@ -0,0 +1,123 @@
+# app/utils/json_delta.py
+
+from difflib import SequenceMatcher
+from typing import Any, Dict, List
+
+from app.utils.json_codec import dumps
+
+# JSON-Patch style deltas between two versions of a document config.
+#
+# Ops follow RFC 6902 ("add", "remove", "replace" with JSON Pointer paths)
+# plus one extension for lists, since a refinement usually swaps a run of
+# blocks/slides in the middle of a long array:
+#
+#     {"op": "splice", "path": "/blocks", "start": 12, "delete": 3, "value": [...]}
+#
+# Ops apply in order; list positions refer to the list as already patched.
+
+
+def _escape(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Equal as JSON: unlike ==, 1 and True (or 0 and False) differ, also inside containers."""
+    if type(a) is not type(b) or a != b:
+        return False
+    if isinstance(a, (dict, list)):
+        # == already matched; only a bool/int swap somewhere inside is left to find
+        return dumps(a) == dumps(b)
+    return True
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Ops that turn `old` into `new`."""
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    if isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            elif not _same(old[key], value):
+                ops.extend(diff(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+    if isinstance(new, list):
+        return _diff_list(old, new, path)
+    if old != new:
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+
+def _diff_list(old: list, new: list, path: str) -> List[Dict[str, Any]]:
+    # Compare elements by their serialized form so dicts are hashable.
+    matcher = SequenceMatcher(None, [dumps(item) for item in old], [dumps(item) for item in new], autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag == "replace" and i2 - i1 == j2 - j1:
+            # Same number of items rewritten in place (e.g. a refined
+            # paragraph): describe the change inside each item.
+            for k in range(i2 - i1):
+                ops.extend(diff(old[i1 + k], new[j1 + k], f"{path}/{j1 + k}"))
+            continue
+        ops.append({"op": "splice", "path": path, "start": j1, "delete": i2 - i1, "value": new[j1:j2]})
+    return ops
+
+
+def apply(document: Any, ops: List[Dict[str, Any]]) -> Any:
+    """
+    Returns `document` with `ops` applied. The input is not modified:
+    containers on the changed paths are copied once, everything else is
+    shared with `document`, so treat both as read-only.
+    """
+    copied = set()  # ids of containers already copied during this call
+
+    def own(container):
+        if id(container) in copied:
+            return container
+        container = dict(container) if isinstance(container, dict) else list(container)
+        copied.add(id(container))
+        return container
+
+    root = document
+    for op in ops:
+        tokens = [_unescape(token) for token in op["path"].split("/")[1:]]
+        kind = op["op"]
+
+        if not tokens and kind != "splice":
+            root = op["value"]
+            continue
+
+        root = own(root)
+        parent = root
+        walk = tokens if kind == "splice" else tokens[:-1]
+        for token in walk:
+            key = int(token) if isinstance(parent, list) else token
+            child = own(parent[key])
+            parent[key] = child
+            parent = child
+
+        if kind == "splice":
+            start = op["start"]
+            parent[start:start + op["delete"]] = op["value"]
+            continue
+
+        key = int(tokens[-1]) if isinstance(parent, list) else tokens[-1]
+        if kind == "remove":
+            del parent[key]
+        elif kind == "add" and isinstance(parent, list):
+            parent.insert(key, op["value"])
+        elif kind in ("add", "replace"):
+            parent[key] = op["value"]
+        else:
+            raise ValueError(f"Unsupported delta op: {kind}")
+    return root
@@ -0,0 +1,329 @@
+# app/utils/json_stream.py
+
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+from app.utils.metrics import counter
+
+# Returned by the scanner when a character didn't complete an item. A plain
+# None can't be used because `null` is a legitimate array element.
+_NOTHING = object()
+
+_OPENERS = re.compile(r"[{\[]")
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_PAIRS = {"}": "{", "]": "["}
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+parse_failures = counter("llm_parse_failures_total", "LLM outputs in which no usable JSON value was found.")
+
+
+class JsonValueScanner:
+    """
+    Single-pass scanner that picks complete top-level JSON objects and arrays
+    out of arbitrary text, fed in one piece or as streamed chunks.
+
+    Brackets are balanced with a stack and strings/escapes are tracked, so
+    braces inside string values or in trailing chatter never end a value
+    early or late. Text outside values is skipped without being copied; a
+    candidate that turns out not to be JSON (e.g. "{see below}") is dropped
+    and scanning resumes right after it.
+
+    Example
+    -------
+    >>> scanner = JsonValueScanner()
+    >>> scanner.feed('Sure! {"title": "A {b}", "blocks": [')
+    []
+    >>> scanner.feed(']} Hope this helps :}')
+    [{'title': 'A {b}', 'blocks': []}]
+    """
+
+    def __init__(self):
+        self._stack = []        # open containers of the current value
+        self._parts = []        # text of the current value from earlier chunks
+        self._in_string = False
+        self._escape = False
+        self._offset = 0        # characters fed before the current chunk
+        self.open_at = None     # offset where the unfinished value began
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consumes the next chunk and returns the values it completed."""
+        values = []
+        stack = self._stack
+        n = len(chunk)
+        i = 0
+        start = 0  # where the current value's text begins in this chunk
+
+        while i < n:
+            if not stack:
+                m = _OPENERS.search(chunk, i)
+                if m is None:
+                    break
+                i = start = m.start()
+                self.open_at = self._offset + i
+                stack.append(chunk[i])
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _STRING_SPECIAL.search(chunk, i)
+                if m is None:
+                    break
+                i = m.start() + 1
+                if chunk[m.start()] == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                continue
+
+            m = _STRUCTURAL.search(chunk, i)
+            if m is None:
+                break
+            i = m.start()
+            ch = chunk[i]
+            i += 1
+            if ch == '"':
+                self._in_string = True
+                continue
+            if ch in "{[":
+                stack.append(ch)
+                continue
+            if stack.pop() == _PAIRS[ch] and stack:
+                continue
+
+            value = _NOTHING
+            if not stack:
+                self._parts.append(chunk[start:i])
+                try:
+                    value = json.loads("".join(self._parts))
+                except ValueError:
+                    pass
+            if value is not _NOTHING:
+                values.append(value)
+            elif self.open_at >= self._offset:
+                # Mismatched bracket or not JSON after all (e.g. "{see below}"):
+                # drop the candidate and rescan from just after its opening
+                # bracket, in case a real value was nested inside it.
+                i = start + 1
+            self._reset()
+            self.open_at = None
+
+        if stack:
+            self._parts.append(chunk[start:])
+        self._offset += n
+        return values
+
+    def _reset(self):
+        self._stack.clear()
+        self._parts = []
+        self._in_string = False
+        self._escape = False
+
+
+def extract_json(text: str, kind: Optional[type] = None) -> Any:
+    """
+    Returns the first complete JSON object or array in `text`, skipping any
+    prose or markdown around it. With `kind` (dict or list), values of the
+    other type are skipped.
+
+    Raises
+    ------
+    ValueError
+        If no such value is found.
+    """
+    offset = 0
+    while offset < len(text):
+        scanner = JsonValueScanner()
+        for value in scanner.feed(text[offset:] if offset else text):
+            if kind is None or isinstance(value, kind):
+                return value
+        if scanner.open_at is None:
+            break
+        # A stray unbalanced "{" or "[" swallowed the rest of the text;
+        # retry from just after it.
+        offset += scanner.open_at + 1
+
+    expected = {dict: "object", list: "array"}.get(kind, "value")
+    parse_failures.inc(expected=expected)
+    raise ValueError(f"No JSON {expected} found in LLM output.")
+
+
+class JsonArrayItemStream:
+    """
+    Incrementally scans a growing JSON object and yields each element of one
+    top-level array (e.g. "blocks" or "slides") as soon as it is complete.
+
+    Text before the first "{" (LLM chatter) is ignored. Strings and escapes
+    are tracked so braces inside text never confuse the bracket balance.
+
+    With `root_array` a bare top-level array (``[...]``) is accepted as the
+    target as well. With `text_keys`, the decoded characters of string
+    values under those keys (and of bare string items) are collected while
+    they are still being written; `take_text` hands them out per item.
+
+    Example
+    -------
+    >>> stream = JsonArrayItemStream("blocks", text_keys=("text",))
+    >>> stream.feed('{"title": "T", "blocks": [{"type": "head')
+    []
+    >>> stream.feed('ing", "text": "T"}, {"type": "paragraph", "text": "Hel')
+    [{'type': 'heading', 'text': 'T'}]
+    >>> stream.take_text()
+    [(0, 'T'), (1, 'Hel')]
+    """
+
+    def __init__(self, key: str, root_array: bool = False, text_keys=()):
+        self.key = key
+        self.root_array = root_array
+        self.text_keys = frozenset(text_keys)
+        self._buf = []          # characters of the current array item
+        self._started = False   # seen the opening "{" of the root object
+        self._stack = []        # open containers: "{" or "["
+        self._in_string = False
+        self._escape = False
+        self._string_chars = []
+        self._last_string = None
+        self._expect_key = False
+        self._current_key = None
+        self._in_target = False  # inside the target array
+        self._target_depth = 2   # stack depth directly inside the target array
+        self._item_depth = None  # stack depth at which the current item began
+        self._items = 0          # items completed so far
+        self._streaming = False  # current string is a streamed text value
+        self._unicode = None     # hex digits of a pending \uXXXX escape
+        self._surrogate = None   # high half of a \uXXXX surrogate pair
+        self._text = []          # (item index, text) not yet taken
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consumes the next chunk and returns the items it completed."""
+        items = []
+        for ch in chunk:
+            item = self._consume(ch)
+            if item is not _NOTHING:
+                items.append(item)
+        return items
+
+    def take_text(self) -> List[Tuple[int, str]]:
+        """Returns and clears the streamed text as (item index, text) pairs."""
+        text, self._text = self._text, []
+        return text
+
+    # ----------------------------------------------------------------------
+
+    def _consume(self, ch: str):
+        if not self._started:
+            if ch != "{" and not (ch == "[" and self.root_array):
+                return _NOTHING
+            self._started = True
+
+        capturing = self._item_depth is not None
+        if capturing:
+            self._buf.append(ch)
+
+        if self._in_string:
+            if self._unicode is not None:
+                self._unicode.append(ch)
+                if len(self._unicode) == 4:
+                    code = int("".join(self._unicode), 16)
+                    self._unicode = None
+                    if 0xD800 <= code < 0xDC00:
+                        self._surrogate = code
+                    elif 0xDC00 <= code < 0xE000 and self._surrogate:
+                        self._emit_text(chr(0x10000 + ((self._surrogate - 0xD800) << 10) + code - 0xDC00))
+                        self._surrogate = None
+                    else:
+                        self._emit_text(chr(code))
+            elif self._escape:
+                self._escape = False
+                if ch == "u":
+                    self._unicode = []
+                else:
+                    self._emit_text(_ESCAPES.get(ch, ch))
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                self._streaming = False
+                self._last_string = "".join(self._string_chars)
+                if self._stack and self._stack[-1] == "{" and self._expect_key:
+                    self._current_key = self._last_string
+                if capturing and len(self._stack) == self._item_depth:
+                    # A bare string item in the target array.
+                    return self._finish_item()
+            else:
+                self._string_chars.append(ch)
+                self._emit_text(ch)
+            return _NOTHING
+
+        if ch.isspace():
+            return _NOTHING
+
+        # Start of a new element directly inside the target array.
+        if self._in_target and not capturing and len(self._stack) == self._target_depth and ch not in ",]":
+            self._item_depth = len(self._stack)
+            self._buf = [ch]
+            capturing = True
+
+        if ch == '"':
+            self._in_string = True
+            self._string_chars = []
+            self._streaming = capturing and bool(self.text_keys) and (
+                len(self._stack) == self._item_depth
+                or (self._stack[-1] == "{" and not self._expect_key and self._current_key in self.text_keys)
+            )
+        elif ch in "{[":
+            if ch == "[" and not self._in_target and (
+                (len(self._stack) == 1 and self._current_key == self.key and not self._expect_key)
+                or (not self._stack and self.root_array)
+            ):
+                self._in_target = True
+                self._target_depth = len(self._stack) + 1
+            self._stack.append(ch)
+            self._expect_key = ch == "{"
+        elif ch in "}]":
+            if self._stack:
+                self._stack.pop()
+            if ch == "]" and self._in_target and len(self._stack) == self._target_depth - 1:
+                self._in_target = False
+                if capturing:
+                    # Scalar last item, terminated by the closing bracket.
+                    self._buf.pop()
+                    return self._finish_item()
+                return _NOTHING
+            self._expect_key = False
+            if capturing and len(self._stack) == self._item_depth:
+                return self._finish_item()
+        elif ch == ":":
+            self._expect_key = False
+        elif ch == ",":
+            if self._stack and self._stack[-1] == "{":
+                self._expect_key = True
+            if capturing and len(self._stack) == self._item_depth:
+                # Scalar item (number/true/false/null) ended at the comma.
+                self._buf.pop()
+                return self._finish_item()
+
+        return _NOTHING
+
+    def _emit_text(self, text: str):
+        if not self._streaming:
+            return
+        if self._text and self._text[-1][0] == self._items:
+            self._text[-1] = (self._items, self._text[-1][1] + text)
+        else:
+            self._text.append((self._items, text))
+
+    def _finish_item(self):
+        raw = "".join(self._buf).strip()
+        self._buf = []
+        self._item_depth = None
+        self._items += 1
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return _NOTHING
@@ -0,0 +1,162 @@
+# app/utils/zip_stream.py
+
+import struct
+import time
+import zlib
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# Zip archives written front to back, for responses that send a package
+# while it is still being generated.
+#
+# A streamed member's CRC and sizes are only known after its data, so its
+# local header carries zeros and flag bit 3, and the real values follow the
+# data in a data descriptor (and go into the central directory as usual).
+# Members compressed ahead of time (template parts) or stored as is
+# (files that are zips themselves) get a complete local header instead.
+# There is no ZIP64 support: offsets and sizes must stay below 4 GiB.
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_DATA_DESCRIPTOR = struct.Struct("<4s3L")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<4s4H2LH")
+
+_VERSION = 20                 # deflate, data descriptors
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_STORED = 0
+_DEFLATED = 8
+_EXTERNAL_ATTRIBUTES = 0o600 << 16  # -rw------- like zipfile.writestr
+_LIMIT = 0xFFFFFFFF
+
+
+class ZipMember(NamedTuple):
+    """A member prepared ahead of time, e.g. a template part sent with every archive."""
+    name: str
+    data: bytes     # raw deflate stream, or the content itself when stored
+    crc: int
+    size: int       # uncompressed
+    method: int = _DEFLATED
+
+
+def compress(name: str, data: bytes) -> ZipMember:
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return ZipMember(name, compressor.compress(data) + compressor.flush(), zlib.crc32(data), len(data))
+
+
+def store(name: str, data: bytes) -> ZipMember:
+    """An uncompressed member, for content that is already compressed (.docx, .pptx, images)."""
+    return ZipMember(name, data, zlib.crc32(data), len(data), _STORED)
+
+
+class ZipStream:
+    """
+    Writes one archive as a sequence of byte chunks. Members go out in the
+    order they are added; send everything `add` returns and `add_chunks`
+    yields, then what `close` returns (the central directory):
+
+        archive = ZipStream()
+        yield archive.add(template_part)
+        yield from archive.add_chunks("word/document.xml", xml_pieces)
+        yield archive.close()
+
+    `add_chunks` takes str or bytes pieces of any size, batches them to
+    about `chunk_size` before compressing, and yields compressed data as
+    zlib produces it, so memory stays bounded by `chunk_size` and the zlib
+    window however large the member is.
+    """
+
+    def __init__(self, chunk_size: int = 64 * 1024, date_time: Optional[Tuple[int, ...]] = None):
+        self.chunk_size = chunk_size
+        year, month, day, hour, minute, second = (date_time or time.localtime())[:6]
+        self._dos_date = (max(year, 1980) - 1980) << 9 | month << 5 | day
+        self._dos_time = hour << 11 | minute << 5 | second // 2
+        self._entries: List[tuple] = []  # (name, flags, method, crc, compressed size, size, offset)
+        self._offset = 0
+
+    @property
+    def bytes_written(self) -> int:
+        return self._offset
+
+    def add(self, member: ZipMember) -> bytes:
+        name, flags = self._encode_name(member.name)
+        header = self._local_header(name, flags, member.method, member.crc, len(member.data), member.size)
+        self._entries.append((name, flags, member.method, member.crc, len(member.data), member.size, self._offset))
+        self._advance(len(header) + len(member.data))
+        return header + member.data
+
+    def add_chunks(self, name: str, chunks: Iterable[Union[str, bytes]]) -> Iterator[bytes]:
+        encoded, flags = self._encode_name(name)
+        flags |= _FLAG_DATA_DESCRIPTOR
+        offset = self._offset
+        header = self._local_header(encoded, flags, _DEFLATED, 0, 0, 0)
+        self._advance(len(header))
+        yield header
+
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        crc = size = 0
+        pending: List[bytes] = []
+        pending_size = 0
+
+        def deflate(data: bytes) -> bytes:
+            nonlocal crc, size
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            return compressor.compress(data)
+
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= self.chunk_size:
+                out = deflate(b"".join(pending))
+                pending.clear()
+                pending_size = 0
+                if out:
+                    self._advance(len(out))
+                    yield out
+
+        tail = deflate(b"".join(pending)) + compressor.flush()
+        compressed_size = self._offset - offset - len(header) + len(tail)
+        if size > _LIMIT or compressed_size > _LIMIT:
+            raise ValueError(f"Zip member {name!r} is over 4 GiB; ZIP64 is not supported")
+        descriptor = _DATA_DESCRIPTOR.pack(b"PK\x07\x08", crc, compressed_size, size)
+        self._entries.append((encoded, flags, _DEFLATED, crc, compressed_size, size, offset))
+        self._advance(len(tail) + len(descriptor))
+        yield tail + descriptor
+
+    def close(self) -> bytes:
+        """The central directory; nothing can be added afterwards."""
+        directory = []
+        for name, flags, method, crc, compressed_size, size, offset in self._entries:
+            directory.append(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", _VERSION, _VERSION, flags, method, self._dos_time, self._dos_date,
+                crc, compressed_size, size, len(name), 0, 0, 0, 0, _EXTERNAL_ATTRIBUTES, offset,
+            ))
+            directory.append(name)
+        directory = b"".join(directory)
+        end = _END_OF_CENTRAL_DIRECTORY.pack(
+            b"PK\x05\x06", 0, 0, len(self._entries), len(self._entries), len(directory), self._offset, 0,
+        )
+        self._advance(len(directory) + len(end))
+        return directory + end
+
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    def _encode_name(name: str) -> Tuple[bytes, int]:
+        try:
+            return name.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return name.encode("utf-8"), _FLAG_UTF8
+
+    def _local_header(self, name: bytes, flags: int, method: int, crc: int, compressed_size: int, size: int) -> bytes:
+        return _LOCAL_HEADER.pack(
+            b"PK\x03\x04", _VERSION, flags, method, self._dos_time, self._dos_date,
+            crc, compressed_size, size, len(name), 0,
+        ) + name
+
+    def _advance(self, count: int):
+        self._offset += count
+        if self._offset > _LIMIT:
+            raise ValueError("Zip archive is over 4 GiB; ZIP64 is not supported")
@@ -0,0 +1,121 @@
+# benchmarks/bench_auth.py
+"""
+Compares per-request auth overhead of get_current_user in "remote" mode
+(one call to /auth/v1/user per request), "local" mode (JWT verified
+against the cached JWKS) and with the validated-token cache enabled.
+
+Supabase is replaced by an in-process httpx transport that sleeps for
+--rtt-ms before answering, so the numbers are reproducible offline.
+
+    cd backend
+    python -m benchmarks.bench_auth --requests 500 --rtt-ms 40
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench-anon-key")
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwk, jwt
+
+from app.config import http_client
+from app.config.settings import settings
+from app.utils import auth
+
+KID = "bench-key"
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def _make_keys():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    public_jwk = jwk.construct(public_pem, "ES256").to_dict()
+    public_jwk.update({"kid": KID, "alg": "ES256", "use": "sig"})
+    return private_pem, {"keys": [public_jwk]}
+
+
+def _install_fake_supabase(jwks, rtt: float):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(rtt)
+        if request.url.path.endswith("/jwks.json"):
+            return httpx.Response(200, json=jwks)
+        if request.url.path.endswith("/auth/v1/user"):
+            return httpx.Response(200, json={"id": USER_ID, "email": "bench@example.com"})
+        return httpx.Response(404)
+
+    return http_client.startup_http_client(transport=httpx.MockTransport(handler))
+
+
+async def _run(mode: str, token: str, requests: int, use_token_cache: bool = False) -> list:
+    configured_mode = settings.AUTH_VERIFY_MODE
+    settings.AUTH_VERIFY_MODE = mode
+    auth.token_cache.clear()
+    auth.token_cache.max_size = settings.TOKEN_CACHE_MAX_SIZE if use_token_cache else 0
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    try:
+        # Warm the JWKS cache so the local numbers reflect steady state.
+        await auth.get_current_user(credentials)
+
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            user = await auth.get_current_user(credentials)
+            samples.append(time.perf_counter() - start)
+            assert user["user_id"] == USER_ID
+        return samples
+    finally:
+        settings.AUTH_VERIFY_MODE = configured_mode
+
+
+def _report(label: str, samples: list):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p99 = samples_ms[int(len(samples_ms) * 0.99) - 1]
+    print(
+        f"{label:>14}: mean {statistics.mean(samples_ms):8.3f} ms | "
+        f"p50 {statistics.median(samples_ms):8.3f} ms | p99 {p99:8.3f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=40.0, help="simulated Supabase round trip")
+    args = parser.parse_args()
+
+    private_pem, jwks = _make_keys()
+    await _install_fake_supabase(jwks, args.rtt_ms / 1000)
+
+    token = jwt.encode(
+        {"sub": USER_ID, "email": "bench@example.com", "aud": auth.JWT_AUDIENCE,
+         "exp": int(time.time()) + 3600},
+        private_pem,
+        algorithm="ES256",
+        headers={"kid": KID},
+    )
+
+    print(f"{args.requests} requests, simulated RTT {args.rtt_ms} ms")
+    for mode in ("remote", "local"):
+        _report(mode, await _run(mode, token, args.requests))
+    _report("remote+cache", await _run("remote", token, args.requests, use_token_cache=True))
+    print(f"token cache: {auth.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+# benchmarks/bench_document_model.py
+"""
+Measures what the typed document model and orjson save on large documents:
+
+* memory held by a parsed config (nested dicts vs. __slots__ model),
+* decoding and encoding a config (stdlib json vs. orjson),
+* walking every block the way the exporter does (probing dicts for
+  "blocks"/"sections"/"content", lowercasing types and aliases per block,
+  vs. reading attributes of an already normalized model).
+
+    cd backend
+    python -m benchmarks.bench_document_model --blocks 1000
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from app.models.document import WordDocument
+from app.utils import json_codec
+
+
+def _make_document(blocks: int) -> dict:
+    result = [{"type": "heading", "level": 1, "text": "Benchmark Document"}]
+    section = 0
+    while len(result) < blocks:
+        if len(result) % 10 == 1:
+            section += 1
+            result.append({"type": "heading", "level": 2, "text": f"Section {section}"})
+        elif len(result) % 10 == 5:
+            result.append({"type": "bullet_list", "items": [{"text": f"Point {i}"} for i in range(4)]})
+        else:
+            result.append({
+                "type": "Paragraph",
+                "text": "Lorem ipsum dolor sit amet, **consectetur** adipiscing elit. " * 6,
+            })
+    return {"title": "Benchmark Document", "blocks": result}
+
+
+def _walk_dicts(document_data: dict) -> int:
+    """The per-block probing export_to_word used to do on raw dicts."""
+    count = 0
+    blocks = (
+        document_data.get("blocks") or
+        document_data.get("sections") or
+        document_data.get("content", []) or
+        []
+    )
+    for block in blocks:
+        btype = str(block.get("type", "")).lower()
+        if btype == "heading":
+            level = max(1, min(block.get("level", 2), 9))
+            count += level
+        elif btype in ("paragraph", "text", ""):
+            text = block.get("text") or block.get("content", "")
+            count += len(str(text))
+        elif btype in ("bullet_list", "ul", "bulletlist"):
+            for item in block.get("items", []):
+                text = item.get("text") if isinstance(item, dict) else str(item)
+                count += len(text)
+    return count
+
+
+def _walk_model(document: WordDocument) -> int:
+    count = 0
+    for block in document.blocks:
+        btype = block.type
+        if btype == "heading":
+            count += block.level
+        elif btype == "paragraph":
+            count += len(block.text)
+        elif btype == "bullet_list":
+            for text in block.items:
+                count += len(text)
+    return count
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def _allocated(fn) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = fn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return after - before
+
+
+def _row(label: str, baseline: float, optimized: float, unit: str):
+    ratio = baseline / optimized if optimized else float("inf")
+    print(f"{label:>22}: {baseline:10.3f} {unit} -> {optimized:10.3f} {unit}  ({ratio:5.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    raw = _make_document(args.blocks)
+    canonical = WordDocument.from_dict(raw).to_dict()
+    text = json.dumps(canonical)
+    model = WordDocument.from_dict(canonical)
+
+    print(f"{args.blocks} blocks, {len(text) / 1024:.0f} KiB of JSON, orjson={'yes' if json_codec.orjson else 'no'}")
+
+    dict_bytes = _allocated(lambda: json.loads(text))
+    model_bytes = _allocated(lambda: WordDocument.from_dict(json.loads(text)))
+    _row("memory (parsed)", dict_bytes / 1024, model_bytes / 1024, "KiB")
+
+    _row("decode config", _time(lambda: json.loads(text), args.repeat),
+         _time(lambda: json_codec.loads(text), args.repeat), "ms")
+    _row("encode config", _time(lambda: json.dumps(canonical), args.repeat),
+         _time(lambda: json_codec.dumps(canonical), args.repeat), "ms")
+    _row("walk blocks", _time(lambda: _walk_dicts(raw), args.repeat),
+         _time(lambda: _walk_model(model), args.repeat), "ms")
+    print(f"{'normalize (one-off)':>22}: {_time(lambda: WordDocument.from_dict(raw), args.repeat):10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_docx_export.py
+"""
+Compares the two .docx engines of app/services/document_export.py across
+document sizes:
+
+* "python-docx": a fresh Document() per export, every block added through
+  the object layer (the only engine before the template one),
+* "template": the base document prepared once, body XML emitted as text.
+
+Each size first checks that both engines produce the same parts, then
+reports median export time and blocks per second.
+
+    cd backend
+    python -m benchmarks.bench_docx_export --blocks 100 1000 5000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import zipfile
+
+from app.models.document import WordDocument
+from app.services import document_export
+
+_WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    words = []
+    for _ in range(rng.randint(low, high)):
+        word = rng.choice(_WORDS)
+        roll = rng.random()
+        if roll < 0.04:
+            word = f"**{word}**"
+        elif roll < 0.07:
+            word = f"*{word}*"
+        elif roll < 0.08:
+            word = f"`{word}()`"
+        words.append(word)
+    return " ".join(words) + "."
+
+
+def _make_document(count: int, seed: int = 0) -> WordDocument:
+    """Roughly the block mix of a generated report: a heading every few paragraphs, some lists, tables and code."""
+    rng = random.Random(seed)
+    blocks = [{"type": "heading", "level": 1, "text": "Benchmark report"}]
+    while len(blocks) < count:
+        roll = rng.random()
+        if roll < 0.12:
+            blocks.append({"type": "heading", "level": rng.choice((2, 2, 3)), "text": _sentence(rng, 2, 6)})
+        elif roll < 0.70:
+            blocks.append({"type": "paragraph", "text": _sentence(rng, 30, 90)})
+        elif roll < 0.82:
+            blocks.append({"type": "bullet_list", "items": [_sentence(rng, 4, 14) for _ in range(rng.randint(3, 6))]})
+        elif roll < 0.90:
+            blocks.append({"type": "numbered_list", "items": [_sentence(rng, 4, 14) for _ in range(rng.randint(3, 6))]})
+        elif roll < 0.95:
+            cols = rng.randint(2, 4)
+            blocks.append({"type": "table", "rows": [[_sentence(rng, 1, 4) for _ in range(cols)] for _ in range(rng.randint(3, 6))]})
+        else:
+            blocks.append({"type": "code", "text": "\n".join(f"    step_{i}(value)" for i in range(rng.randint(2, 8)))})
+    return WordDocument.from_dict({"title": "Benchmark", "blocks": blocks})
+
+
+def _parts(buffer) -> dict:
+    with zipfile.ZipFile(buffer) as archive:
+        return {info.filename: archive.read(info) for info in archive.infolist()}
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engines = {
+        "python-docx": document_export._export_with_python_docx,
+        "template": document_export.docx_template.render,
+    }
+    # Template preparation is a one-off per process; keep it out of the timings.
+    document_export.docx_template.render(_make_document(1))
+
+    print(f"{'blocks':>7} {'engine':>12} {'median ms':>10} {'blocks/s':>10} {'size KiB':>9}")
+    for count in args.blocks:
+        document = _make_document(count)
+        outputs = {name: export(document) for name, export in engines.items()}
+        if _parts(outputs["python-docx"]) != _parts(outputs["template"]):
+            raise SystemExit(f"{count} blocks: engines produced different documents")
+
+        timings = {name: _time(lambda: export(document), args.repeat) for name, export in engines.items()}
+        for name, ms in timings.items():
+            size = len(outputs[name].getvalue()) / 1024
+            print(f"{count:>7} {name:>12} {ms:>10.1f} {count / ms * 1000:>10.0f} {size:>9.0f}")
+        print(f"{'':>7} {'speedup':>12} {timings['python-docx'] / timings['template']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_export_memory.py
+"""
+Peak Python memory of one export, buffered (export_to_word/export_to_ppt
+into a BytesIO) against streamed (stream_word/stream_ppt, chunks dropped
+as soon as they are produced), across document sizes. Measured with
+tracemalloc, inline-markdown memo cleared before each run.
+
+    cd backend
+    python -m benchmarks.bench_export_memory --blocks 1000 5000 20000 --slides 50 200
+"""
+
+import argparse
+import random
+import tracemalloc
+
+from app.services.document_export import export_to_word, stream_word
+from app.services.ppt_export_service import export_to_ppt, stream_ppt
+from app.utils import inline_markdown
+from benchmarks.bench_docx_export import _make_document, _sentence
+
+
+def _make_presentation(count: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        "topic": "Benchmark",
+        "slides": [
+            {"title": _sentence(rng, 2, 6), "bullets": [_sentence(rng, 6, 16) for _ in range(rng.randint(3, 6))]}
+            for _ in range(count)
+        ],
+    }
+
+
+def _peak_kib(fn) -> int:
+    inline_markdown._tokenize.cache_clear()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _drain(chunks):
+    for _ in chunks:
+        pass
+
+
+def _row(label: str, buffered: int, streamed: int):
+    print(f"{label:>14}: buffered {buffered:>8} KiB   streamed {streamed:>8} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--slides", type=int, nargs="+", default=[50, 200])
+    args = parser.parse_args()
+
+    # One-off template preparation stays out of the numbers.
+    _drain(stream_word(_make_document(1)))
+
+    for count in args.blocks:
+        document = _make_document(count)
+        _row(f"docx {count}", _peak_kib(lambda: export_to_word(document).getvalue()),
+             _peak_kib(lambda: _drain(stream_word(document))))
+    for count in args.slides:
+        presentation = _make_presentation(count)
+        _row(f"pptx {count}", _peak_kib(lambda: export_to_ppt(presentation).getvalue()),
+             _peak_kib(lambda: _drain(stream_ppt(presentation))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_export_pool.py
+"""
+Latency of a cheap endpoint while exports run on the same worker, with
+the export done:
+
+* "inline": synchronously inside the async handler (how /word, /ppt and
+  the download endpoint used to call export_to_word/export_to_ppt),
+* "thread": in Starlette's thread pool (still shares the GIL),
+* "pool":   in app/services/export_pool.py's worker processes.
+
+A stand-in app with a /ping route and an export route runs in-process
+behind httpx's ASGI transport, so anything that blocks the event loop
+shows up directly in /ping latency.
+
+    cd backend
+    python -m benchmarks.bench_export_pool --blocks 2000 --exporters 4 --seconds 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+from app.services.export_pool import ExportPool, render
+from benchmarks.bench_docx_export import _make_document
+
+
+def _make_app(mode: str, pool: ExportPool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/export")
+    async def export(request: Request):
+        content = await request.json()
+        if mode == "inline":
+            data = render("docx", content)
+        elif mode == "thread":
+            data = await run_in_threadpool(render, "docx", content)
+        else:
+            data = await pool.run("docx", content)
+        return Response(data)
+
+    return app
+
+
+def _percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def _measure(mode: str, content: dict, exporters: int, seconds: float, workers: int) -> dict:
+    pool = ExportPool(workers=workers if mode == "pool" else 0, max_pending=exporters * 2, timeout=300)
+    await pool.start()
+    transport = httpx.ASGITransport(app=_make_app(mode, pool))
+    stop_at = time.perf_counter() + seconds
+    exports = 0
+    pings = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def export_loop():
+            nonlocal exports
+            while time.perf_counter() < stop_at:
+                response = await client.post("/export", json=content)
+                response.raise_for_status()
+                exports += 1
+
+        async def ping_loop():
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                (await client.get("/ping")).raise_for_status()
+                pings.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(ping_loop(), *(export_loop() for _ in range(exporters)))
+    await pool.stop()
+
+    return {
+        "exports/s": exports / seconds,
+        "pings": len(pings),
+        "p50": statistics.median(pings),
+        "p99": _percentile(pings, 0.99),
+        "max": max(pings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--exporters", type=int, default=4, help="concurrent export requests")
+    parser.add_argument("--workers", type=int, default=1, help="processes in pool mode")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "pool"])
+    args = parser.parse_args()
+
+    content = _make_document(args.blocks).to_dict()
+    print(f"{args.blocks} blocks, {args.exporters} concurrent exports, {args.seconds:g}s per mode")
+    print(f"{'mode':>7} {'exports/s':>10} {'pings':>6} {'ping p50 ms':>12} {'p99 ms':>9} {'max ms':>9}")
+    for mode in args.modes:
+        result = asyncio.run(_measure(mode, content, args.exporters, args.seconds, args.workers))
+        print(f"{mode:>7} {result['exports/s']:>10.1f} {result['pings']:>6} "
+              f"{result['p50']:>12.1f} {result['p99']:>9.1f} {result['max']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# benchmarks/bench_inline_markdown.py
+"""
+Compares the shared single-scan inline markdown tokenizer with the
+five-pass splitter the exporters used before (one re.finditer pass per
+pattern, rebuilding the part list after each):
+
+* tokenizing every paragraph once (memo cleared, i.e. all new text),
+* tokenizing with the memo warm (regenerated/re-exported documents),
+* export_to_word end to end on a paragraph-heavy document.
+
+    cd backend
+    python -m benchmarks.bench_inline_markdown --paragraphs 2000
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from app.services import document_export
+from app.utils import inline_markdown
+
+_PATTERNS = [
+    (r"`(.*?)`", "code"),
+    (r"\*\*(.*?)\*\*", "bold"),
+    (r"__(.*?)__", "bold"),
+    (r"\*(.*?)\*", "italic"),
+    (r"_([^_]+)_", "italic"),
+]
+
+_WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+
+def _five_pass(text: str) -> list:
+    """The splitter document_export._add_rich_text used to run."""
+    parts = [text]
+    for pattern, style in _PATTERNS:
+        new_parts = []
+        for part in parts:
+            if isinstance(part, str):
+                matches = list(re.finditer(pattern, part))
+                if not matches:
+                    new_parts.append(part)
+                    continue
+                pos = 0
+                for m in matches:
+                    if m.start() > pos:
+                        new_parts.append(part[pos:m.start()])
+                    new_parts.append((m.group(1), style))
+                    pos = m.end()
+                if pos < len(part):
+                    new_parts.append(part[pos:])
+            else:
+                new_parts.append(part)
+        parts = new_parts
+    return parts
+
+
+def _five_pass_add_rich_text(paragraph, text: str):
+    if not text:
+        return
+    for part in _five_pass(text):
+        if isinstance(part, tuple):
+            content, style = part
+            run = paragraph.add_run(content)
+            if style == "bold":
+                run.bold = True
+            elif style == "italic":
+                run.italic = True
+            elif style == "code":
+                run.font.name = "Consolas"
+                run.font.size = document_export.Pt(10)
+                shading_elt = document_export.OxmlElement('w:shd')
+                shading_elt.set(document_export.qn('w:fill'), 'f0f0f0')
+                run._r.get_or_add_rPr().append(shading_elt)
+        else:
+            paragraph.add_run(part)
+
+
+def _make_paragraph(rng: random.Random) -> str:
+    words = []
+    for _ in range(rng.randint(40, 90)):
+        word = rng.choice(_WORDS)
+        roll = rng.random()
+        if roll < 0.04:
+            word = f"**{word}**"
+        elif roll < 0.07:
+            word = f"*{word}*"
+        elif roll < 0.08:
+            word = f"`{word}()`"
+        words.append(word)
+    return " ".join(words) + "."
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def _row(label: str, baseline: float, optimized: float):
+    ratio = baseline / optimized if optimized else float("inf")
+    print(f"{label:>24}: {baseline:10.3f} ms -> {optimized:10.3f} ms  ({ratio:5.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [_make_paragraph(rng) for _ in range(args.paragraphs)]
+    print(f"{args.paragraphs} paragraphs, {sum(map(len, texts)) / 1024:.0f} KiB of text")
+
+    def cold():
+        inline_markdown._tokenize.cache_clear()
+        for text in texts:
+            inline_markdown.tokenize(text)
+
+    def warm():
+        for text in texts:
+            inline_markdown.tokenize(text)
+
+    baseline = _time(lambda: [_five_pass(text) for text in texts], args.repeat)
+    _row("tokenize (new text)", baseline, _time(cold, args.repeat))
+    warm()
+    _row("tokenize (memoized)", baseline, _time(warm, args.repeat))
+
+    document = {"title": "Benchmark", "blocks": [{"type": "paragraph", "text": text} for text in texts]}
+    shared = document_export._add_rich_text
+    document_export._add_rich_text = _five_pass_add_rich_text
+    try:
+        before = _time(lambda: document_export.export_to_word(document), max(1, args.repeat // 2))
+    finally:
+        document_export._add_rich_text = shared
+    inline_markdown._tokenize.cache_clear()
+    _row("export_to_word", before, _time(lambda: document_export.export_to_word(document), max(1, args.repeat // 2)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_pptx_export.py
+"""
+Compares the two .pptx engines of app/services/ppt_export_service.py
+across deck sizes:
+
+* "python-pptx": a fresh Presentation() per export, layouts and
+  placeholders looked up and every run added through the object layer
+  (the only engine before the template one),
+* "template": the base deck prepared once, slide XML emitted as text.
+
+Each size first checks that both engines produce the same parts, then
+reports median export time and slides per second.
+
+    cd backend
+    python -m benchmarks.bench_pptx_export --slides 20 200 1000
+"""
+
+import argparse
+import random
+
+from app.models.document import Presentation
+from app.services import ppt_export_service
+from benchmarks.bench_docx_export import _parts, _sentence, _time
+
+
+def _make_deck(count: int, seed: int = 0) -> Presentation:
+    """Slides like PptService generates: a short title and 3-6 bullets with some inline markup."""
+    rng = random.Random(seed)
+    slides = [
+        {"title": _sentence(rng, 2, 6), "bullets": [_sentence(rng, 6, 18) for _ in range(rng.randint(3, 6))]}
+        for _ in range(count)
+    ]
+    return Presentation.from_dict({"topic": "Benchmark deck", "slides": slides})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, nargs="+", default=[20, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engines = {
+        "python-pptx": ppt_export_service._export_with_python_pptx,
+        "template": ppt_export_service.pptx_template.render,
+    }
+    # Template preparation is a one-off per process; keep it out of the timings.
+    ppt_export_service.pptx_template.render(_make_deck(1))
+
+    print(f"{'slides':>7} {'engine':>12} {'median ms':>10} {'slides/s':>10} {'size KiB':>9}")
+    for count in args.slides:
+        deck = _make_deck(count)
+        outputs = {name: export(deck) for name, export in engines.items()}
+        if _parts(outputs["python-pptx"]) != _parts(outputs["template"]):
+            raise SystemExit(f"{count} slides: engines produced different decks")
+
+        timings = {name: _time(lambda: export(deck), args.repeat) for name, export in engines.items()}
+        for name, ms in timings.items():
+            size = len(outputs[name].getvalue()) / 1024
+            print(f"{count:>7} {name:>12} {ms:>10.1f} {count / ms * 1000:>10.0f} {size:>9.0f}")
+        print(f"{'':>7} {'speedup':>12} {timings['python-pptx'] / timings['template']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# tests/conftest.py
+"""
+Run from backend/:  python -m pytest -q
+
+The app's clients are created at import time and need these variables;
+the tests never reach the services behind them.
+"""
+
+import os
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-anon-key")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-service-role-key")
+os.environ.setdefault("OPENAI_API_KEY", "test-openai-key")
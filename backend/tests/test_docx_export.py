@@ -0,0 +1,61 @@
+# tests/test_docx_export.py
+
+import zipfile
+from io import BytesIO
+
+import pytest
+from docx import Document
+
+from app.models.document import WordDocument
+from app.services import document_export
+
+
+def _parts(buffer) -> dict:
+    with zipfile.ZipFile(buffer) as archive:
+        return {info.filename: archive.read(info) for info in archive.infolist()}
+
+
+def _engines(data: dict) -> tuple:
+    document = WordDocument.from_dict(data)
+    return (
+        document_export._export_with_python_docx(document),
+        document_export.docx_template.render(document),
+    )
+
+
+@pytest.mark.parametrize("data", [
+    {"title": "Report", "blocks": [
+        {"type": "heading", "level": 1, "text": "Report"},
+        {"type": "heading", "level": 2, "text": "A & <b>"},
+        {"type": "paragraph", "text": "x **bold** *it* `code`\tand\nbreak"},
+        {"type": "paragraph", "text": "a **** b `` c **x `y` _z_**"},
+        {"type": "bullet_list", "items": ["one", "**two**"]},
+        {"type": "numbered_list", "items": ["1", "2"]},
+        {"type": "table", "rows": [["a", "b"], ["c"], ["d", "e", "f"]]},
+        {"type": "table", "rows": [[]]},
+        {"type": "code", "text": "def f():\n    return 1"},
+    ]},
+    {"title": "Carriage\rreturn", "blocks": [{"type": "paragraph", "text": "a\rb"}]},
+    {"title": "Empty code", "blocks": [{"type": "code", "text": ""}]},
+])
+def test_engines_produce_the_same_parts(data):
+    python_docx, template = _engines(data)
+    assert _parts(python_docx) == _parts(template)
+
+
+def test_carriage_return_in_title_survives_a_reload():
+    _, template = _engines({"title": "a\rb", "blocks": []})
+    assert Document(template).core_properties.title == "a\rb"
+
+
+def test_streamed_document_unzips_to_the_buffered_parts():
+    data = {"title": "Stream", "blocks": [
+        {"type": "heading", "level": 1, "text": "Stream"},
+        {"type": "paragraph", "text": "x **bold** " * 200},
+        {"type": "table", "rows": [["a", "b"], ["c", "d"]]},
+    ]}
+    chunks = list(document_export.stream_word(data, chunk_size=256))
+    assert len(chunks) > 1
+    with zipfile.ZipFile(BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+    assert _parts(BytesIO(b"".join(chunks))) == _parts(document_export.export_to_word(data))
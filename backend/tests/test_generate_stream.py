@@ -0,0 +1,86 @@
+# tests/test_generate_stream.py
+
+import asyncio
+
+import pytest
+
+from app.routes import routes
+from app.services import docx_service, ppt_service
+from app.utils.metrics import _label_key
+
+
+def _count(outcome: str) -> float:
+    return routes.generate_streams._values.get(_label_key({"outcome": outcome}), 0)
+
+
+async def _cancel_after_first_frame(body):
+    async def consume():
+        async for _ in body:
+            pass
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_disconnect_closes_upstream_and_counts_cancelled():
+    closed = []
+
+    async def events():
+        try:
+            yield {"event": "block", "data": {"type": "paragraph", "text": "a"}}
+            await asyncio.sleep(3600)  # the LLM still writing
+        finally:
+            await asyncio.sleep(0)  # closing the upstream stream awaits too
+            closed.append(True)
+
+    before = _count("cancelled")
+    body = routes._stream_generation(events(), "user", "title", 1, "created")
+    asyncio.run(_cancel_after_first_frame(body))
+    assert closed == [True]
+    assert _count("cancelled") == before + 1
+
+
+def test_failed_stream_is_counted():
+    async def events():
+        raise ValueError("bad output")
+        yield  # pragma: no cover
+
+    async def collect():
+        return [frame async for frame in routes._stream_generation(events(), "user", "title", 1, "created")]
+
+    before = _count("failed")
+    frames = asyncio.run(collect())
+    assert frames[-1].startswith("event: error")
+    assert _count("failed") == before + 1
+
+
+@pytest.mark.parametrize("module, stream", [
+    (docx_service, lambda: docx_service.DocxService.astream_word_content("Topic", ["A"])),
+    (ppt_service, lambda: ppt_service.PptService.astream_ppt_content("Topic", ["A"])),
+])
+def test_service_stream_closes_the_llm_stream(monkeypatch, module, stream):
+    closed = []
+
+    async def astream_text(prompt, response_format=None):
+        try:
+            yield '{"title": "Topic", "topic": "Topic", "blocks": [{"type": "paragraph", "text": "a"}], '
+            yield '"slides": [{"title": "A", "bullets": ["b"]}'
+            await asyncio.sleep(3600)
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(module, "astream_text", astream_text)
+
+    async def first_item_then_close():
+        events = stream()
+        item = await events.__anext__()
+        await events.aclose()
+        return item
+
+    assert asyncio.run(first_item_then_close())["event"] in ("block", "slide")
+    assert closed == [True]
@@ -0,0 +1,31 @@
+# tests/test_inline_markdown.py
+
+import pytest
+
+from app.utils.inline_markdown import tokenize
+
+
+def _styled(text: str) -> list:
+    """(text, flags) pairs with flags made of b/i/c, for compact assertions."""
+    return [(run.text, "b" * run.bold + "i" * run.italic + "c" * run.code) for run in tokenize(text)]
+
+
+@pytest.mark.parametrize("text", [
+    "****", "a **** b", "``", "a `` b", "**", "a ** b", "__", "2 * 3 * 4", "snake_case_name",
+])
+def test_unmatched_and_empty_delimiters_stay_literal(text):
+    assert _styled(text) == [(text, "")]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("**a `c` b**", [("a ", "b"), ("c", "bc"), (" b", "b")]),
+    ("**a _i_ b**", [("a ", "b"), ("i", "bi"), (" b", "b")]),
+    ("*a `x` b*", [("a ", "i"), ("x", "ic"), (" b", "i")]),
+    ("**a *i* b**", [("a ", "b"), ("i", "bi"), (" b", "b")]),
+    ("*a **b** c*", [("a ", "i"), ("b", "bi"), (" c", "i")]),
+    ("***x***", [("x", "bi")]),
+    ("a **b *c*** `d*`", [("a ", ""), ("b ", "b"), ("c", "bi"), (" ", ""), ("d*", "c")]),
+])
+def test_spans(text, expected):
+    assert _styled(text) == expected
+
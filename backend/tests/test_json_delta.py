@@ -0,0 +1,84 @@
+# tests/test_json_delta.py
+
+import copy
+import json
+import random
+
+import pytest
+
+from app.utils import json_delta
+
+
+def _canonical(value) -> str:
+    """JSON with sorted keys: `add` appends keys, so order may differ; 1 and true still do not."""
+    return json.dumps(value, sort_keys=True)
+
+
+def _round_trip(old, new):
+    before = copy.deepcopy(old)
+    ops = json_delta.diff(old, new)
+    assert json_delta.apply(old, ops) == new
+    assert old == before  # apply copies what it changes
+    return ops
+
+
+def test_splice_for_inserted_and_removed_items():
+    old = {"blocks": [{"text": str(i)} for i in range(10)]}
+    new = {"blocks": old["blocks"][:3] + [{"text": "x"}, {"text": "y"}] + old["blocks"][6:]}
+    ops = _round_trip(old, new)
+    assert [op["op"] for op in ops] == ["splice"]
+    assert ops[0]["start"] == 3 and ops[0]["delete"] == 3
+
+
+def test_in_place_rewrite_is_described_inside_the_item():
+    old = {"blocks": [{"type": "paragraph", "text": "a"}, {"type": "paragraph", "text": "b"}]}
+    new = {"blocks": [{"type": "paragraph", "text": "a"}, {"type": "paragraph", "text": "c"}]}
+    assert _round_trip(old, new) == [{"op": "replace", "path": "/blocks/1/text", "value": "c"}]
+
+
+def test_keys_with_pointer_characters():
+    _round_trip({"a/b": 1, "c~d": [1]}, {"a/b": 2, "e": {"~/": None}})
+
+
+@pytest.mark.parametrize("old, new", [
+    ({"flag": 1}, {"flag": True}),
+    ({"flag": False}, {"flag": 0}),
+    ({"nested": {"flag": 1}}, {"nested": {"flag": True}}),
+    ({"items": [0, 1]}, {"items": [False, True]}),
+    ([1], [1.0]),
+])
+def test_bool_and_number_changes_are_kept(old, new):
+    ops = _round_trip(old, new)
+    assert ops
+    result = json_delta.apply(old, ops)
+    assert _canonical(result) == _canonical(new)
+
+
+def test_random_round_trips():
+    rng = random.Random(7)
+
+    def value(depth=0):
+        roll = rng.random()
+        if depth < 3 and roll < 0.2:
+            return {rng.choice("abcde"): value(depth + 1) for _ in range(rng.randint(0, 4))}
+        if depth < 3 and roll < 0.4:
+            return [value(depth + 1) for _ in range(rng.randint(0, 6))]
+        return rng.choice([0, 1, True, False, None, "x", "y", 1.5])
+
+    def mutate(data):
+        data = copy.deepcopy(data)
+        if isinstance(data, dict) and data and rng.random() < 0.7:
+            key = rng.choice(sorted(data))
+            data[key] = mutate(data[key])
+        elif isinstance(data, list) and data and rng.random() < 0.7:
+            index = rng.randrange(len(data))
+            data[index:index + rng.randint(0, 2)] = [mutate(data[index]) for _ in range(rng.randint(0, 3))]
+        else:
+            data = value()
+        return data
+
+    for _ in range(500):
+        old = value()
+        new = mutate(old)
+        result = json_delta.apply(old, json_delta.diff(old, new))
+        assert _canonical(result) == _canonical(new)
@@ -0,0 +1,82 @@
+# tests/test_json_stream.py
+
+import json
+
+import pytest
+
+from app.utils.json_stream import JsonArrayItemStream, JsonValueScanner, extract_json
+
+_DOCUMENT = {
+    "title": "A {b} [c]",
+    "blocks": [
+        {"type": "heading", "level": 1, "text": "Braces } and ] in \"text\""},
+        {"type": "paragraph", "text": "escaped \\\" quote, {unbalanced and \\\\"},
+        {"type": "bullet_list", "items": ["one", "{two}", "[three"]},
+        None,
+        {"type": "table", "rows": [["a", "b"], []]},
+    ],
+}
+_TEXT = json.dumps(_DOCUMENT)
+
+
+@pytest.mark.parametrize("text", [
+    _TEXT,
+    f"Sure! Here it is:\n```json\n{_TEXT}\n```",
+    _TEXT + "\nHope this helps :} { not json } [1, 2",  # trailing junk with braces
+    "See {see below} and [the list] first.\n" + _TEXT,  # stray braces before the object
+    "An unbalanced { opener, then " + _TEXT,
+])
+def test_extract_json_finds_the_object(text):
+    assert extract_json(text) == _DOCUMENT
+
+
+def test_extract_json_skips_values_of_the_other_kind():
+    text = f'First [1, 2], then {_TEXT}'
+    assert extract_json(text) == [1, 2]
+    assert extract_json(text, dict) == _DOCUMENT
+
+
+@pytest.mark.parametrize("text", ["", "no json here", "{see below}", '{"open": ['])
+def test_extract_json_raises_without_a_value(text):
+    with pytest.raises(ValueError):
+        extract_json(text, dict)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_scanner_handles_any_chunking(size):
+    text = "chatter {x} " + _TEXT + " more :} [1]"
+    scanner = JsonValueScanner()
+    values = []
+    for start in range(0, len(text), size):
+        values.extend(scanner.feed(text[start:start + size]))
+    assert values == [_DOCUMENT, [1]]
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 13, len(_TEXT)])
+def test_array_items_arrive_whole_across_chunks(size):
+    stream = JsonArrayItemStream("blocks")
+    items = []
+    text = "Here you go: " + _TEXT + " }]"
+    for start in range(0, len(text), size):
+        items.extend(stream.feed(text[start:start + size]))
+    assert items == _DOCUMENT["blocks"]
+
+
+def test_array_items_stream_text_as_it_is_written():
+    stream = JsonArrayItemStream("blocks", text_keys=("text",))
+    pieces = []
+    for ch in _TEXT:
+        stream.feed(ch)
+        pieces.extend(stream.take_text())
+    written = {}
+    for index, piece in pieces:
+        written[index] = written.get(index, "") + piece
+    assert written == {0: _DOCUMENT["blocks"][0]["text"], 1: _DOCUMENT["blocks"][1]["text"]}
+
+
+def test_root_array_items():
+    stream = JsonArrayItemStream("blocks", root_array=True)
+    items = []
+    for ch in 'Refined: [{"type": "paragraph", "text": "a ]"}, {"type": "paragraph", "text": "b"}]':
+        items.extend(stream.feed(ch))
+    assert [item["text"] for item in items] == ["a ]", "b"]
@@ -0,0 +1,27 @@
+# tests/test_llm_cache.py
+
+from app.config.llm_cache import LLMResponseCache
+from app.utils.metrics import render_prometheus
+
+
+def _sample(text: str, line: str) -> float:
+    for row in text.splitlines():
+        if row.startswith(line + " "):
+            return float(row.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_lookups_and_saved_seconds_are_exported():
+    before = render_prometheus()
+    cache = LLMResponseCache()
+    cache.put("k", "answer", latency=1.5)
+    assert cache.get("k") == "answer"
+    assert cache.get("other") is None
+
+    after = render_prometheus()
+    hit = 'llm_cache_total{result="hit",tier="memory"}'
+    miss = 'llm_cache_total{result="miss",tier="none"}'
+    assert _sample(after, hit) - _sample(before, hit) == 1
+    assert _sample(after, miss) - _sample(before, miss) == 1
+    assert _sample(after, "llm_cache_saved_seconds_total") - _sample(before, "llm_cache_saved_seconds_total") == 1.5
+    assert _sample(after, "llm_cache_hit_ratio") == 0.5
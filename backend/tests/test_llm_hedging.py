@@ -0,0 +1,30 @@
+# tests/test_llm_hedging.py
+
+import asyncio
+
+from app.config.llm_hedging import HedgeBudget, HedgePolicy, Hedger
+
+
+def test_cancelled_primary_records_its_elapsed_time():
+    policy = HedgePolicy(percentile=0.5, min_samples=1)
+    policy.latencies.record(0.05)
+    hedger = Hedger({"outline": policy}, HedgeBudget(10))
+    calls = []
+
+    async def fn():
+        calls.append(None)
+        if len(calls) == 1:
+            await asyncio.sleep(3600)  # the slow primary
+        return "hedge"
+
+    async def main():
+        result = await hedger.run("outline", fn)
+        await asyncio.sleep(0)  # let the primary process its cancellation
+        return result
+
+    assert asyncio.run(main()) == "hedge"
+    assert hedger.hedges_won == 1
+    samples = sorted(policy.latencies._samples)
+    assert len(samples) == 3
+    # Censored at cancel time: at least the hedge delay, far below the hour.
+    assert 0.05 <= samples[-1] < 1
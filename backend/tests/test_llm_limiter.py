@@ -0,0 +1,66 @@
+# tests/test_llm_limiter.py
+
+import asyncio
+import threading
+
+from app.config.llm_limiter import FileStateBackend, LLMRateLimiter, MemoryStateBackend
+
+
+def _limiter(backend=None):
+    return LLMRateLimiter(backend or MemoryStateBackend(), rpm=1e6, tpm=1e9, initial_limit=8)
+
+
+def _call(limiter, profile, latency, completion_tokens):
+    """Settles one successful call of the given latency and size."""
+    slot = limiter.slot(100, profile)
+    slot.tokens = 100 + (completion_tokens or 0)
+    slot.completion_tokens = completion_tokens
+    limiter.backend.update(lambda s: limiter._settle(s, slot, latency))
+
+
+def _limit(limiter):
+    return limiter.backend.update(lambda s: s["limit"])
+
+
+def test_long_generations_do_not_read_as_latency_rise():
+    limiter = _limiter()
+    for _ in range(50):
+        _call(limiter, "outline", 2.0, 200)
+    before = _limit(limiter)
+    # Ten times the wall-clock latency, but for ten times the output.
+    for _ in range(10):
+        _call(limiter, "generate", 20.0, 2000)
+    assert _limit(limiter) > before
+
+
+def test_slower_tokens_decrease_the_limit():
+    limiter = _limiter()
+    for _ in range(50):
+        _call(limiter, "generate", 20.0, 2000)
+    before = _limit(limiter)
+    _call(limiter, "generate", 60.0, 2000)
+    assert _limit(limiter) < before
+
+
+def test_calls_without_usage_are_ignored():
+    limiter = _limiter()
+    _call(limiter, "outline", 2.0, 200)
+    before = _limit(limiter)
+    _call(limiter, "outline", 50.0, None)
+    assert _limit(limiter) == before
+
+
+def test_file_backend_runs_off_the_event_loop(tmp_path):
+    limiter = _limiter(FileStateBackend(str(tmp_path / "limiter.json")))
+    threads = []
+
+    async def main():
+        loop_thread = threading.get_ident()
+        async with limiter.slot(100, "outline") as slot:
+            slot.completion_tokens = 10
+        await limiter.backend.aupdate(lambda s: threads.append(threading.get_ident()))
+        return loop_thread
+
+    loop_thread = asyncio.run(main())
+    assert threads and threads[0] != loop_thread
+    assert limiter.stats()["limit"] > 8
@@ -0,0 +1,80 @@
+# tests/test_ppt_export.py
+
+import sys
+import zipfile
+from io import BytesIO
+
+import pytest
+from lxml import etree
+
+from app.models.document import Presentation
+from app.config.settings import settings
+from app.services import ppt_export_service
+
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+
+
+def _parts(buffer) -> dict:
+    with zipfile.ZipFile(buffer) as archive:
+        return {info.filename: archive.read(info) for info in archive.infolist()}
+
+
+def _engines(data: dict) -> tuple:
+    deck = Presentation.from_dict(data)
+    return (
+        _parts(ppt_export_service._export_with_python_pptx(deck)),
+        _parts(ppt_export_service.pptx_template.render(deck)),
+    )
+
+
+def _paragraphs(slide_xml: bytes) -> list:
+    return etree.fromstring(slide_xml).iter(f"{_A}p")
+
+
+def test_engines_produce_the_same_parts():
+    python_pptx, template = _engines({
+        "topic": "Deck\nsecond line",
+        "slides": [
+            {"title": "A & <b>", "bullets": ["plain", "x **bold** *it* `code`", "a **** b `` c **x `y` _z_**", "line\nbreak", ""]},
+            {"title": "", "bullets": []},
+        ],
+    })
+    assert python_pptx == template
+
+
+def test_leading_line_break_comes_after_paragraph_properties():
+    python_pptx, template = _engines({"topic": "\vTopic", "slides": [{"title": "T", "bullets": ["\nafter break", "\v"]}]})
+    assert python_pptx == template
+
+    for name in ("ppt/slides/slide1.xml", "ppt/slides/slide2.xml"):
+        for p in _paragraphs(python_pptx[name]):
+            children = [etree.QName(child).localname for child in p]
+            if "br" in children:
+                assert children[0] == "pPr", (name, children)
+
+
+_STREAM_DECK = {
+    "topic": "Stream",
+    "slides": [{"title": f"Slide {n}", "bullets": ["x **bold** `code`"] * 5} for n in range(10)],
+}
+
+
+def _streamed(chunk_size: int = 256) -> BytesIO:
+    chunks = list(ppt_export_service.stream_ppt(_STREAM_DECK, chunk_size=chunk_size))
+    assert len(chunks) > 1
+    buffer = BytesIO(b"".join(chunks))
+    with zipfile.ZipFile(buffer) as archive:
+        assert archive.testzip() is None
+    return buffer
+
+
+@pytest.mark.parametrize("engine", ["python-pptx", "template"])
+def test_streamed_deck_unzips_to_the_buffered_parts(monkeypatch, engine):
+    monkeypatch.setattr(settings, "PPTX_EXPORT_ENGINE", engine)
+    assert _parts(_streamed()) == _parts(ppt_export_service.export_to_ppt(_STREAM_DECK))
+
+
+def test_python_pptx_stream_falls_back_without_its_internals(monkeypatch):
+    monkeypatch.setattr(settings, "PPTX_EXPORT_ENGINE", "python-pptx")
+    monkeypatch.setitem(sys.modules, "pptx.opc.serialized", None)  # import raises ImportError
+    assert _parts(_streamed()) == _parts(ppt_export_service.export_to_ppt(_STREAM_DECK))
@@ -0,0 +1,42 @@
+# tests/test_refine_stream.py
+
+import asyncio
+
+from app.routes import routes
+from app.utils.metrics import _label_key
+
+
+def _cancelled_count() -> float:
+    return routes.refine_streams._values.get(_label_key({"outcome": "cancelled"}), 0)
+
+
+def test_disconnect_closes_upstream_and_counts_cancelled():
+    closed = []
+
+    async def events():
+        try:
+            yield {"event": "token", "data": {"index": 0, "text": "a"}}
+            await asyncio.sleep(3600)  # the LLM still writing
+        finally:
+            await asyncio.sleep(0)  # closing the upstream stream awaits too
+            closed.append(True)
+
+    async def client_goes_away():
+        body = routes._stream_refinement(events(), lambda data: data, "project", "version")
+
+        async def consume():
+            async for _ in body:
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    before = _cancelled_count()
+    asyncio.run(client_goes_away())
+    assert closed == [True]
+    assert _cancelled_count() == before + 1
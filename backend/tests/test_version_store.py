@@ -0,0 +1,69 @@
+# tests/test_version_store.py
+
+import pytest
+
+from app.services.version_store import VersionStore
+
+
+def _document(n: int) -> dict:
+    return {"title": "Doc", "blocks": [{"type": "paragraph", "text": f"Paragraph {i} " * 20} for i in range(30)] + [
+        {"type": "paragraph", "text": f"revision {n}"}
+    ]}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """A delta-mode store over an in-memory table; `store.rows` counts fetches in `store.fetched`."""
+    store = VersionStore(mode="delta", snapshot_interval=3, max_entries=128)
+    store.rows = {}
+    store.fetched = []
+
+    def fetch(version_id):
+        store.fetched.append(version_id)
+        return store.rows.get(version_id)
+
+    monkeypatch.setattr(store, "_fetch", fetch)
+    return store
+
+
+def _write_chain(store, count: int) -> list:
+    """Versions v0..v<count-1>, each a refinement of the previous; returns their depths."""
+    depths = []
+    parent = None
+    for n in range(count):
+        stored, depth = store.encode(parent, _document(n))
+        store.rows[f"v{n}"] = stored
+        store.remember(f"v{n}", _document(n), depth)
+        depths.append(depth)
+        parent = f"v{n}"
+    return depths
+
+
+def test_materialize_across_snapshot_boundaries(store):
+    assert _write_chain(store, 8) == [0, 1, 2, 0, 1, 2, 0, 1]
+    assert not store.is_delta(store.rows["v3"])
+    assert store.is_delta(store.rows["v5"])
+
+    store.clear()
+    for n in reversed(range(8)):
+        assert store.materialize(f"v{n}", store.rows[f"v{n}"]) == _document(n)
+
+
+def test_load_replays_from_the_nearest_snapshot(store):
+    _write_chain(store, 6)
+    store.clear()
+    assert store.load("v5") == _document(5)
+    assert store.fetched == ["v5", "v4", "v3"]
+
+
+def test_materialized_snapshot_is_not_fetched_again_to_encode_a_child(store):
+    store.rows["base"] = _document(0)
+    store.materialize("base", store.rows["base"])
+
+    stored, depth = store.encode("base", _document(1))
+    assert store.is_delta(stored) and depth == 1
+    assert store.fetched == []
+
+
+def test_missing_version(store):
+    assert store.load("nope") is None
@@ -0,0 +1,22 @@
+# tests/test_zip_stream.py
+
+import zipfile
+from io import BytesIO
+
+from app.utils.zip_stream import ZipStream, compress, store
+
+
+def test_non_ascii_member_names_round_trip():
+    archive = ZipStream(chunk_size=16)
+    chunks = [archive.add(compress("präsentation/ñ.xml", b"<a/>" * 50))]
+    chunks.extend(archive.add_chunks("資料/文書.txt", ["déjà vu "] * 20))
+    chunks.append(archive.add(store("café.docx", b"already zipped")))
+    chunks.append(archive.close())
+
+    with zipfile.ZipFile(BytesIO(b"".join(chunks))) as result:
+        assert result.testzip() is None
+        assert result.namelist() == ["präsentation/ñ.xml", "資料/文書.txt", "café.docx"]
+        assert result.read("präsentation/ñ.xml") == b"<a/>" * 50
+        assert result.read("資料/文書.txt") == "déjà vu ".encode("utf-8") * 20
+        assert result.read("café.docx") == b"already zipped"
+        assert all(info.flag_bits & 0x800 for info in result.infolist())
@@ -116,9 +116,11 @@ export const projectAPI = {
     return response.data;
   },
 
-  // Get versions for a project
+  // Get versions for a project (metadata only; content is fetched per version)
   getProjectVersions: async (projectId) => {
-    const response = await api.get(`/projects/${projectId}/versions`);
+    const response = await api.get(`/projects/${projectId}/versions`, {
+      params: { include_config: false },
+    });
     return response.data;
   },
 